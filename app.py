@@ -1,11 +1,17 @@
 import json
 import os
-import praw
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from src.db.dynamo import get_last_searched_date, save_last_searched_date
-from src.parsers.reddit_parser import get_submission_data, get_subreddit_data, get_comments, get_submission_data_from_pushshift
-from src.services.reddit_service import insert_comment, insert_submission, insert_subreddit
-from src.integrations.pushshift import get_ids_from_submissions_with_keywords_for_interval, get_submissions_with_keywords_for_interval
+from src.db.dynamo import get_last_searched_dates, save_last_searched_dates
+from src.db.seen_index import SeenIndex
+from src.parsers.reddit_parser import set_field_projection, set_search_keywords
+from src.services.reddit_service import flush_writes, ensure_indexes, get_gathered_ids
+from src.integrations.pushshift import get_submissions_with_keywords_for_interval, build_keyword_queries, pushshift_client
+from src.services.gathering_service import build_pushshift_pipeline, schedule_streams
+from src.services.search_service import search_subreddit_groups_concurrently, isolate_search_failures, SubredditGrouper, DEFAULT_MAX_WORKERS
+from src.utils.metrics import metrics
 from src.utils.time_interval import get_timestamp_interval_for_starting_date
 
 
@@ -17,41 +23,245 @@ DEFAULT_COLLECTIONS = {
 
 DATE_FORMAT = '%Y-%m-%d'
 
+# time left to flush buffered writes before the Lambda invocation times out
+FLUSH_SAFETY_MARGIN_MS = 10000
 
-def get_all_submissions_from_intervals(subreddit, intervals, keyword = None, size = 500):
-    """Search for a keyword inside a subreddit within time intervals
-    and returns the respective submission ids found.
+# time kept free, on top of the longest interval gathered so far, before starting another interval
+INTERVAL_SAFETY_MARGIN_MS = int(os.getenv('INTERVAL_SAFETY_MARGIN_MS', 60000))
 
-    Parameters:
+# maximum no. of batches of (subreddit, keyword) streams, at different dates, gathered concurrently
+STREAM_WORKERS = int(os.getenv('STREAM_WORKERS', 4))
+
+# file indexing the ids of the gathered submissions, skipped when found again, e.g. on an EFS mount.
+# On /tmp, every new container rebuilds it from MongoDB, see `get_seen_index`
+SEEN_INDEX_PATH = os.getenv('SEEN_INDEX_PATH') or None
+
+# kept across invocations of a warm container, so subreddit groups adapt to the results of previous intervals
+subreddit_grouper = SubredditGrouper()
+
+# CloudWatch namespace of the metrics logged by every invocation, in Embedded Metric Format unless METRICS_FORMAT is `json`
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'RedditPostsGatherer')
+METRICS_FORMAT = os.getenv('METRICS_FORMAT', 'emf')
 
-    keyword (str): keyword to search
+_seen_index = None
 
-    subreddit (str): subreddit title
+
+def get_all_submissions_from_intervals(subreddits, intervals, keywords = None, max_workers = DEFAULT_MAX_WORKERS, failed_subreddits = None):
+    """Search for keywords inside subreddits within time intervals
+    and returns the respective submissions found. Keywords are folded into OR queries,
+    see `build_keyword_queries`, so submissions found by more than one query should be deduplicated,
+    see `dedupe_search_results`. Sparse subreddits are searched together, see `SubredditGrouper`.
+    Searches run concurrently, but are yielded in interval, query and subreddit order.
+
+    Parameters:
+
+    subreddits (list of str): subreddit titles
 
     intervals (list of tuple): list of interval objects (tuples) representing starting timestamp and ending timestamp
 
-    size (int) - optional: page size requested to the Pushshift API.
+    keywords (list of str) - optional: keywords to search
+
+    max_workers (int) - optional: no. of concurrent searches
+
+    failed_subreddits (set) - optional: set where the subreddits whose search failed are added, instead of raising
 
     Returns:
 
-    list: a list of submissions
+    generator of tuples: ((subreddit, query, interval), list of submissions) for each search
     """
-    submissions = []
-
-    for interval in intervals:
+    intervals = [interval for interval in intervals if interval[0] <= interval[1]]
+    queries = build_keyword_queries(keywords) if keywords is not None else None
+    search_function = get_submissions_with_keywords_for_interval
+    if failed_subreddits is not None:
+        search_function = isolate_search_failures(search_function, failed_subreddits)
+
+    for (subreddit, query, interval), submissions in search_subreddit_groups_concurrently(
+        search_function, subreddits, intervals, queries, subreddit_grouper, max_workers
+    ):
         start_date = datetime.fromtimestamp(interval[0])
         end_date = datetime.fromtimestamp(interval[1])
+        query_message = f' for "{query}" query' if query is not None else ''
+        print(f'Found {len(submissions)} submissions{query_message} inside "{subreddit}" within range ({start_date}, {end_date})')
+
+        yield (subreddit, query, interval), submissions
+
+
+def get_seen_index(collection):
+    """Returns the index of the gathered submissions at `SEEN_INDEX_PATH`, opened on first use and kept across
+    invocations of a warm container. A missing file is rebuilt from the ids of every submission stored on MongoDB,
+    a scan of the whole collection, so `SEEN_INDEX_PATH` should be on persistent storage, e.g. an EFS mount:
+    on /tmp, the first invocation of every new container pays for that scan.
+
+    Parameters:
+
+    collection (str): name of the collection where submissions are saved
+
+    Returns:
+
+    SeenIndex: seen id index, or None without `SEEN_INDEX_PATH`
+    """
+    global _seen_index
+
+    if _seen_index is None and SEEN_INDEX_PATH is not None:
+        seen_index = SeenIndex(SEEN_INDEX_PATH)
+        if not os.path.exists(SEEN_INDEX_PATH):
+            seen_index.rebuild(get_gathered_ids(collection))
+
+        print(f'{seen_index.count()} gathered submissions indexed on {SEEN_INDEX_PATH}')
+        _seen_index = seen_index
+
+    return _seen_index
+
+
+def start_flush_timer(context):
+    """Schedules a flush of the buffered database writes right before the Lambda invocation times out.
+
+    Parameters:
+
+    context (object): Lambda Context runtime methods and attributes
+
+    Returns:
+
+    threading.Timer: started timer, or None without a Lambda context
+    """
+    if context is None:
+        return None
+
+    remaining_seconds = max(0, context.get_remaining_time_in_millis() - FLUSH_SAFETY_MARGIN_MS) / 1000
+    timer = threading.Timer(remaining_seconds, flush_writes)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def has_time_for_interval(context, longest_interval_ms):
+    """Checks whether the Lambda invocation has time left to gather another round of intervals, expecting it to take
+    as long as the longest round gathered so far, plus `INTERVAL_SAFETY_MARGIN_MS`.
+
+    Parameters:
+
+    context (object): Lambda Context runtime methods and attributes
+
+    longest_interval_ms (float): duration of the longest round of intervals gathered so far, in milliseconds
+
+    Returns:
+
+    bool: whether another interval should be gathered, always False without a Lambda context
+    """
+    if context is None:
+        return False
+
+    remaining_ms = context.get_remaining_time_in_millis() - FLUSH_SAFETY_MARGIN_MS
+    return remaining_ms >= longest_interval_ms + INTERVAL_SAFETY_MARGIN_MS
+
+
+def gather_interval(params, subreddits, keywords, interval, seen_index = None):
+    """Gathers the submissions of a batch of (subreddit, keyword) streams within an interval.
+    A failing subreddit doesn't stop the others, it is reported instead.
+
+    Parameters:
+
+    params (dict): gathering parameters
 
-        if start_date > end_date:
-            continue
+    subreddits (list of str): subreddit titles
 
-        print(f'Searching keyword within range ({start_date}, {end_date})...')
+    keywords (list of str): keywords to search, [None] to gather every submission
 
-        new_submissions = get_submissions_with_keywords_for_interval(subreddit, interval, keyword)
+    interval (tuple): interval object (tuple) representing starting timestamp and ending timestamp
 
-        submissions = submissions + new_submissions
+    seen_index (SeenIndex) - optional: index of the gathered ids, whose submissions are skipped
 
-    return submissions
+    Returns:
+
+    dict: interval summary, see `get_interval_summary`, along with the failed subreddits
+    """
+    started_at = time.monotonic()
+    failed_subreddits = set()
+    count = 0
+
+    print(f'Starting search of {len(subreddits)} subreddits within {datetime.fromtimestamp(interval[0])} - {datetime.fromtimestamp(interval[1])} date range')
+
+    pipeline = build_pushshift_pipeline(get_all_submissions_from_intervals(
+        subreddits, [interval], keywords if keywords != [None] else None, failed_subreddits=failed_subreddits
+    ), params['submissionsCollection'], seen_index=seen_index)
+
+    for search, written_submissions in pipeline:
+        count += written_submissions
+
+    duration_ms = (time.monotonic() - started_at) * 1000
+    metrics.increment('interval.count')
+    metrics.observe('interval.submissions', count)
+    metrics.observe('interval.duration_ms', duration_ms)
+
+    return get_interval_summary(interval, subreddits, keywords, count, failed_subreddits, duration_ms)
+
+
+def get_interval_summary(interval, subreddits, keywords, submissions, failed_subreddits, duration_ms):
+    """Summarizes the gathering of an interval.
+
+    Parameters:
+
+    interval (tuple): interval object (tuple) representing starting timestamp and ending timestamp
+
+    subreddits (list of str): searched subreddit titles
+
+    keywords (list of str): searched keywords
+
+    submissions (int): no. of written submissions
+
+    failed_subreddits (set): subreddits whose search failed
+
+    duration_ms (float): time spent gathering the interval, in milliseconds
+
+    Returns:
+
+    dict: interval summary
+    """
+    return {
+        "start": datetime.fromtimestamp(interval[0]).isoformat(),
+        "end": datetime.fromtimestamp(interval[1]).isoformat(),
+        "subreddits": subreddits,
+        "keywords": [keyword for keyword in keywords if keyword is not None],
+        "submissions": submissions,
+        "failedSubreddits": sorted(failed_subreddits),
+        "seconds": round(duration_ms / 1000, 3),
+    }
+
+
+def get_gathering_summary(gathered_intervals, started_at):
+    """Summarizes the intervals gathered by an invocation.
+
+    Parameters:
+
+    gathered_intervals (list of dict): interval summaries, see `get_interval_summary`
+
+    started_at (float): `time.monotonic()` when the invocation started
+
+    Returns:
+
+    dict: no. of intervals and submissions, time spent and the summary of each interval
+    """
+    return {
+        "intervals": len(gathered_intervals),
+        "submissions": sum(interval["submissions"] for interval in gathered_intervals),
+        "seconds": round(time.monotonic() - started_at, 3),
+        "gatheredIntervals": gathered_intervals,
+    }
+
+
+def log_metrics(language):
+    """Logs the metrics recorded by an invocation, then forgets them, as a warm container keeps them otherwise.
+
+    Parameters:
+
+    language (str): gathered language, used as CloudWatch dimension
+    """
+    if METRICS_FORMAT == 'json':
+        print(metrics.to_json_log(language=language))
+    else:
+        print(metrics.to_emf(METRICS_NAMESPACE, { 'Language': language or 'unknown' }))
+
+    metrics.reset()
 
 
 def lambda_handler(event, context):
@@ -75,6 +285,11 @@ def lambda_handler(event, context):
 
         Return doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html
     """
+    flush_timer = start_flush_timer(context)
+    started_at = time.monotonic()
+    gathered_intervals = []
+    seen_index = None
+
     try:
         search_keywords = os.getenv('SEARCH_KEYWORDS')
 
@@ -91,15 +306,30 @@ def lambda_handler(event, context):
             'daysPerInterval': int(os.getenv('DAYS_PER_INTERVAL')),
             'language': os.getenv('LANGUAGE'),
             'mongoDB': os.getenv('MONGO_DATABASE'),
+            'fields': os.getenv('FIELDS'),
         }
         print(f'Running on AWS ENV with params {params}')
 
-        start_date = get_last_searched_date()
+        set_field_projection(params['fields'])
+        set_search_keywords(params['keywords'])
+
+        ensure_indexes(params['submissionsCollection'])
+        seen_index = get_seen_index(params['submissionsCollection'])
+
+        streams = [
+            (subreddit, keyword)
+            for subreddit in params['subreddits']
+            for keyword in (params['keywords'] if len(params['keywords']) > 0 else [None])
+        ]
+        last_searched_dates = get_last_searched_dates(streams)
 
         max_end_date = datetime.strptime(params['end'], DATE_FORMAT)
 
-        if start_date >= max_end_date:
-            print(f'Start date is equal or bigger than maximum defined date: start_date - {start_date}, max_end_date - {max_end_date}')
+        failed_streams = set()
+        batches = schedule_streams(last_searched_dates, max_end_date, STREAM_WORKERS)
+
+        if len(batches) == 0:
+            print(f'Every stream reached the maximum defined date: max_end_date - {max_end_date}')
             return {
                 "statusCode": 200,
                 "body": json.dumps({
@@ -107,64 +337,88 @@ def lambda_handler(event, context):
                 }),
             }
 
-        interval = get_timestamp_interval_for_starting_date(start_date, max_end_date, params['daysPerInterval'])
-
-        print(f'Starting search within {datetime.fromtimestamp(interval[0])} - {datetime.fromtimestamp(interval[1])} date range')
+        longest_round_ms = 0
 
-        count = 0
+        # rounds of the streams furthest behind are gathered while the invocation has time left, at least one per invocation.
+        # Each batch of a round is an interval of streams at the same date, and batches are gathered concurrently
+        while len(batches) > 0 and (len(gathered_intervals) == 0 or has_time_for_interval(context, longest_round_ms)):
+            round_started_at = time.monotonic()
 
-        for subreddit in params['subreddits']:
-            submission_ids = set()
+            with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+                futures = [
+                    executor.submit(
+                        gather_interval, params, subreddits, keywords,
+                        get_timestamp_interval_for_starting_date(start_date, max_end_date, params['daysPerInterval']),
+                        seen_index
+                    )
+                    for start_date, subreddits, keywords in batches
+                ]
+                summaries = [future.result() for future in futures]
 
-            print(f'Searching/gathering inside "{subreddit}" subreddit...')
+            # watermarks are only saved once every document of the round is written,
+            # so an invocation timing out only gathers its last round again
+            flush_writes()
+            if seen_index is not None:
+                seen_index.save()
 
-            if len(params['keywords']) == 0:
-                new_submissions = get_all_submissions_from_intervals(subreddit, interval)
+            advanced_dates = {}
+            for (_, subreddits, keywords), summary in zip(batches, summaries):
+                print(f'{summary["submissions"]} submissions found and collected within {summary["start"]} - {summary["end"]} date range')
 
-                processed_submissions = list(map(lambda submission: get_submission_data_from_pushshift(submission), new_submissions))
-                for submission in processed_submissions:
-                    if submission is not None:
-                        insert_submission(
-                            submission, 
-                            params['submissionsCollection']
-                        )
+                for subreddit in subreddits:
+                    for keyword in keywords:
+                        if subreddit in summary["failedSubreddits"]:
+                            failed_streams.add((subreddit, keyword))
+                        else:
+                            advanced_dates[(subreddit, keyword)] = datetime.fromisoformat(summary["end"])
 
-                count += len(new_submissions)
-            else:
-                for keyword in params['keywords']:
-                    print(f'Searching/gathering for "{keyword}" keyword...')
+            if len(advanced_dates) > 0:
+                save_last_searched_dates(advanced_dates)
 
-                    new_submissions = get_all_submissions_from_intervals(subreddit, interval, keyword)
+            # as in `get_last_searched_dates`, the next interval of each stream starts right after its saved date
+            for stream, last_searched_date in advanced_dates.items():
+                last_searched_dates[stream] = datetime.fromtimestamp(last_searched_date.timestamp() + 1)
 
-                    processed_submissions = list(map(lambda submission: get_submission_data_from_pushshift(submission), new_submissions))
-                    for submission in processed_submissions:
-                        insert_submission(
-                            submission, 
-                            params['submissionsCollection']
-                        )
+            gathered_intervals.extend(summaries)
+            longest_round_ms = max(longest_round_ms, (time.monotonic() - round_started_at) * 1000)
 
-                    count += len(new_submissions)
+            # failed streams are retried by the next invocation
+            batches = schedule_streams(last_searched_dates, max_end_date, STREAM_WORKERS, failed_streams)
 
-        print(f'{count} submissions found and collected with the given keywords ({", ".join(params["keywords"])})')
-
-        last_searched_date = datetime.fromtimestamp(interval[1])
-        save_last_searched_date(last_searched_date)
-
-        print(f'Last searched date saved: {last_searched_date}')
+        print(f'Pushshift requests stats: {pushshift_client.get_stats()}')
 
         return {
             "statusCode": 200,
             "body": json.dumps({
                 "message": "finished successfully!",
+                **get_gathering_summary(gathered_intervals, started_at),
+                "failedStreams": len(failed_streams),
+                "finished": all(date >= max_end_date for date in last_searched_dates.values()),
             }),
         }
     except Exception as e:
         # Send some context about this error to Lambda Logs
         error_message = f'Error gathering posts: {e}'
         print(error_message)
+
+        # the ids of the round may not be written, they are gathered again instead of being skipped as seen
+        if seen_index is not None:
+            seen_index.discard()
+
+        try:
+            flush_writes()
+        except Exception as flush_error:
+            print(f'Error writing buffered documents: {flush_error}')
+
         return {
             "statusCode": 500,
             "body": json.dumps({
                 "message": error_message,
+                **get_gathering_summary(gathered_intervals, started_at),
             }),
         }
+    finally:
+        if flush_timer is not None:
+            flush_timer.cancel()
+
+        log_metrics(os.getenv('LANGUAGE'))
@@ -0,0 +1,62 @@
+"""In-memory stand-in for the boto3 DynamoDB resource of the watermarks table, see `src.db.dynamo`."""
+import threading
+
+
+class FakeBatchWriter:
+    def __init__(self, table):
+        self._table = table
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+    def put_item(self, Item):
+        self._table.put_item(Item=Item)
+
+
+class FakeTable:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.items = {}
+
+
+    def put_item(self, Item):
+        with self._lock:
+            self.items[Item['id']] = dict(Item)
+
+
+    def get_item(self, Key):
+        with self._lock:
+            item = self.items.get(Key['id'])
+        return { 'Item': dict(item) } if item is not None else {}
+
+
+    def batch_writer(self, overwrite_by_pkeys = None):
+        return FakeBatchWriter(self)
+
+
+class FakeDynamoDB:
+    """boto3 DynamoDB resource stand-in, keeping its tables in memory."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = {}
+
+
+    def Table(self, name):
+        with self._lock:
+            return self._tables.setdefault(name, FakeTable(name))
+
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            responses[name] = [table.get_item(key)['Item'] for key in request['Keys'] if 'Item' in table.get_item(key)]
+
+        return { 'Responses': responses, 'UnprocessedKeys': {} }
@@ -0,0 +1,130 @@
+"""In-memory stand-in for the pymongo client, covering the calls made by the gatherer."""
+import threading
+
+
+class FakeCollection:
+    """In-memory collection. Documents with a Reddit `id` are kept by id, the others are only counted."""
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._documents = {}
+        self._indexes = { '_id_': { 'key': [('_id', 1)] } }
+        self.stats = { 'requests': 0, 'written': 0 }
+
+
+    def insert_many(self, documents, ordered = True):
+        with self._lock:
+            self.stats['requests'] += 1
+            for document in documents:
+                self._store(dict(document))
+
+
+    def bulk_write(self, operations, ordered = True):
+        with self._lock:
+            self.stats['requests'] += 1
+            for operation in operations:
+                # pymongo InsertOne, ReplaceOne and UpdateOne operations
+                filter = getattr(operation, '_filter', None)
+                document = operation._doc
+                if filter is None:
+                    self._store(dict(document))
+                elif '$set' in document:
+                    stored_document = self._documents.get(filter.get('id'))
+                    if stored_document is not None:
+                        stored_document.update(document['$set'])
+                        self.stats['written'] += 1
+                else:
+                    self._store({ **document, 'id': filter.get('id') })
+
+
+    def find(self, filter = None, projection = None, batch_size = 0):
+        with self._lock:
+            self.stats['requests'] += 1
+            documents = list(self._documents.values())
+
+        for document in documents:
+            if all(_matches(document.get(key), condition) for key, condition in (filter or {}).items()):
+                yield _project(document, projection)
+
+
+    def count_documents(self, filter):
+        return sum(1 for _ in self.find(filter))
+
+
+    def create_index(self, keys, **options):
+        name = '_'.join(f'{key}_{direction}' for key, direction in keys)
+        with self._lock:
+            self._indexes[name] = { 'key': list(keys), **options }
+        return name
+
+
+    def index_information(self):
+        with self._lock:
+            return dict(self._indexes)
+
+
+    def _store(self, document):
+        self.stats['written'] += 1
+        document_id = document.get('id')
+        if document_id is not None:
+            self._documents[document_id] = document
+
+
+class FakeDatabase:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._collections = {}
+
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self._collections.setdefault(name, FakeCollection(name))
+
+
+    def get_stats(self):
+        """Returns the counters of each collection.
+
+        Returns:
+
+        dict: collection name to its no. of requests and written documents
+        """
+        with self._lock:
+            return { name: dict(collection.stats) for name, collection in self._collections.items() }
+
+
+class FakeMongoClient:
+    """pymongo.MongoClient stand-in, accepting the same constructor arguments. Databases are shared by every
+    client of the process, as they would be on a MongoDB server."""
+    databases = {}
+    _lock = threading.Lock()
+
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self.databases.setdefault(name, FakeDatabase(name))
+
+
+    def close(self):
+        pass
+
+
+def _matches(value, condition):
+    if isinstance(condition, dict) and '$type' in condition:
+        return condition['$type'] == 'string' and isinstance(value, str)
+    if isinstance(condition, dict) and '$in' in condition:
+        return value in condition['$in']
+
+    return value == condition
+
+
+def _project(document, projection):
+    if projection is None:
+        return dict(document)
+
+    included = [key for key, value in projection.items() if value and key != '_id']
+    return { key: document[key] for key in included if key in document }
@@ -0,0 +1,243 @@
+"""Local stand-in for the Pushshift search API, serving synthetic submissions over HTTP.
+
+Subreddits are named `bench<k>`, and each one gets a submission every `86400 / submissions_per_day` seconds.
+Submission ids encode their creation timestamp and subreddit, see `encode_submission_id`, so the fake Reddit
+instances of `benchmarks.fake_reddit` hydrate the same submissions without sharing any state with the server.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+
+SEARCH_PATH = '/reddit/search/submission/'
+
+# subreddit index bits of the submission ids
+SUBREDDIT_BITS = 6
+MAX_SUBREDDITS = 2 ** SUBREDDIT_BITS
+
+BASE_36_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def get_subreddit_name(subreddit_index):
+    return f'bench{subreddit_index}'
+
+
+def get_subreddit_index(subreddit):
+    """Returns the index of a `bench<k>` subreddit, or None for any other subreddit."""
+    if not subreddit.startswith('bench') or not subreddit[len('bench'):].isdigit():
+        return None
+
+    subreddit_index = int(subreddit[len('bench'):])
+    return subreddit_index if subreddit_index < MAX_SUBREDDITS else None
+
+
+def to_base_36(value):
+    digits = ''
+    while True:
+        value, digit = divmod(value, 36)
+        digits = BASE_36_DIGITS[digit] + digits
+        if value == 0:
+            return digits
+
+
+def encode_submission_id(created_utc, subreddit_index):
+    return to_base_36((created_utc << SUBREDDIT_BITS) | subreddit_index)
+
+
+def decode_submission_id(submission_id):
+    """Returns the (created_utc, subreddit index) pair encoded on a synthetic submission id."""
+    value = int(submission_id, 36)
+    return value >> SUBREDDIT_BITS, value & (MAX_SUBREDDITS - 1)
+
+
+def build_pushshift_submission(created_utc, subreddit_index):
+    """Builds the Pushshift JSON of a synthetic submission. One out of ten submissions is removed,
+    and one out of seven has a deleted author."""
+    submission_id = encode_submission_id(created_utc, subreddit_index)
+    subreddit = get_subreddit_name(subreddit_index)
+
+    return {
+        "all_awardings": [],
+        "author": f'user{created_utc % 997}' if created_utc % 7 != 0 else '[deleted]',
+        "author_flair_text": None,
+        "created_utc": created_utc,
+        "full_link": f'https://www.reddit.com/r/{subreddit}/comments/{submission_id}/',
+        "id": submission_id,
+        "is_original_content": False,
+        "is_self": True,
+        "link_flair_text": 'discussion' if created_utc % 3 == 0 else None,
+        "locked": False,
+        "num_comments": created_utc % 50,
+        "over_18": False,
+        "permalink": f'/r/{subreddit}/comments/{submission_id}/',
+        "retrieved_on": created_utc + 3600,
+        "score": created_utc % 1000,
+        "selftext": '[removed]' if created_utc % 10 == 0 else f'what do you think about soccer and nlp? {"lorem ipsum " * (created_utc % 40)}',
+        "spoiler": False,
+        "stickied": False,
+        "subreddit": subreddit,
+        "subreddit_id": f't5_{to_base_36(subreddit_index + 1000)}',
+        "subreddit_subscribers": 100000 + subreddit_index,
+        "title": f'soccer thread {submission_id}',
+        "upvote_ratio": 0.9,
+        "url": f'https://www.reddit.com/r/{subreddit}/comments/{submission_id}/',
+    }
+
+
+class FakePushshiftServer:
+    """Pushshift search API stand-in, on a local HTTP server. Searches are answered in ascending `created_utc`
+    order, with `metadata.total_results`, as the real API does. Every searched keyword matches every submission.
+
+    Parameters:
+
+    submissions_per_day (int) - optional: no. of submissions per subreddit and day
+
+    max_page_size (int) - optional: maximum no. of submissions per page, whatever the requested `size`
+
+    latency (float) - optional: seconds each response is delayed by
+
+    throttle_rate (float) - optional: fraction of requests answered with 429 Too Many Requests
+
+    retry_after (float) - optional: `Retry-After` header of throttled responses, in seconds
+
+    seed (int) - optional: seed of the throttled requests draw
+    """
+    def __init__(self, submissions_per_day = 200, max_page_size = 100, latency = 0.0, throttle_rate = 0.0, retry_after = 0, seed = 42):
+        self.submission_spacing = max(1, 86400 // submissions_per_day)
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = { 'requests': 0, 'throttled': 0, 'submissions': 0 }
+        self._server = None
+        self._thread = None
+
+
+    @property
+    def url(self):
+        """Search URL of the running server, to be used as `PUSHSHIFT_URL`."""
+        return f'http://127.0.0.1:{self._server.server_address[1]}{SEARCH_PATH}'
+
+
+    def start(self):
+        """Starts serving on a free local port, on a background thread."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, as the gatherer reuses its connections
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers, body = server.handle(self.path)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-pushshift', daemon=True)
+        self._thread.start()
+        return self
+
+
+    def stop(self):
+        """Stops the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+    def get_stats(self):
+        """Returns the request counters of the server.
+
+        Returns:
+
+        dict: no. of requests, throttled requests and submissions served
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+    def handle(self, path):
+        """Answers a request path.
+
+        Parameters:
+
+        path (str): request path, with its query string
+
+        Returns:
+
+        tuple: (status code, headers, body bytes)
+        """
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self._stats['requests'] += 1
+            is_throttled = self._random.random() < self.throttle_rate
+            if is_throttled:
+                self._stats['throttled'] += 1
+
+        if is_throttled:
+            return 429, { 'Retry-After': str(self.retry_after) }, b'{"error": "Too Many Requests"}'
+
+        url = urlparse(path)
+        if url.path != SEARCH_PATH:
+            return 404, {}, b'{"error": "Not Found"}'
+
+        params = dict(parse_qsl(url.query))
+        subreddit_indexes = [
+            subreddit_index for subreddit_index in map(get_subreddit_index, params.get('subreddit', '').split(','))
+            if subreddit_index is not None
+        ]
+        # `after` and `before` are exclusive
+        start = int(params.get('after', 0)) + 1
+        end = int(params.get('before', int(time.time()))) - 1
+        size = min(int(params.get('size', 25)), self.max_page_size)
+
+        data, total_results = self.search(subreddit_indexes, start, end, size)
+
+        with self._lock:
+            self._stats['submissions'] += len(data)
+
+        body = { 'data': data }
+        if params.get('metadata') == 'true':
+            body['metadata'] = { 'total_results': total_results }
+        return 200, {}, json.dumps(body).encode('utf-8')
+
+
+    def search(self, subreddit_indexes, start, end, size):
+        """Finds the first `size` submissions of the given subreddits created within [start, end].
+
+        Returns:
+
+        tuple: (list of Pushshift submissions in `created_utc` order, no. of submissions within the range)
+        """
+        timestamps = []
+        total_results = 0
+
+        for subreddit_index in subreddit_indexes:
+            # submissions of each subreddit are spaced evenly, shifted by the subreddit index
+            first = start + (subreddit_index - start) % self.submission_spacing
+            if first > end:
+                continue
+
+            total_results += (end - first) // self.submission_spacing + 1
+            last = min(end, first + (size - 1) * self.submission_spacing)
+            timestamps.extend((created_utc, subreddit_index) for created_utc in range(first, last + 1, self.submission_spacing))
+
+        return [build_pushshift_submission(*timestamp) for timestamp in sorted(timestamps)[:size]], total_results
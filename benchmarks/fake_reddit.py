@@ -0,0 +1,247 @@
+"""Synthetic PRAW Reddit, Submission, Comment, Subreddit and Redditor instances, counting the requests the
+real ones would make, lazy loads included.
+
+Submissions are rebuilt from their ids, see `benchmarks.fake_pushshift`. As with PRAW, submissions returned
+by `info` are loaded, while their `subreddit` and `author` are lazy: reading any other attribute than
+`display_name` or `name` fetches them, one request each. Comment trees are fetched, as a lazy load of their
+submission, on the first access to `comments`, and each expanded MoreComments takes a request.
+"""
+import math
+import threading
+from types import SimpleNamespace
+from benchmarks.fake_pushshift import build_pushshift_submission, decode_submission_id, get_subreddit_name, to_base_36
+
+
+# maximum no. of fullnames per /api/info and /api/user_data_by_account_ids request
+INFO_BATCH_SIZE = 100
+
+
+class RequestCounter:
+    """Thread safe counters of the requests made through fake Reddit instances."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+
+    def increment(self, request, count = 1):
+        with self._lock:
+            self._counts[request] = self._counts.get(request, 0) + count
+
+
+    def get_counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class LazyObject:
+    """PRAW lazy object: attributes missing from the loaded data are fetched, once, on first access."""
+    def __init__(self, reddit, kind, data, fetch = None):
+        self.__dict__.update(data)
+        self._reddit = reddit
+        self._kind = kind
+        self._fetch = fetch
+
+
+    def __getattr__(self, name):
+        fetch = self.__dict__.get('_fetch')
+        if name.startswith('_') or fetch is None:
+            raise AttributeError(name)
+
+        self._fetch = None
+        self._reddit.requests.increment(f'lazy_{self._kind}')
+        self.__dict__.update(fetch())
+
+        if name not in self.__dict__:
+            raise AttributeError(name)
+        return self.__dict__[name]
+
+
+class FakeCommentForest:
+    def __init__(self, submission, comments, more_comments):
+        self._submission = submission
+        self._comments = comments
+        self._more_comments = more_comments
+
+
+    def replace_more(self, limit = 32):
+        """Expands up to `limit` MoreComments, one request each, and returns the ones left."""
+        expanded = len(self._more_comments) if limit is None else min(limit, len(self._more_comments))
+        for more_comments in self._more_comments[:expanded]:
+            self._submission._reddit.requests.increment('more_comments')
+            self._comments.extend(more_comments.load())
+
+        self._more_comments = self._more_comments[expanded:]
+        return list(self._more_comments)
+
+
+    def list(self):
+        return list(self._comments)
+
+
+class FakeReddit:
+    """praw.Reddit stand-in, accepting the same constructor arguments. Requests are counted on the class `requests`
+    counter, and comment trees are shaped by the class attributes, since the gatherer creates its own instances:
+    `comments_per_submission` comments on the first page, plus `more_comments_per_submission` MoreComments
+    loading `comments_per_more_comments` comments each.
+    """
+    requests = RequestCounter()
+
+    comments_per_submission = 5
+    more_comments_per_submission = 1
+    comments_per_more_comments = 5
+
+
+    def __init__(self, *args, **kwargs):
+        self.redditors = SimpleNamespace(partial_redditors=self._partial_redditors)
+
+
+    def info(self, fullnames = None):
+        """Returns the submissions of `t3_` fullnames, one request per 100 of them.
+        One out of fifty submissions is missing, as deleted submissions are."""
+        fullnames = list(fullnames)
+        self.requests.increment('info', math.ceil(len(fullnames) / INFO_BATCH_SIZE))
+
+        for fullname in fullnames:
+            submission_id = fullname[len('t3_'):]
+            created_utc, subreddit_index = decode_submission_id(submission_id)
+            if created_utc % 50 != 0:
+                yield self._build_submission(created_utc, subreddit_index)
+
+
+    def submission(self, id):
+        """Returns a lazy submission, whose data and comment tree are fetched, in a single request, on first access."""
+        created_utc, subreddit_index = decode_submission_id(id)
+        submission = self._build_submission(created_utc, subreddit_index)
+        loaded_data = { key: value for key, value in submission.__dict__.items() if not key.startswith('_') }
+        fetch_comments = submission._fetch
+
+        def fetch():
+            # the comment tree is built from the submission data
+            submission.__dict__.update(loaded_data)
+            return fetch_comments()
+
+        for key in loaded_data:
+            if key != 'id':
+                del submission.__dict__[key]
+        submission._fetch = fetch
+        return submission
+
+
+    def subreddit(self, display_name):
+        return self._build_subreddit(display_name)
+
+
+    def _partial_redditors(self, fullnames):
+        fullnames = list(fullnames)
+        self.requests.increment('partial_redditors', math.ceil(len(fullnames) / INFO_BATCH_SIZE))
+
+        return [
+            SimpleNamespace(fullname=fullname, name=f'user{int(fullname[len("t2_"):], 36) - 1000}', comment_karma=10, created_utc=1262304000, link_karma=5)
+            for fullname in fullnames
+        ]
+
+
+    def _build_submission(self, created_utc, subreddit_index):
+        raw = build_pushshift_submission(created_utc, subreddit_index)
+        author_data = self._get_author_data(raw['author'])
+
+        submission = LazyObject(self, 'submission', {
+            key: value for key, value in raw.items() if key not in ['author', 'subreddit', 'subreddit_id']
+        })
+        submission.__dict__.update({
+            'author': self._build_redditor(author_data) if author_data is not None else None,
+            'clicked': False,
+            'distinguished': None,
+            'edited': False,
+            'link_flair_template_id': None,
+            'name': f't3_{raw["id"]}',
+            'subreddit': self._build_subreddit(raw['subreddit']),
+            'subreddit_id': raw['subreddit_id'],
+        })
+        if author_data is not None:
+            submission.__dict__['author_fullname'] = author_data['fullname']
+
+        # the comment tree is only requested on first access, as PRAW does
+        reddit = self
+        def fetch_comments():
+            return { 'comments': reddit._build_comment_forest(submission) }
+        submission._fetch = fetch_comments
+
+        return submission
+
+
+    def _build_comment_forest(self, submission):
+        comments = [self._build_comment(submission, i) for i in range(self.comments_per_submission)]
+        more_comments = [
+            SimpleNamespace(count=self.comments_per_more_comments, load=lambda j=j: [
+                self._build_comment(submission, self.comments_per_submission + j * self.comments_per_more_comments + i, depth=1)
+                for i in range(self.comments_per_more_comments)
+            ])
+            for j in range(self.more_comments_per_submission)
+        ]
+        return FakeCommentForest(submission, comments, more_comments)
+
+
+    def _build_comment(self, submission, position, depth = 0):
+        created_utc, subreddit_index = decode_submission_id(submission.id)
+        comment_id = to_base_36(int(submission.id, 36) * 1000 + position)
+        author_data = self._get_author_data(f'user{(created_utc + position) % 997}' if position % 9 != 0 else '[deleted]')
+
+        comment = LazyObject(self, 'comment', {
+            'author': self._build_redditor(author_data) if author_data is not None else None,
+            'body': '[deleted]' if position % 11 == 0 else f'comment {position} about soccer',
+            'created_utc': created_utc + 60 * (position + 1),
+            'depth': depth,
+            'distinguished': None,
+            'edited': False,
+            'id': comment_id,
+            'is_submitter': position % 5 == 0,
+            'link_id': f't3_{submission.id}',
+            'parent_id': f't3_{submission.id}' if depth == 0 else f't1_{to_base_36(int(submission.id, 36) * 1000)}',
+            'permalink': f'{submission.permalink}{comment_id}/',
+            'score': position,
+            'stickied': False,
+            'submission': submission,
+            'subreddit': self._build_subreddit(get_subreddit_name(subreddit_index)),
+            'subreddit_id': submission.subreddit_id,
+        })
+        if author_data is not None:
+            comment.__dict__['author_fullname'] = author_data['fullname']
+
+        return comment
+
+
+    def _build_subreddit(self, display_name):
+        return LazyObject(self, 'subreddit', { 'display_name': display_name }, lambda: {
+            'can_assign_link_flair': True,
+            'can_assign_user_flair': False,
+            'created_utc': 1200000000,
+            'description': f'{display_name} description',
+            'description_html': f'<p>{display_name} description</p>',
+            'id': to_base_36(sum(map(ord, display_name)) + 1000),
+            'name': f't5_{to_base_36(sum(map(ord, display_name)) + 1000)}',
+            'over18': False,
+            'public_description': f'{display_name} public description',
+            'spoilers_enabled': True,
+            'subscribers': 100000,
+        })
+
+
+    def _get_author_data(self, name):
+        if name == '[deleted]':
+            return None
+
+        user_id = to_base_36(int(name[len('user'):]) + 1000)
+        return { 'name': name, 'fullname': f't2_{user_id}', 'id': user_id }
+
+
+    def _build_redditor(self, author_data):
+        return LazyObject(self, 'redditor', { 'name': author_data['name'] }, lambda: {
+            'id': author_data['id'],
+            'comment_karma': 10,
+            'created_utc': 1262304000,
+            'has_verified_email': True,
+            'is_employee': False,
+            'is_mod': False,
+            'is_suspended': False,
+        })
@@ -0,0 +1,377 @@
+"""Offline end to end benchmark of the gathering flows.
+
+Runs the real `pushshift_main.py`, `main.py` and `app.lambda_handler` flows, each on a fresh interpreter, against
+local stand-ins: a Pushshift HTTP server with configurable latency, page size and throttling, see
+`benchmarks.fake_pushshift`, synthetic PRAW instances counting their requests, lazy loads included, see
+`benchmarks.fake_reddit`, and in-memory MongoDB and DynamoDB. Reports documents written per second, API requests
+per document and peak RSS of each flow.
+
+Results are appended to a JSON Lines file, along with the git revision, and compared with the previous result
+of the same flow and scenario. With `--max-regression`, exits with an error when a flow got slower, made more
+requests per document or used more memory by more than the given fraction.
+
+Usage:
+
+python -m benchmarks.flow_benchmark [--flows pushshift praw lambda] [--subreddits 4] [--days 2] [--submissions-per-day 500]
+    [--page-size 100] [--latency-ms 5] [--throttle-rate 0.02] [--max-regression 0.2]
+"""
+import argparse
+import json
+import os
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from benchmarks.fake_pushshift import FakePushshiftServer, get_subreddit_name
+
+
+REPO_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FLOWS = ['pushshift', 'praw', 'lambda']
+
+FLOW_SCRIPTS = {
+    'pushshift': 'pushshift_main.py',
+    'praw': 'main.py',
+}
+
+DEFAULT_RESULTS_PATH = os.path.join(REPO_DIRECTORY, 'benchmarks', 'results', 'flow_benchmark.jsonl')
+
+START_DATE = datetime(2021, 1, 1)
+KEYWORDS = ['soccer', 'nlp']
+
+# environment of the flows: every request goes to the stand-ins, as fast as they answer
+BENCHMARK_ENV = {
+    'MONGODB_URL': 'mongodb://benchmark',
+    'MONGO_DATABASE': 'reddit-posts-gatherer-benchmark',
+    'SINK': 'mongo',
+    'WRITE_MODE': 'upsert',
+    'LAST_SEARCHED_DATE_TABLE': 'reddit-posts-gatherer-benchmark-last-searched-date-table',
+    'LANGUAGE': 'benchmark',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'PUSHSHIFT_REQUESTS_PER_SECOND': '1000000',
+    'PUSHSHIFT_BURST_SIZE': '1000',
+    'PUSHSHIFT_MAX_RETRIES': '20',
+}
+
+
+class FakeLambdaContext:
+    def __init__(self, timeout_ms = 900000):
+        self._deadline = time.monotonic() + timeout_ms / 1000
+
+
+    def get_remaining_time_in_millis(self):
+        return int((self._deadline - time.monotonic()) * 1000)
+
+
+def get_flow_arguments(flow, scenario):
+    end_date = START_DATE + timedelta(days=scenario['days'])
+    return [
+        '--subreddits', *[get_subreddit_name(i) for i in range(scenario['subreddits'])],
+        '--keywords', *KEYWORDS,
+        '--start', START_DATE.strftime('%Y-%m-%d'),
+        '--end', end_date.strftime('%Y-%m-%d'),
+        '--daysPerInterval', str(scenario['days_per_interval']),
+    ] + ([
+        '--saveComments', '1',
+        '--saveSubreddits', '1',
+        # the configuration tracked by the previous results, authors resolved in bulk
+        '--bulkAuthors',
+    ] if flow == 'praw' else [])
+
+
+def get_lambda_env(scenario):
+    end_date = START_DATE + timedelta(days=scenario['days'])
+    return {
+        'SUBREDDITS': ' '.join(get_subreddit_name(i) for i in range(scenario['subreddits'])),
+        'SEARCH_KEYWORDS': '_'.join(KEYWORDS),
+        'START_DATE': START_DATE.strftime('%Y-%m-%d'),
+        'END_DATE': end_date.strftime('%Y-%m-%d'),
+        'SAVE_COMMENTS': '0',
+        'SAVE_SUBREDDITS': '0',
+        'DAYS_PER_INTERVAL': str(max(1, int(scenario['days_per_interval']))),
+    }
+
+
+def run_flow(flow, scenario, pushshift_url):
+    """Runs a flow on the current interpreter, with every stand-in installed. Called on the fresh
+    interpreter started by `measure_flow`.
+
+    Parameters:
+
+    flow (str): `pushshift`, `praw` or `lambda`
+
+    scenario (dict): benchmark scenario, see `get_scenario`
+
+    pushshift_url (str): search URL of the fake Pushshift server
+
+    Returns:
+
+    dict: seconds spent, requests made to Reddit, requests and documents written per collection, and peak RSS in MB
+    """
+    import praw
+    import pymongo
+    from benchmarks.fake_dynamo import FakeDynamoDB
+    from benchmarks.fake_mongo import FakeMongoClient
+    from benchmarks.fake_reddit import FakeReddit
+
+    pymongo.MongoClient = FakeMongoClient
+    praw.Reddit = FakeReddit
+    FakeReddit.comments_per_submission = scenario['comments_per_submission']
+    FakeReddit.more_comments_per_submission = scenario['more_comments_per_submission']
+
+    from src.db import dynamo
+    from src.integrations import pushshift
+    dynamo._dynamodb = FakeDynamoDB()
+    pushshift.PUSHSHIFT_URL = pushshift_url
+
+    started_at = time.perf_counter()
+
+    if flow == 'lambda':
+        import app
+        response = app.lambda_handler({}, FakeLambdaContext())
+        if response['statusCode'] != 200:
+            raise Exception(f'Lambda flow failed: {response["body"]}')
+    else:
+        script = os.path.join(REPO_DIRECTORY, FLOW_SCRIPTS[flow])
+        sys.argv = [script] + get_flow_arguments(flow, scenario)
+        runpy.run_path(script, run_name='__main__')
+
+    seconds = time.perf_counter() - started_at
+
+    # kilobytes on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+
+    return {
+        'seconds': seconds,
+        'reddit_requests': FakeReddit.requests.get_counts(),
+        'collections': FakeMongoClient.databases[BENCHMARK_ENV['MONGO_DATABASE']].get_stats()
+            if BENCHMARK_ENV['MONGO_DATABASE'] in FakeMongoClient.databases else {},
+        'peak_rss_mb': peak_rss_mb,
+    }
+
+
+def measure_flow(flow, scenario, server, verbose = False):
+    """Runs a flow on a fresh interpreter, on a temporary working directory, and measures it.
+
+    Parameters:
+
+    flow (str): `pushshift`, `praw` or `lambda`
+
+    scenario (dict): benchmark scenario, see `get_scenario`
+
+    server (FakePushshiftServer): running fake Pushshift server
+
+    verbose (bool) - optional: whether the flow output is shown
+
+    Returns:
+
+    dict: flow metrics, see `get_metrics`
+    """
+    pushshift_stats = server.get_stats()
+
+    with tempfile.TemporaryDirectory() as directory:
+        result_path = os.path.join(directory, 'result.json')
+        env = {
+            **os.environ,
+            **BENCHMARK_ENV,
+            **(get_lambda_env(scenario) if flow == 'lambda' else {}),
+            'PYTHONPATH': REPO_DIRECTORY,
+        }
+
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.flow_benchmark', '--run-flow', flow,
+                '--scenario', json.dumps(scenario), '--pushshift-url', server.url, '--result-path', result_path],
+            cwd=directory, env=env, check=True,
+            stdout=None if verbose else subprocess.DEVNULL, stderr=None if verbose else subprocess.DEVNULL
+        )
+
+        with open(result_path) as file:
+            result = json.load(file)
+
+    pushshift_requests = { key: value - pushshift_stats[key] for key, value in server.get_stats().items() }
+    return get_metrics(result, pushshift_requests)
+
+
+def get_metrics(result, pushshift_requests):
+    """Summarizes the measures of a flow.
+
+    Parameters:
+
+    result (dict): measures of the flow, see `run_flow`
+
+    pushshift_requests (dict): no. of requests, throttled requests and submissions served by the fake Pushshift server
+
+    Returns:
+
+    dict: documents written, documents per second, API requests per document, database requests and peak RSS
+    """
+    documents = sum(collection['written'] for collection in result['collections'].values())
+    reddit_requests = sum(result['reddit_requests'].values())
+    api_requests = pushshift_requests['requests'] + reddit_requests
+
+    return {
+        'seconds': round(result['seconds'], 3),
+        'documents': documents,
+        'documents_per_second': round(documents / result['seconds'], 1) if result['seconds'] > 0 else None,
+        'pushshift_requests': pushshift_requests['requests'],
+        'throttled_requests': pushshift_requests['throttled'],
+        'reddit_requests': result['reddit_requests'],
+        'requests_per_document': round(api_requests / documents, 4) if documents > 0 else None,
+        'database_requests': sum(collection['requests'] for collection in result['collections'].values()),
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+    }
+
+
+def get_scenario(args):
+    return {
+        'subreddits': args.subreddits,
+        'days': args.days,
+        'days_per_interval': args.days_per_interval,
+        'submissions_per_day': args.submissions_per_day,
+        'page_size': args.page_size,
+        'latency_ms': args.latency_ms,
+        'throttle_rate': args.throttle_rate,
+        'comments_per_submission': args.comments,
+        'more_comments_per_submission': args.more_comments,
+    }
+
+
+def get_revision():
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIRECTORY, capture_output=True, text=True, check=True)
+        return completed.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip() != '']
+
+
+def save_results(path, records):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as file:
+        for record in records:
+            file.write(json.dumps(record) + '\n')
+
+
+def get_regressions(metrics, previous_metrics, max_regression):
+    """Compares the metrics of a flow with the previous ones.
+
+    Returns:
+
+    list of str: metrics worse than the previous ones by more than `max_regression`, as a fraction
+    """
+    regressions = []
+    for name, higher_is_better in [('documents_per_second', True), ('requests_per_document', False), ('peak_rss_mb', False)]:
+        value, previous_value = metrics.get(name), previous_metrics.get(name)
+        if value is None or not previous_value:
+            continue
+
+        change = (value - previous_value) / previous_value
+        if (-change if higher_is_better else change) > max_regression:
+            regressions.append(f'{name} {previous_value} -> {value} ({change:+.1%})')
+
+    return regressions
+
+
+def print_metrics(flow, metrics, previous_record):
+    print(f'{flow}:')
+    print(f'  {metrics["documents"]} documents in {metrics["seconds"]} s: {metrics["documents_per_second"]} documents/s')
+    print(f'  {metrics["requests_per_document"]} API requests/document: {metrics["pushshift_requests"]} Pushshift '
+        f'({metrics["throttled_requests"]} throttled), Reddit {metrics["reddit_requests"]}')
+    print(f'  {metrics["database_requests"]} database requests, peak RSS {metrics["peak_rss_mb"]} MB')
+
+    if previous_record is not None:
+        previous_metrics = previous_record['metrics']
+        changes = [
+            f'{name} {(metrics[name] - previous_metrics[name]) / previous_metrics[name]:+.1%}'
+            for name in ['documents_per_second', 'requests_per_document', 'peak_rss_mb']
+            if metrics.get(name) is not None and previous_metrics.get(name)
+        ]
+        print(f'  since {previous_record["revision"]} ({previous_record["date"]}): {", ".join(changes)}')
+
+
+def run(flows, scenario, results_path, save, max_regression, verbose):
+    server = FakePushshiftServer(
+        submissions_per_day=scenario['submissions_per_day'],
+        max_page_size=scenario['page_size'],
+        latency=scenario['latency_ms'] / 1000,
+        throttle_rate=scenario['throttle_rate'],
+    ).start()
+
+    previous_results = load_results(results_path)
+    revision = get_revision()
+    records = []
+    regressions = []
+
+    print(f'scenario: {scenario}')
+    try:
+        for flow in flows:
+            metrics = measure_flow(flow, scenario, server, verbose)
+            previous_record = next((
+                record for record in reversed(previous_results) if record['flow'] == flow and record['scenario'] == scenario
+            ), None)
+
+            print_metrics(flow, metrics, previous_record)
+            records.append({ 'date': datetime.now().isoformat(timespec='seconds'), 'revision': revision, 'flow': flow, 'scenario': scenario, 'metrics': metrics })
+
+            if previous_record is not None and max_regression is not None:
+                regressions.extend(f'{flow}: {regression}' for regression in get_regressions(metrics, previous_record['metrics'], max_regression))
+    finally:
+        server.stop()
+
+    if save:
+        save_results(results_path, records)
+        print(f'results saved on {results_path}')
+
+    if len(regressions) > 0:
+        print('regressions:')
+        for regression in regressions:
+            print(f'  {regression}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the gathering flows against local stand-ins of Pushshift, Reddit and the databases.')
+    parser.add_argument('--flows', nargs='+', choices=FLOWS, help='flows to benchmark', required=False, default=FLOWS)
+    parser.add_argument('--subreddits', type=int, help='no. of searched subreddits', required=False, default=4)
+    parser.add_argument('--days', type=int, help='no. of searched days', required=False, default=2)
+    parser.add_argument('--days-per-interval', type=float, help='no. of days per search interval', required=False, default=1)
+    parser.add_argument('--submissions-per-day', type=int, help='no. of submissions per subreddit and day', required=False, default=500)
+    parser.add_argument('--page-size', type=int, help='maximum no. of submissions per Pushshift page', required=False, default=100)
+    parser.add_argument('--latency-ms', type=float, help='latency of every Pushshift response, in milliseconds', required=False, default=5)
+    parser.add_argument('--throttle-rate', type=float, help='fraction of Pushshift requests answered with 429', required=False, default=0.02)
+    parser.add_argument('--comments', type=int, help='no. of comments on the first page of every comment tree', required=False, default=5)
+    parser.add_argument('--more-comments', type=int, help='no. of "load more comments" on every comment tree', required=False, default=1)
+    parser.add_argument('--results', type=str, help='JSON Lines file where results are appended', required=False, default=DEFAULT_RESULTS_PATH)
+    parser.add_argument('--no-save', action='store_true', help='do not append the results')
+    parser.add_argument('--max-regression', type=float, help='fraction a metric may get worse by, since the previous results', required=False, default=None)
+    parser.add_argument('--verbose', action='store_true', help='show the output of the flows')
+    # used by `measure_flow`, to run a flow on a fresh interpreter
+    parser.add_argument('--run-flow', type=str, choices=FLOWS, help=argparse.SUPPRESS)
+    parser.add_argument('--scenario', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--pushshift-url', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--result-path', type=str, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run_flow is not None:
+        result = run_flow(args.run_flow, json.loads(args.scenario), args.pushshift_url)
+        with open(args.result_path, 'w') as file:
+            json.dump(result, file)
+        # the flows left their atexit handlers, e.g. final flushes, to run
+        sys.exit(0)
+
+    if args.subreddits > 64:
+        parser.error('--subreddits can be at most 64')
+
+    run(args.flows, get_scenario(args), args.results, not args.no_save, args.max_regression, args.verbose)
@@ -0,0 +1,99 @@
+"""Lambda cold start import time benchmark.
+
+Imports the handler module on fresh interpreters with `python -X importtime` and reports the import time
+it adds on top of the interpreter startup, along with the slowest packages it pulls in. Exits with an error
+when the handler imports a package that should only be imported on first use, see `DEFERRED_PACKAGES`, or,
+with `--max-ms`, when the import time goes over the budget, so regressions can be tracked.
+
+Usage:
+
+python -m benchmarks.import_benchmark [--module app] [--repeat 5] [--top 10] [--max-ms 200]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+# the handler environment, so modules reading it at import time behave as on Lambda
+LAMBDA_ENV = {
+    'MONGO_DATABASE': 'reddit-posts-gatherer-benchmark',
+    'LAST_SEARCHED_DATE_TABLE': 'reddit-posts-gatherer-benchmark-last-searched-date-table',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+}
+
+# packages imported on first use, e.g. pymongo by `get_mongo_db` and `BulkWriter`, never by importing the handler
+DEFERRED_PACKAGES = ['pymongo', 'bson']
+
+
+def measure_import(module):
+    """Imports a module on a fresh interpreter, with `-X importtime`.
+
+    Parameters:
+
+    module (str): module to be imported
+
+    Returns:
+
+    list of tuples: (name, nesting depth, cumulative import time in microseconds) of every import, in import order
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        env={ **LAMBDA_ENV, **os.environ }, capture_output=True, text=True, check=True
+    )
+
+    # lines are `import time: self [us] | cumulative | name`, nested imports indented by 2 spaces per level
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((name.strip(), (len(name) - len(name.lstrip(' ')) - 1) // 2, int(cumulative)))
+
+    return imports
+
+
+def run(module, repeat, top, max_ms):
+    runs = [measure_import(module) for _ in range(repeat)]
+    module_ms = statistics.median(
+        cumulative for imports in runs for name, depth, cumulative in imports if name == module and depth == 0
+    ) / 1000
+
+    print(f'import {module}: {module_ms:.1f} ms, median of {repeat} runs')
+
+    # the module imports are the ones reported before it, the interpreter startup ones (e.g. `site`) come before them
+    imports = runs[-1]
+    module_index = next(i for i, (name, depth, _) in enumerate(imports) if name == module and depth == 0)
+    first_index = module_index
+    while first_index > 0 and imports[first_index - 1][1] > 0:
+        first_index -= 1
+
+    packages = [(cumulative / 1000, name) for name, depth, cumulative in imports[first_index:module_index] if depth in [1, 2]]
+
+    print('slowest imports:')
+    for cumulative_ms, name in sorted(packages, reverse=True)[:top]:
+        print(f'  {name:<50} {cumulative_ms:>8.1f} ms')
+
+    deferred_packages = sorted(set(
+        name.split('.')[0] for name, _, _ in imports[first_index:module_index] if name.split('.')[0] in DEFERRED_PACKAGES
+    ))
+    if len(deferred_packages) > 0:
+        print(f'import {module} imports {", ".join(deferred_packages)}, which should only be imported on first use')
+        sys.exit(1)
+
+    if max_ms is not None and module_ms > max_ms:
+        print(f'import {module} takes {module_ms:.1f} ms, over the {max_ms} ms budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the import time of the Lambda handler module.')
+    parser.add_argument('--module', type=str, help='module to import', required=False, default='app')
+    parser.add_argument('--repeat', type=int, help='no. of fresh interpreters, the median is reported', required=False, default=5)
+    parser.add_argument('--top', type=int, help='no. of slowest imports reported', required=False, default=10)
+    parser.add_argument('--max-ms', type=float, help='import time budget, in milliseconds', required=False, default=None)
+
+    args = parser.parse_args()
+    run(args.module, args.repeat, args.top, args.max_ms)
@@ -0,0 +1,188 @@
+"""Parser throughput micro-benchmark.
+
+Compares the records per second of the precompiled extractors of `src.parsers.reddit_parser`
+against the previous hasattr/getattr based parsers, kept below as reference, on synthetic records.
+Outputs are checked to be identical before timing.
+
+Usage:
+
+python -m benchmarks.parser_benchmark [--records 100000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from src.parsers import reddit_parser
+
+
+def reference_get_submission_data_from_pushshift(raw_submission):
+    if (not 'selftext' in raw_submission) or ('selftext' in raw_submission and raw_submission["selftext"] == "") or \
+        ('selftext' in raw_submission and raw_submission["selftext"] is not None and raw_submission["selftext"].strip() == "") or \
+            raw_submission["selftext"] == "[deleted]" or raw_submission["selftext"] == "[removed]":
+        return None
+
+    date = datetime.fromtimestamp(raw_submission["created_utc"]) if 'created_utc' in raw_submission else None
+
+    return {
+        "author": raw_submission["author"] if 'author' in raw_submission else None,
+        "created_utc": raw_submission["created_utc"] if 'created_utc' in raw_submission else None,
+        "date": date.strftime('%Y-%m-%d %H:%M:%S') if date is not None else None,
+        "id": raw_submission["id"] if 'id' in raw_submission else None,
+        # no search keywords are set, see `reddit_parser.set_search_keywords`
+        "keywords": None,
+        "is_original_content": raw_submission["is_original_content"] if 'is_original_content' in raw_submission else None,
+        "is_text_only": raw_submission["is_self"] if 'is_self' in raw_submission else None,
+        "locked": raw_submission["locked"] if 'locked' in raw_submission else None,
+        "num_comments": raw_submission["num_comments"] if 'num_comments' in raw_submission else None,
+        "over_18": raw_submission["over_18"] if 'over_18' in raw_submission else None,
+        "permalink": raw_submission["permalink"] if 'permalink' in raw_submission else None,
+        "score": raw_submission["score"] if 'score' in raw_submission else None,
+        "body": raw_submission["selftext"] if 'selftext' in raw_submission else None,
+        "spoiler": raw_submission["spoiler"] if 'spoiler' in raw_submission else None,
+        "stickied": raw_submission["stickied"] if 'stickied' in raw_submission else None,
+        "subreddit_id": raw_submission["subreddit_id"] if 'subreddit_id' in raw_submission else None,
+        "subreddit_name": raw_submission["subreddit"] if 'subreddit' in raw_submission else None,
+        "title": raw_submission["title"] if 'title' in raw_submission else None,
+        "upvote_ratio": raw_submission["upvote_ratio"] if 'upvote_ratio' in raw_submission else None,
+        "url": raw_submission["url"] if 'url' in raw_submission else None
+    }
+
+
+def reference_get_submission_data(raw_submission):
+    if raw_submission.selftext == "" or \
+        (hasattr(raw_submission, 'selftext') and raw_submission.selftext != None and raw_submission.selftext.strip() == "") or \
+            raw_submission.selftext == "[deleted]" or raw_submission.selftext == "[removed]":
+        return None
+
+    author = reddit_parser.get_author_data(raw_submission.author)
+    date = datetime.fromtimestamp(raw_submission.created_utc) if hasattr(raw_submission, 'created_utc') else None
+    has_subreddit = hasattr(raw_submission, 'subreddit')
+
+    return {
+        "author": author,
+        "clicked": raw_submission.clicked if hasattr(raw_submission, 'clicked') else None,
+        "created_utc": raw_submission.created_utc if hasattr(raw_submission, 'created_utc') else None,
+        "date": date.strftime('%Y-%m-%d %H:%M:%S') if date is not None else None,
+        "distinguished": raw_submission.distinguished if hasattr(raw_submission, 'distinguished') else None,
+        "edited": raw_submission.edited if hasattr(raw_submission, 'edited') else None,
+        "id": raw_submission.id if hasattr(raw_submission, 'id') else None,
+        "keywords": None,
+        "is_original_content": raw_submission.is_original_content if hasattr(raw_submission, 'is_original_content') else None,
+        "is_text_only": raw_submission.is_self if hasattr(raw_submission, 'is_self') else None,
+        "link_flair_template_id": raw_submission.link_flair_template_id if hasattr(raw_submission, 'link_flair_template_id') else None,
+        "link_flair_text": raw_submission.link_flair_text if hasattr(raw_submission, 'link_flair_text') else None,
+        "locked": raw_submission.locked if hasattr(raw_submission, 'locked') else None,
+        "name": raw_submission.name if hasattr(raw_submission, 'name') else None,
+        "num_comments": raw_submission.num_comments if hasattr(raw_submission, 'num_comments') else None,
+        "over_18": raw_submission.over_18 if hasattr(raw_submission, 'over_18') else None,
+        "permalink": raw_submission.permalink if hasattr(raw_submission, 'permalink') else None,
+        "score": raw_submission.score if hasattr(raw_submission, 'score') else None,
+        "body": raw_submission.selftext if hasattr(raw_submission, 'selftext') else None,
+        "spoiler": raw_submission.spoiler if hasattr(raw_submission, 'spoiler') else None,
+        "stickied": raw_submission.stickied if hasattr(raw_submission, 'stickied') else None,
+        "subreddit_id": raw_submission.subreddit.id if has_subreddit and hasattr(raw_submission.subreddit, 'id') else None,
+        "subreddit_name": raw_submission.subreddit.name if has_subreddit and hasattr(raw_submission.subreddit, 'name') else None,
+        "title": raw_submission.title if hasattr(raw_submission, 'title') else None,
+        "upvote_ratio": raw_submission.upvote_ratio if hasattr(raw_submission, 'upvote_ratio') else None,
+        "url": raw_submission.url if hasattr(raw_submission, 'url') else None
+    }
+
+
+def build_pushshift_submissions(count, seed = 42):
+    generator = random.Random(seed)
+    submissions = []
+
+    for i in range(count):
+        submission = {
+            "author": f'user{generator.randint(0, 1000)}',
+            "created_utc": 1577836800 + i,
+            "id": f'{i:x}',
+            "is_original_content": False,
+            "is_self": True,
+            "locked": False,
+            "num_comments": generator.randint(0, 500),
+            "over_18": False,
+            "permalink": f'/r/sports/comments/{i:x}/',
+            "score": generator.randint(0, 10000),
+            "selftext": generator.choice(['some text about soccer', '', '[removed]', 'a longer body ' * 20]),
+            "spoiler": False,
+            "stickied": False,
+            "subreddit_id": 't5_2qgzy',
+            "subreddit": 'sports',
+            "title": f'title {i}',
+            "url": f'https://www.reddit.com/r/sports/comments/{i:x}/',
+        }
+        # Pushshift records often miss some fields
+        if generator.random() < 0.5:
+            del submission["url"]
+        submissions.append(submission)
+
+    return submissions
+
+
+def build_praw_submissions(count, seed = 42):
+    subreddit = SimpleNamespace(id='2qgzy', name='t5_2qgzy')
+    return [
+        SimpleNamespace(author=None, subreddit=subreddit, **{
+            key: value for key, value in submission.items() if key not in ['author', 'subreddit']
+        }, name=f't3_{submission["id"]}', upvote_ratio=0.9)
+        for submission in build_pushshift_submissions(count, seed)
+    ]
+
+
+def measure(function, records, repeat):
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function(records)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+
+    return len(records) / best
+
+
+def run(records, repeat):
+    pushshift_submissions = build_pushshift_submissions(records)
+    praw_submissions = build_praw_submissions(records)
+
+    cases = [
+        (
+            'pushshift submissions',
+            pushshift_submissions,
+            lambda page: [s for s in map(reference_get_submission_data_from_pushshift, page) if s is not None],
+            lambda page: [s for s in map(reddit_parser.get_submission_data_from_pushshift, page) if s is not None],
+            reddit_parser.get_submissions_data_from_pushshift,
+        ),
+        (
+            'praw submissions',
+            praw_submissions,
+            lambda page: [s for s in map(reference_get_submission_data, page) if s is not None],
+            lambda page: [s for s in map(reddit_parser.get_submission_data, page) if s is not None],
+            reddit_parser.get_submissions_data,
+        ),
+    ]
+
+    print(f'{records} records, best of {repeat} runs')
+    for name, page, reference, single, batch in cases:
+        expected = reference(page)
+        if single(page) != expected or batch(page) != expected:
+            raise Exception(f'Parsed {name} differ from the reference parser')
+
+        reference_rate = measure(reference, page, repeat)
+        single_rate = measure(single, page, repeat)
+        batch_rate = measure(batch, page, repeat)
+
+        print(f'{name}:')
+        print(f'  before (hasattr/getattr): {reference_rate:>12,.0f} records/s')
+        print(f'  after (per record):       {single_rate:>12,.0f} records/s ({single_rate / reference_rate:.2f}x)')
+        print(f'  after (batch):            {batch_rate:>12,.0f} records/s ({batch_rate / reference_rate:.2f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Reddit/Pushshift parsers throughput.')
+    parser.add_argument('--records', type=int, help='no. of synthetic records', required=False, default=100000)
+    parser.add_argument('--repeat', type=int, help='no. of timed runs, the best one is reported', required=False, default=3)
+
+    args = parser.parse_args()
+    run(args.records, args.repeat)
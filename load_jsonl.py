@@ -0,0 +1,50 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import os
+from src.services.reddit_service import get_sink, close_writes, ensure_indexes, set_write_mode, set_sink, SINKS
+from src.services.jsonl_writer import list_jsonl_files, read_jsonl
+
+
+parser = argparse.ArgumentParser(description='Load the JSON Lines files written by the jsonl sink into MongoDB, or convert them to Parquet.')
+
+parser.add_argument('--sinkPath', type=str, help='directory of the JSON Lines files', required=False, default=os.getenv('SINK_PATH', 'output'))
+parser.add_argument('--collections', nargs='+', help='collections to load, every collection directory by default', required=False, default=None)
+parser.add_argument('--sink', type=str, choices=[sink for sink in SINKS if sink != 'jsonl'], help='load into MongoDB or convert to partitioned Parquet files', required=False, default='mongo')
+parser.add_argument('--outputPath', type=str, help='directory of the Parquet files', required=False, default='parquet')
+parser.add_argument('--writeMode', type=str, choices=['insert', 'upsert'], help='insert documents or replace the ones already loaded', required=False, default='upsert')
+
+args = parser.parse_args()
+
+params = {
+    'sinkPath': args.sinkPath,
+    'collections': args.collections if args.collections is not None else sorted(
+        name for name in os.listdir(args.sinkPath) if os.path.isdir(os.path.join(args.sinkPath, name))
+    ),
+    'sink': args.sink,
+    'outputPath': args.outputPath,
+    'writeMode': args.writeMode,
+    'mongoDB': os.getenv('MONGO_DATABASE'),
+}
+print(f'Running on local ENV with params {params}')
+
+set_sink(params['sink'], params['outputPath'])
+set_write_mode(params['writeMode'])
+# indexes of the collections with the default names, see `ensure_indexes`
+ensure_indexes(*[name if name in params['collections'] else None for name in ['submissions', 'comments', 'subreddits']])
+
+for collection in params['collections']:
+    count = 0
+    for path in list_jsonl_files(params['sinkPath'], collection):
+        for document in read_jsonl(path):
+            get_sink().write(document, collection)
+            count += 1
+
+        print(f'Loaded {path}')
+
+    print(f'{count} documents of "{collection}" loaded on {params["sink"]}')
+
+close_writes()
+
+print("\nFinished loading.")
@@ -2,15 +2,27 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import argparse
-import sys
+import atexit
 import os
-import praw
-import math
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from src.parsers.reddit_parser import get_comment_data, get_submission_data, get_subreddit_data, get_comments
-from src.services.reddit_service import insert_comment, insert_submission, insert_subreddit
-from src.integrations.pushshift import get_ids_from_submissions_with_keywords_for_interval
-from src.utils.progress_bar import update_progress_bar
+from src.parsers.reddit_parser import get_submission_data, get_subreddit_data, set_field_projection, set_search_keywords, is_field_projected
+from src.services.reddit_service import insert_comment, insert_submission, insert_subreddit, insert_truncated_thread, flush_writes, ensure_indexes, get_gathered_ids, set_write_mode, set_sink, SINKS, CHECKPOINT_INTERVALS
+from src.integrations.pushshift import get_submissions_with_keywords_for_interval, build_keyword_queries, set_capture_store, pushshift_client
+from src.integrations.reddit import create_reddit_client, hydrate_submissions, ThreadLocalReddit, INFO_BATCH_SIZE
+from src.integrations.authors import AuthorCache, AuthorResolver
+from src.integrations.comment_harvester import CommentHarvester
+from src.integrations.pushshift_comments import COMMENT_SEARCH_BATCH_SIZE
+from src.db.capture_store import CaptureStore
+from src.services.jsonl_writer import COMPRESSIONS
+from src.db.checkpoint_journal import CheckpointJournal
+from src.db.seen_index import SeenIndex
+from src.services.gathering_service import close_writes_and_save, dedupe_search_results, skip_seen_submissions, track_searches, write_pushshift_comments, PIPELINE_QUEUE_SIZE
+from src.services.search_service import search_subreddit_groups_concurrently, SubredditGrouper, DEFAULT_MAX_WORKERS
+from src.utils.metrics import metrics, ThroughputReporter
+from src.utils.pipeline import Pipeline
+from src.utils.profiler import SamplingProfiler
 from src.utils.time_interval import get_timestamps_interval
 
 
@@ -18,43 +30,214 @@ DEFAULT_COLLECTIONS = {
     'SUBMISSIONS': 'submissions',
     'COMMENTS': 'comments',
     'SUBREDDITS': 'subreddits',
+    'TRUNCATED_THREADS': 'truncated_threads',
 }
 
 DATE_FORMAT = '%Y-%m-%d'
 
+# walk the comment trees of the hydrated submissions through Reddit, or search their comments on Pushshift
+COMMENT_SOURCES = ['praw', 'pushshift']
 
-def get_all_submissions_from_intervals(subreddit, intervals, keyword = None, size = 500):
-    """Search for a keyword inside a subreddit within time intervals
-    and returns the respective submission ids found.
 
-    Parameters:
+def get_all_submissions_from_intervals(subreddits, intervals, keywords = None, max_workers = DEFAULT_MAX_WORKERS, is_completed = None):
+    """Search for keywords inside subreddits within time intervals
+    and returns the respective submissions found. Keywords are folded into OR queries,
+    see `build_keyword_queries`, so submissions found by more than one query should be deduplicated,
+    see `dedupe_search_results`. Sparse subreddits are searched together, see `SubredditGrouper`.
+    Searches run concurrently, but are yielded in interval, query and subreddit order.
 
-    keyword (str): keyword to search
+    Parameters:
 
-    subreddit (str): subreddit title
+    subreddits (list of str): subreddit titles
 
     intervals (list of tuple): list of interval objects (tuples) representing starting timestamp and ending timestamp
 
-    size (int) - optional: page size requested to the Pushshift API.
+    keywords (list of str) - optional: keywords to search
+
+    max_workers (int) - optional: no. of concurrent searches
+
+    is_completed (function) - optional: called as is_completed(subreddit, query, interval), skips the searches completed by previous runs
 
     Returns:
 
-    list: a list of submission ids
+    generator of tuples: ((subreddit, query, interval), list of submissions) for each search
     """
-    ids = []
+    intervals = [interval for interval in intervals if interval[0] <= interval[1]]
+    queries = build_keyword_queries(keywords) if keywords is not None else None
 
-    for interval in intervals:
+    for (subreddit, query, interval), submissions in search_subreddit_groups_concurrently(
+        get_submissions_with_keywords_for_interval, subreddits, intervals, queries, SubredditGrouper(), max_workers, is_completed
+    ):
         start_date = datetime.fromtimestamp(interval[0])
         end_date = datetime.fromtimestamp(interval[1])
-        print(f'Searching keyword within range ({start_date}, {end_date})...')
+        query_message = f' for "{query}" query' if query is not None else ''
+        print(f'Found {len(submissions)} submissions{query_message} inside "{subreddit}" within range ({start_date}, {end_date})')
+
+        yield (subreddit, query, interval), submissions
+
+
+def save_subreddits(results, reddit, collection):
+    """Pipeline stage saving the data of each subreddit the first time submissions are found on it,
+    while passing the search results along.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of submissions) pairs
+
+    reddit (praw.Reddit): PRAW Reddit instance
+
+    collection (str): name of the collection where the subreddits should be saved
+
+    Returns:
+
+    generator of tuples: the given search results
+    """
+    saved_subreddits = set()
+
+    for (subreddit, query, interval), submissions in results:
+        if len(submissions) > 0 and subreddit not in saved_subreddits:
+            saved_subreddits.add(subreddit)
+            print("Subreddit name: " + subreddit)
+
+            subreddit_data = get_subreddit_data(reddit.subreddit(subreddit))
+            insert_subreddit(
+                subreddit_data, 
+                collection
+            )
+
+        yield (subreddit, query, interval), submissions
+
+
+def hydrate_search_results(results, reddit, batch_size = INFO_BATCH_SIZE, on_missing = None):
+    """Pipeline stage hydrating the submissions found by each search through Reddit, `batch_size` submissions
+    per request instead of lazily, one request each. Submissions of consecutive searches share requests.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of Pushshift submissions) pairs
+
+    reddit (praw.Reddit): PRAW Reddit instance
+
+    batch_size (int) - optional: no. of submissions fetched per request, up to 100
+
+    on_missing (function) - optional: called with the ids of the submissions Reddit didn't return
+
+    Returns:
+
+    generator of praw.models.Submission: hydrated submissions. The submissions found are counted on the `gathering.found_submissions` metric
+    """
+    submission_ids = []
+
+    for _, submissions in results:
+        metrics.increment('gathering.found_submissions', len(submissions))
+        submission_ids.extend(submission["id"] for submission in submissions)
+
+        if len(submission_ids) >= batch_size:
+            full_batches_size = len(submission_ids) - len(submission_ids) % batch_size
+            yield from hydrate_submissions(reddit, submission_ids[:full_batches_size], batch_size, on_missing)
+            submission_ids = submission_ids[full_batches_size:]
+
+    yield from hydrate_submissions(reddit, submission_ids, batch_size, on_missing)
+
+
+def save_submissions(submissions, collection, author_resolver = None):
+    """Pipeline stage saving the data of hydrated submissions while passing them along.
+
+    Parameters:
+
+    submissions (iterable of praw.models.Submission): PRAW submission instances
+
+    collection (str): name of the collection where the submissions should be saved
+
+    author_resolver (AuthorResolver) - optional: resolves the authors of each batch of submissions in bulk
+
+    Returns:
+
+    generator of praw.models.Submission: the given submissions
+    """
+    submissions = iter(submissions)
+
+    while True:
+        batch = list(islice(submissions, INFO_BATCH_SIZE))
+        if len(batch) == 0:
+            return
+
+        authors = author_resolver.resolve_for(batch) if author_resolver is not None else None
+
+        for submission in batch:
+            submission_data = get_submission_data(submission, authors)
+            if submission_data is not None:
+                insert_submission(
+                    submission_data, 
+                    collection
+                )
+
+            yield submission
+
+
+def save_comments(submissions, harvester, collection):
+    """Pipeline stage saving the comments of each submission, and passing the submission along
+    only once every comment of it is saved.
+
+    Parameters:
+
+    submissions (iterable of praw.models.Submission): PRAW submission instances
 
-        submission_ids = get_ids_from_submissions_with_keywords_for_interval(subreddit, interval, keyword)
+    harvester (CommentHarvester): comments harvester
 
-        new_ids_without_duplicates = set(submission_ids) - set(ids)
+    collection (str): name of the collection where the comments should be saved
+
+    Returns:
+
+    generator of praw.models.Submission: submissions whose comments were saved
+    """
+    harvested_submissions = deque()
+
+    for comment in harvester.harvest(submissions, on_harvested=harvested_submissions.append):
+        insert_comment(
+            comment, 
+            collection
+        )
 
-        ids = ids + list(new_ids_without_duplicates)
+        while len(harvested_submissions) > 0:
+            yield harvested_submissions.popleft()
 
-    return ids
+    while len(harvested_submissions) > 0:
+        yield harvested_submissions.popleft()
+
+
+def save_comments_from_pushshift(submissions, collection, author_resolver = None, batch_size = COMMENT_SEARCH_BATCH_SIZE):
+    """Pipeline stage saving the comments of each batch of submissions, searched on Pushshift instead of
+    walking their comment trees through Reddit, and passing the submissions along once their comments are saved.
+
+    Parameters:
+
+    submissions (iterable of praw.models.Submission): PRAW submission instances
+
+    collection (str): name of the collection where the comments should be saved
+
+    author_resolver (AuthorResolver) - optional: resolves the authors of each page of comments in bulk
+
+    batch_size (int) - optional: no. of submissions whose comments are searched together
+
+    Returns:
+
+    generator of praw.models.Submission: submissions whose comments were saved
+    """
+    submissions = iter(submissions)
+
+    while True:
+        batch = list(islice(submissions, batch_size))
+        if len(batch) == 0:
+            return
+
+        # read from the instance data only, so lazy instances are never fetched
+        write_pushshift_comments([
+            { "id": submission.id, "created_utc": vars(submission).get('created_utc'), "url": vars(submission).get('url') }
+            for submission in batch
+        ], collection, author_resolver)
+
+        yield from batch
 
 
 parser = argparse.ArgumentParser(description='Gather Reddit submission data and sends to cloud database.')
@@ -66,11 +249,40 @@ parser.add_argument('--end', type=str, help='gather posts written before this da
 parser.add_argument('--saveComments', type=int, help='wheter should save submission comments', required=False, default=False)
 parser.add_argument('--saveSubreddits', type=int, help='wheter should save submission subreddit', required=False, default=False)
 parser.add_argument('--submissionsCollection', type=str, help='MongoDB collection to save submissions', required=False, default=DEFAULT_COLLECTIONS['SUBMISSIONS'])
+parser.add_argument('--commentSource', type=str, choices=COMMENT_SOURCES, help='walk comment trees through Reddit or search comments on Pushshift', required=False, default='praw')
 parser.add_argument('--commentsCollection', type=str, help='MongoDB collection to save comments', required=False, default=DEFAULT_COLLECTIONS['COMMENTS'])
 parser.add_argument('--subredditsCollection', type=str, help='MongoDB collection to save subreddits', required=False, default=DEFAULT_COLLECTIONS['SUBREDDITS'])
+parser.add_argument('--truncatedThreadsCollection', type=str, help='MongoDB collection to save submissions whose comments were not completely gathered', required=False, default=DEFAULT_COLLECTIONS['TRUNCATED_THREADS'])
+parser.add_argument('--commentWorkers', type=int, help='no. of comment trees expanded concurrently', required=False, default=4)
+parser.add_argument('--moreCommentsBudget', type=int, help='maximum no. of "load more comments" expansions per submission', required=False, default=None)
+parser.add_argument('--maxCommentDepth', type=int, help='maximum depth of gathered comments, 0 for top-level comments only', required=False, default=None)
+parser.add_argument('--bulkAuthors', action='store_true', help='resolve authors 100 per request and cache them; the bulk endpoint lacks is_mod, is_employee and has_verified_email, which are saved as null')
+parser.add_argument('--authorCache', type=str, help='file where authors resolved by --bulkAuthors are cached across runs', required=False, default='author_cache.json')
+parser.add_argument('--authorCacheTtl', type=float, help='no. of days an author resolved by --bulkAuthors is kept', required=False, default=7)
 parser.add_argument('--daysPerInterval', type=float, help='no. of days per search interval', required=False)
+parser.add_argument('--sink', type=str, choices=SINKS, help='write on MongoDB, on compressed JSON Lines files or on partitioned Parquet files (requires pyarrow)', required=False, default=os.getenv('SINK', 'mongo'))
+parser.add_argument('--sinkPath', type=str, help='directory of the JSON Lines or Parquet files', required=False, default=os.getenv('SINK_PATH', 'output'))
+parser.add_argument('--sinkCompression', type=str, choices=COMPRESSIONS, help='compression of the JSON Lines files', required=False, default=os.getenv('SINK_COMPRESSION', 'gzip'))
+parser.add_argument('--writeMode', type=str, choices=['insert', 'upsert'], help='insert documents or replace the ones already gathered', required=False, default='upsert')
+parser.add_argument('--fields', nargs='+', help='fields to extract, e.g. "id title body" or "comment.body"; all fields by default', required=False, default=None)
+parser.add_argument('--workers', type=int, help='no. of concurrent Pushshift searches', required=False, default=DEFAULT_MAX_WORKERS)
+parser.add_argument('--capture', type=str, help='SQLite file where raw API responses are captured', required=False, default=None)
+parser.add_argument('--captureMode', type=str, choices=['read-through', 'write-through'], help='reuse captured responses or always request and capture them again', required=False, default='read-through')
+parser.add_argument('--replay', action='store_true', help='gather from captured responses only, without requesting the APIs')
+parser.add_argument('--checkpoint', type=str, help='SQLite file where gathering progress is journaled', required=False, default='main_checkpoint.db')
+parser.add_argument('--checkpointInterval', type=float, help='no. of seconds between checkpoints, defaults to 30, or 600 for the parquet sink as each checkpoint closes its files', required=False, default=None)
+parser.add_argument('--seenIndex', type=str, help='file indexing the ids of the submissions already gathered, which are skipped', required=False, default=None)
+parser.add_argument('--rebuildSeenIndex', action='store_true', help='rebuild --seenIndex from the submissions stored on MongoDB before gathering')
+parser.add_argument('--resume', action='store_true', help='skip the searches and submissions already gathered by the interrupted run journaled on --checkpoint')
+parser.add_argument('--metricsInterval', type=float, help='minimum no. of seconds between progress reports', required=False, default=10)
+parser.add_argument('--profile', action='store_true', help='sample the stack of every pipeline stage and report where each one spends its time')
 
 args = parser.parse_args()
+if args.replay and args.capture is None:
+    parser.error('--replay requires --capture')
+if args.rebuildSeenIndex and args.seenIndex is None:
+    parser.error('--rebuildSeenIndex requires --seenIndex')
+
 params = {
     'subreddits': args.subreddits,
     'keywords': args.keywords if args.keywords is not None else [],
@@ -79,9 +291,32 @@ params = {
     'saveComments': bool(args.saveComments),
     'saveSubreddits': bool(args.saveSubreddits),
     'submissionsCollection': args.submissionsCollection,
+    'commentSource': args.commentSource,
     'commentsCollection': args.commentsCollection,
     'subredditsCollection': args.subredditsCollection,
+    'truncatedThreadsCollection': args.truncatedThreadsCollection,
+    'commentWorkers': args.commentWorkers,
+    'moreCommentsBudget': args.moreCommentsBudget,
+    'maxCommentDepth': args.maxCommentDepth,
+    'bulkAuthors': args.bulkAuthors,
+    'authorCache': args.authorCache,
+    'authorCacheTtl': args.authorCacheTtl,
     'daysPerInterval': args.daysPerInterval,
+    'workers': args.workers,
+    'fields': args.fields,
+    'writeMode': args.writeMode,
+    'sink': args.sink,
+    'sinkPath': args.sinkPath,
+    'sinkCompression': args.sinkCompression,
+    'capture': args.capture,
+    'captureMode': 'replay' if args.replay else args.captureMode,
+    'checkpoint': args.checkpoint,
+    'checkpointInterval': args.checkpointInterval if args.checkpointInterval is not None else CHECKPOINT_INTERVALS[args.sink],
+    'resume': args.resume,
+    'seenIndex': args.seenIndex,
+    'rebuildSeenIndex': args.rebuildSeenIndex,
+    'metricsInterval': args.metricsInterval,
+    'profile': args.profile,
     'mongoDB': os.getenv('MONGO_DATABASE'),
 }
 print(f'Running on local ENV with params {params}')
@@ -92,90 +327,133 @@ days = params['daysPerInterval']
 timestampsInterval = list(get_timestamps_interval(startDate, endDate, days_per_interval=days) \
     if days is not None else get_timestamps_interval(startDate, endDate))
 
-print(f'Starting search...')
-
-subreddit_submissions_map = {}
-
-for subreddit in params['subreddits']:
-    submission_ids = set()
-
-    print(f'Searching inside "{subreddit}" subreddit...')
-
-    if len(params['keywords']) == 0:
-        new_submission_ids = get_all_submissions_from_intervals(subreddit, timestampsInterval)
-
-        if (len(new_submission_ids) == 0): continue
-
-        submission_ids = submission_ids.union(new_submission_ids)
-    else:
-        for keyword in params['keywords']:
-            print(f'Searching for "{keyword}" keyword...')
-
-            new_submission_ids = get_all_submissions_from_intervals(subreddit, timestampsInterval, keyword)
-
-            if (len(new_submission_ids) == 0): continue
-
-            submission_ids = submission_ids.union(new_submission_ids)
-
-    subreddit_submissions_map[subreddit] = list(submission_ids)
-
-
-all_ids = [sub_id for id_list in list(subreddit_submissions_map.values()) for sub_id in id_list]
-total_submissions = len(all_ids)
-print(f'{total_submissions} submissions found with the given keywords ({", ".join(params["keywords"])}) and within the date range ({startDate.date()}, {endDate.date()})')
-
-print(f'Start gathering...')
-
-reddit = praw.Reddit(
-    client_id=os.getenv('REDDIT_CLIENT_ID'), 
-    client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-    password=os.getenv('REDDIT_PASSWORD'), 
-    user_agent=os.getenv('REDDIT_USERAGENT'),
-    username=os.getenv('REDDIT_USERNAME')
+capture_store = CaptureStore(params['capture'], params['captureMode']) if params['capture'] is not None else None
+set_capture_store(capture_store)
+
+set_sink(params['sink'], params['sinkPath'], params['sinkCompression'])
+set_write_mode(params['writeMode'])
+set_field_projection(params['fields'])
+set_search_keywords(params['keywords'])
+ensure_indexes(
+    params['submissionsCollection'],
+    params['commentsCollection'] if params['saveComments'] else None,
+    params['subredditsCollection'] if params['saveSubreddits'] else None
 )
 
-subreddits = list(subreddit_submissions_map.keys())
-for k in range(len(subreddits)):
-    print("Subreddit name: " + subreddits[k])
+seen_index = SeenIndex(params['seenIndex']) if params['seenIndex'] is not None else None
+if seen_index is not None:
+    if params['rebuildSeenIndex']:
+        seen_index.rebuild(get_gathered_ids(params['submissionsCollection']))
+    print(f'{seen_index.count()} gathered submissions indexed on {params["seenIndex"]}')
+
+# buffered documents are written even if gathering is interrupted, and seen ids only saved once they are
+atexit.register(close_writes_and_save, seen_index)
+
+journal = CheckpointJournal(params['checkpoint'], params['checkpointInterval'])
+if not params['resume']:
+    journal.reset()
+# registered after close_writes_and_save, so it runs before it
+atexit.register(journal.checkpoint, flush_writes)
+
+# each pipeline stage and comment worker uses its own Reddit instance, as they are not thread safe
+reddit = ThreadLocalReddit(lambda: create_reddit_client(capture_store))
+
+# without --bulkAuthors, each author is fetched on its own, with every field
+author_cache = None
+author_resolver = None
+if params['bulkAuthors']:
+    author_cache = AuthorCache(ttl=params['authorCacheTtl'] * 24 * 60 * 60, path=params['authorCache'])
+    author_cache.load()
+    atexit.register(author_cache.save)
+    author_resolver = AuthorResolver(reddit, author_cache)
+
+comment_harvester = CommentHarvester(
+    max_workers=params['commentWorkers'],
+    more_comments_budget=params['moreCommentsBudget'],
+    max_depth=params['maxCommentDepth'],
+    author_resolver=author_resolver if is_field_projected('comment', 'author') else None,
+    reddit=reddit
+)
 
-    if params['saveSubreddits']:
-        subreddit = reddit.subreddit(subreddits[k])
-        subreddit_data = get_subreddit_data(subreddit)
-        insert_subreddit(
-            subreddit_data, 
-            params['subredditsCollection']
-        )
+print('Starting searching/gathering...')
+
+gathered_submissions = 0
+
+profiler = SamplingProfiler().start() if params['profile'] else None
+reporter = ThroughputReporter('submissions', params['metricsInterval'])
+
+# search -> dedupe -> [skip seen] -> track -> [save subreddits] -> hydrate and save submissions -> [save comments], every stage on its own thread,
+# so submissions are gathered while the next intervals are still being searched. Submissions are parsed on the thread hydrating them,
+# as any lazy load goes through the Reddit instance they were created with
+pipeline = Pipeline(get_all_submissions_from_intervals(
+    params['subreddits'], timestampsInterval, params['keywords'], params['workers'], journal.is_search_completed
+), PIPELINE_QUEUE_SIZE, profiler)
+pipeline.stage(dedupe_search_results, 'dedupe')
+if seen_index is not None:
+    pipeline.stage(lambda results: skip_seen_submissions(results, seen_index), 'seen')
+pipeline.stage(lambda results: track_searches(results, journal), 'track')
+if params['saveSubreddits']:
+    pipeline.stage(lambda results: save_subreddits(results, reddit, params['subredditsCollection']), 'subreddits')
+pipeline.stage(lambda results: save_submissions(
+    hydrate_search_results(results, reddit, on_missing=journal.record_submissions),
+    params['submissionsCollection'],
+    author_resolver if is_field_projected('submission', 'author') else None
+), 'submissions')
+
+if params['saveComments'] and params['commentSource'] == 'pushshift':
+    pipeline.stage(lambda submissions: save_comments_from_pushshift(
+        submissions,
+        params['commentsCollection'],
+        author_resolver if is_field_projected('comment', 'author') else None
+    ), 'comments')
+elif params['saveComments']:
+    pipeline.stage(lambda submissions: save_comments(submissions, comment_harvester, params['commentsCollection']), 'comments')
+
+# submissions come out of the pipeline once completely gathered
+for submission in pipeline:
+    journal.record_submissions([submission.id])
+    if seen_index is not None:
+        seen_index.add([submission.id])
+    journal.checkpoint_if_due(flush_writes)
+    gathered_submissions += 1
+    reporter.update(gathered_submissions, metrics.get_counter('gathering.found_submissions'))
+
+total_submissions = metrics.get_counter('gathering.found_submissions')
+reporter.update(gathered_submissions, total_submissions, force=True)
+
+print(f'Pushshift requests stats: {pushshift_client.get_stats()}')
+print(f'{total_submissions} submissions found with the given keywords ({", ".join(params["keywords"])}) and within the date range ({startDate.date()}, {endDate.date()})')
 
-    submissions = subreddit_submissions_map[subreddits[k]]
-    no_of_submissions_in_subreddit = len(submissions)
-    print(f'Gathering: {no_of_submissions_in_subreddit} out of {total_submissions} submissions')
 
-    for i in range(no_of_submissions_in_subreddit):
-        update_progress_bar(i, no_of_submissions_in_subreddit)
+for thread in comment_harvester.truncated_threads:
+    insert_truncated_thread(
+        thread, 
+        params['truncatedThreadsCollection']
+    )
 
-        submission = reddit.submission(submissions[i])
+if len(comment_harvester.truncated_threads) > 0:
+    print(f'{len(comment_harvester.truncated_threads)} submissions had their comments partially gathered')
 
-        submission_data = get_submission_data(submission)
-        if submission_data is not None:
-            insert_submission(
-                submission_data, 
-                params['submissionsCollection']
-            )
+journal.checkpoint(flush_writes)
+close_writes_and_save(seen_index)
+if author_cache is not None:
+    author_cache.save()
 
+print(metrics.to_json_log())
+if profiler is not None:
+    profiler.stop()
+    print(profiler.report())
 
-        if params['saveComments']:
-            comments = get_comments(submission)
+if seen_index is not None:
+    print(f'{seen_index.count()} gathered submissions indexed on {params["seenIndex"]}')
 
-            total_comments = len(comments)
-        
-            for j in range(total_comments):
-                insert_comment(
-                    comments[j], 
-                    params['commentsCollection']
-                )
-    
-    update_progress_bar(no_of_submissions_in_subreddit, no_of_submissions_in_subreddit)
+completed_ranges, journaled_submissions = journal.count()
+print(f'{completed_ranges} completed search ranges and {journaled_submissions} submissions of pending searches journaled on {params["checkpoint"]}')
+journal.close()
 
+if capture_store is not None:
+    print(f'{capture_store.count()} responses captured on {params["capture"]}')
+    capture_store.close()
 
 print("\nFinished gathering.")
 
@@ -2,55 +2,68 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import argparse
+import atexit
 import os
 from datetime import datetime
-from src.parsers.reddit_parser import get_comment_data, get_submission_data_from_pushshift
-from src.services.reddit_service import insert_submission
-from src.integrations.pushshift import get_submissions_with_keywords_for_interval
+from src.parsers.reddit_parser import set_field_projection, set_search_keywords
+from src.services.reddit_service import flush_writes, ensure_indexes, get_gathered_ids, set_write_mode, set_sink, SINKS, CHECKPOINT_INTERVALS
+from src.services.gathering_service import build_pushshift_pipeline, close_writes_and_save
+from src.integrations.pushshift import get_submissions_with_keywords_for_interval, build_keyword_queries, set_capture_store, pushshift_client
+from src.db.capture_store import CaptureStore
+from src.services.jsonl_writer import COMPRESSIONS
+from src.db.checkpoint_journal import CheckpointJournal
+from src.db.seen_index import SeenIndex
+from src.services.search_service import search_subreddit_groups_concurrently, SubredditGrouper, DEFAULT_MAX_WORKERS
+from src.utils.metrics import metrics, ThroughputReporter
+from src.utils.profiler import SamplingProfiler
 from src.utils.time_interval import get_timestamps_interval
 
 
 DEFAULT_COLLECTIONS = {
-    'SUBMISSIONS': 'submissions'
+    'SUBMISSIONS': 'submissions',
+    'COMMENTS': 'comments',
 }
 
 DATE_FORMAT = '%Y-%m-%d'
 
+subreddit_grouper = SubredditGrouper()
 
-def get_all_submissions_from_intervals(subreddit, intervals, keyword = None, size = 500):
-    """Search for a keyword inside a subreddit within time intervals
-    and returns the respective submission ids found.
 
-    Parameters:
+def get_all_submissions_from_intervals(subreddits, intervals, keywords = None, max_workers = DEFAULT_MAX_WORKERS, is_completed = None):
+    """Search for keywords inside subreddits within time intervals
+    and returns the respective submissions found. Keywords are folded into OR queries,
+    see `build_keyword_queries`, so submissions found by more than one query should be deduplicated,
+    see `dedupe_search_results`. Sparse subreddits are searched together, see `SubredditGrouper`.
+    Searches run concurrently, but are yielded in interval, query and subreddit order.
 
-    keyword (str): keyword to search
+    Parameters:
 
-    subreddit (str): subreddit title
+    subreddits (list of str): subreddit titles
 
     intervals (list of tuple): list of interval objects (tuples) representing starting timestamp and ending timestamp
 
-    size (int) - optional: page size requested to the Pushshift API.
+    keywords (list of str) - optional: keywords to search
+
+    max_workers (int) - optional: no. of concurrent searches
+
+    is_completed (function) - optional: called as is_completed(subreddit, query, interval), skips the searches completed by previous runs
 
     Returns:
 
-    list: a list of submissions
+    generator of tuples: ((subreddit, query, interval), list of submissions) for each search
     """
-    submissions = []
+    intervals = [interval for interval in intervals if interval[0] <= interval[1]]
+    queries = build_keyword_queries(keywords) if keywords is not None else None
 
-    for interval in intervals:
+    for (subreddit, query, interval), submissions in search_subreddit_groups_concurrently(
+        get_submissions_with_keywords_for_interval, subreddits, intervals, queries, subreddit_grouper, max_workers, is_completed
+    ):
         start_date = datetime.fromtimestamp(interval[0])
         end_date = datetime.fromtimestamp(interval[1])
+        query_message = f' for "{query}" query' if query is not None else ''
+        print(f'Found {len(submissions)} submissions{query_message} inside "{subreddit}" within range ({start_date}, {end_date})')
 
-        if start_date > end_date:
-            continue
-
-        print(f'Searching keyword within range ({start_date}, {end_date})...')
-
-        new_submissions = get_submissions_with_keywords_for_interval(subreddit, interval, keyword)
-
-        submissions = submissions + new_submissions
-
-    return submissions
+        yield (subreddit, query, interval), submissions
 
 
 parser = argparse.ArgumentParser(description='Gather Reddit submission data and sends to cloud database.')
@@ -60,16 +73,56 @@ parser.add_argument('--keywords', nargs='+', help='keywords to search for on the
 parser.add_argument('--start', type=str, help='gather posts written after this date', required=True)
 parser.add_argument('--end', type=str, help='gather posts written before this date', required=True)
 parser.add_argument('--submissionsCollection', type=str, help='MongoDB collection to save submissions', required=False, default=DEFAULT_COLLECTIONS['SUBMISSIONS'])
+parser.add_argument('--saveComments', type=int, help='wheter should save submission comments, searched on Pushshift', required=False, default=False)
+parser.add_argument('--commentsCollection', type=str, help='MongoDB collection to save comments', required=False, default=DEFAULT_COLLECTIONS['COMMENTS'])
 parser.add_argument('--daysPerInterval', type=float, help='no. of days per search interval', required=False)
+parser.add_argument('--sink', type=str, choices=SINKS, help='write on MongoDB, on compressed JSON Lines files or on partitioned Parquet files (requires pyarrow)', required=False, default=os.getenv('SINK', 'mongo'))
+parser.add_argument('--sinkPath', type=str, help='directory of the JSON Lines or Parquet files', required=False, default=os.getenv('SINK_PATH', 'output'))
+parser.add_argument('--sinkCompression', type=str, choices=COMPRESSIONS, help='compression of the JSON Lines files', required=False, default=os.getenv('SINK_COMPRESSION', 'gzip'))
+parser.add_argument('--writeMode', type=str, choices=['insert', 'upsert'], help='insert documents or replace the ones already gathered', required=False, default='upsert')
+parser.add_argument('--fields', nargs='+', help='fields to extract, e.g. "id title body" or "comment.body"; all fields by default', required=False, default=None)
+parser.add_argument('--workers', type=int, help='no. of concurrent Pushshift searches', required=False, default=DEFAULT_MAX_WORKERS)
+parser.add_argument('--capture', type=str, help='SQLite file where raw API responses are captured', required=False, default=None)
+parser.add_argument('--captureMode', type=str, choices=['read-through', 'write-through'], help='reuse captured responses or always request and capture them again', required=False, default='read-through')
+parser.add_argument('--replay', action='store_true', help='gather from captured responses only, without requesting the APIs')
+parser.add_argument('--checkpoint', type=str, help='SQLite file where gathering progress is journaled', required=False, default='pushshift_checkpoint.db')
+parser.add_argument('--checkpointInterval', type=float, help='no. of seconds between checkpoints, defaults to 30, or 600 for the parquet sink as each checkpoint closes its files', required=False, default=None)
+parser.add_argument('--seenIndex', type=str, help='file indexing the ids of the submissions already gathered, which are skipped', required=False, default=None)
+parser.add_argument('--rebuildSeenIndex', action='store_true', help='rebuild --seenIndex from the submissions stored on MongoDB before gathering')
+parser.add_argument('--resume', action='store_true', help='skip the searches already gathered by the interrupted run journaled on --checkpoint')
+parser.add_argument('--metricsInterval', type=float, help='minimum no. of seconds between progress reports', required=False, default=10)
+parser.add_argument('--profile', action='store_true', help='sample the stack of every pipeline stage and report where each one spends its time')
 
 args = parser.parse_args()
+if args.replay and args.capture is None:
+    parser.error('--replay requires --capture')
+if args.rebuildSeenIndex and args.seenIndex is None:
+    parser.error('--rebuildSeenIndex requires --seenIndex')
+
 params = {
     'subreddits': args.subreddits,
     'keywords': args.keywords if args.keywords is not None else [],
     'start': args.start,
     'end': args.end,
     'submissionsCollection': args.submissionsCollection,
+    'saveComments': bool(args.saveComments),
+    'commentsCollection': args.commentsCollection,
     'daysPerInterval': args.daysPerInterval,
+    'workers': args.workers,
+    'fields': args.fields,
+    'writeMode': args.writeMode,
+    'sink': args.sink,
+    'sinkPath': args.sinkPath,
+    'sinkCompression': args.sinkCompression,
+    'capture': args.capture,
+    'captureMode': 'replay' if args.replay else args.captureMode,
+    'checkpoint': args.checkpoint,
+    'checkpointInterval': args.checkpointInterval if args.checkpointInterval is not None else CHECKPOINT_INTERVALS[args.sink],
+    'resume': args.resume,
+    'seenIndex': args.seenIndex,
+    'rebuildSeenIndex': args.rebuildSeenIndex,
+    'metricsInterval': args.metricsInterval,
+    'profile': args.profile,
     'mongoDB': os.getenv('MONGO_DATABASE'),
 }
 print(f'Running on local ENV with params {params}')
@@ -80,42 +133,72 @@ days = params['daysPerInterval']
 timestampsInterval = list(get_timestamps_interval(startDate, endDate, days_per_interval=days) \
     if days is not None else get_timestamps_interval(startDate, endDate))
 
-print(f'Starting searching/gathering...')
+capture_store = CaptureStore(params['capture'], params['captureMode']) if params['capture'] is not None else None
+set_capture_store(capture_store)
+
+print('Starting searching/gathering...')
+
+set_sink(params['sink'], params['sinkPath'], params['sinkCompression'])
+set_write_mode(params['writeMode'])
+set_field_projection(params['fields'])
+set_search_keywords(params['keywords'])
+ensure_indexes(params['submissionsCollection'], params['commentsCollection'] if params['saveComments'] else None)
+
+seen_index = SeenIndex(params['seenIndex']) if params['seenIndex'] is not None else None
+if seen_index is not None:
+    if params['rebuildSeenIndex']:
+        seen_index.rebuild(get_gathered_ids(params['submissionsCollection']))
+    print(f'{seen_index.count()} gathered submissions indexed on {params["seenIndex"]}')
+
+# buffered documents are written even if gathering is interrupted, and seen ids only saved once they are
+atexit.register(close_writes_and_save, seen_index)
+
+journal = CheckpointJournal(params['checkpoint'], params['checkpointInterval'])
+if not params['resume']:
+    journal.reset()
+# registered after close_writes_and_save, so it runs before it
+atexit.register(journal.checkpoint, flush_writes)
 
 count = 0
 
-for subreddit in params['subreddits']:
+profiler = SamplingProfiler().start() if params['profile'] else None
+reporter = ThroughputReporter('submissions', params['metricsInterval'])
+
+pipeline = build_pushshift_pipeline(get_all_submissions_from_intervals(
+    params['subreddits'], timestampsInterval, params['keywords'], params['workers'], journal.is_search_completed
+), params['submissionsCollection'], seen_index=seen_index, profiler=profiler,
+    comments_collection=params['commentsCollection'] if params['saveComments'] else None)
 
-    print(f'Searching/gathering inside "{subreddit}" subreddit...')
+# searches come out of the pipeline once their submissions are written
+for search, written_submissions in pipeline:
+    count += written_submissions
+    journal.complete_search(search)
+    journal.checkpoint_if_due(flush_writes)
+    reporter.update(count)
 
-    if len(params['keywords']) == 0:
-        new_submissions = get_all_submissions_from_intervals(subreddit, timestampsInterval)
+reporter.update(count, force=True)
 
-        processed_submissions = list(map(lambda submission: get_submission_data_from_pushshift(submission), new_submissions))
-        for submission in processed_submissions:
-            if submission is not None:
-                insert_submission(
-                    submission, 
-                    params['submissionsCollection']
-                )
 
-        count += len(new_submissions)
-    else:
-        for keyword in params['keywords']:
-            print(f'Searching/gathering for "{keyword}" keyword...')
+journal.checkpoint(flush_writes)
+close_writes_and_save(seen_index)
 
-            new_submissions = get_all_submissions_from_intervals(subreddit, timestampsInterval, keyword)
+print(metrics.to_json_log())
+if profiler is not None:
+    profiler.stop()
+    print(profiler.report())
 
-            processed_submissions = list(map(lambda submission: get_submission_data_from_pushshift(submission), new_submissions))
-            for submission in processed_submissions:
-                insert_submission(
-                    submission, 
-                    params['submissionsCollection']
-                )
+if seen_index is not None:
+    print(f'{seen_index.count()} gathered submissions indexed on {params["seenIndex"]}')
 
-            count += len(new_submissions)
+completed_ranges, _ = journal.count()
+print(f'{completed_ranges} completed search ranges journaled on {params["checkpoint"]}')
+journal.close()
 
+if capture_store is not None:
+    print(f'{capture_store.count()} responses captured on {params["capture"]}')
+    capture_store.close()
 
+print(f'Pushshift requests stats: {pushshift_client.get_stats()}')
 print(f'{count} submissions found and collected with the given keywords ({", ".join(params["keywords"])}) and within the date range ({startDate.date()}, {endDate.date()})')
 
 with open('gatherer_logs.txt', 'a+') as file:
@@ -0,0 +1,47 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import os
+from src.integrations.reddit import create_reddit_client
+from src.services.reddit_service import ensure_indexes
+from src.services.refresh_service import refresh_submissions, MAX_REFRESH_AGE
+from src.utils.metrics import metrics
+
+
+DEFAULT_COLLECTIONS = {
+    'SUBMISSIONS': 'submissions'
+}
+
+
+parser = argparse.ArgumentParser(description='Refresh the score, no. of comments and upvote ratio of the stored submissions due for it, young submissions more often than old ones.')
+
+parser.add_argument('--submissionsCollection', type=str, help='MongoDB collection where submissions are saved', required=False, default=DEFAULT_COLLECTIONS['SUBMISSIONS'])
+parser.add_argument('--maxAge', type=float, help='no. of days after which submissions are not refreshed anymore', required=False, default=MAX_REFRESH_AGE / (24 * 60 * 60))
+parser.add_argument('--limit', type=int, help='maximum no. of submissions refreshed', required=False, default=None)
+
+args = parser.parse_args()
+
+params = {
+    'submissionsCollection': args.submissionsCollection,
+    'maxAge': args.maxAge,
+    'limit': args.limit,
+    'mongoDB': os.getenv('MONGO_DATABASE'),
+}
+print(f'Running on local ENV with params {params}')
+
+ensure_indexes(params['submissionsCollection'])
+
+reddit = create_reddit_client()
+
+summary = refresh_submissions(
+    reddit,
+    params['submissionsCollection'],
+    max_age=params['maxAge'] * 24 * 60 * 60,
+    limit=params['limit']
+)
+
+print(metrics.to_json_log())
+
+print(f'{summary["refreshed"]} submissions refreshed, {summary["changed"]} changed and {summary["missing"]} not found on Reddit')
+print("\nFinished refreshing.")
@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# read-through: captured responses are reused, missing ones are requested and captured
+# write-through: every response is requested and captured, replacing the previous capture
+# replay: only captured responses are used, the network is never touched
+CAPTURE_MODES = ['read-through', 'write-through', 'replay']
+
+# request parameters left out of capture keys, so credentials are never written to disk
+IGNORED_PARAMETERS = {'password', 'client_secret'}
+
+
+def normalize_request(url, params = None, data = None, method = 'GET'):
+    """Builds the capture key of a request: the method, plus the URL with lower-cased scheme and host
+    and every query, params and data parameter sorted, so equivalent requests share the same key.
+
+    Parameters:
+
+    url (str): request URL
+
+    params (dict or list of tuples) - optional: query parameters sent along the URL
+
+    data (dict or list of tuples) - optional: form parameters
+
+    method (str) - optional: HTTP method
+
+    Returns:
+
+    str: normalized request
+    """
+    scheme, host, path, query, _ = urlsplit(url)
+    parameters = parse_qsl(query, keep_blank_values=True)
+
+    for extra_parameters in [params, data]:
+        if extra_parameters is not None:
+            parameters.extend(extra_parameters.items() if isinstance(extra_parameters, dict) else extra_parameters)
+
+    parameters = sorted((str(key), str(value)) for key, value in parameters if key not in IGNORED_PARAMETERS)
+    return f'{method.upper()} {urlunsplit((scheme.lower(), host.lower(), path, urlencode(parameters), ""))}'
+
+
+class CaptureStore:
+    """On-disk store of raw API responses, on a SQLite file, keyed by normalized request (see `normalize_request`).
+    Bodies are zlib compressed. Safe to be shared by several threads.
+
+    Parameters:
+
+    path (str): SQLite file where responses are captured
+
+    mode (str) - optional: one of CAPTURE_MODES, used by the integrations reading and writing the store
+    """
+    def __init__(self, path, mode = 'read-through'):
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f'Invalid capture mode "{mode}", expected one of {CAPTURE_MODES}')
+
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, captured_at REAL NOT NULL, body BLOB NOT NULL)'
+        )
+
+
+    @property
+    def reads(self):
+        """Whether captured responses should be used instead of requesting them."""
+        return self.mode != 'write-through'
+
+
+    @property
+    def requests(self):
+        """Whether missing responses may be requested through the network."""
+        return self.mode != 'replay'
+
+
+    def get(self, key):
+        """Returns a captured response body.
+
+        Parameters:
+
+        key (str): normalized request
+
+        Returns:
+
+        bytes: captured body, or None when missing
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT body FROM responses WHERE key = ?', (key,)).fetchone()
+
+        return zlib.decompress(row[0]) if row is not None else None
+
+
+    def put(self, key, body):
+        """Captures a response body, replacing the previous capture of the same request.
+
+        Parameters:
+
+        key (str): normalized request
+
+        body (bytes): response body
+        """
+        compressed_body = zlib.compress(body)
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (key, captured_at, body) VALUES (?, ?, ?)',
+                (key, time.time(), compressed_body)
+            )
+
+
+    def count(self):
+        """Returns the no. of captured responses."""
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+    def close(self):
+        """Closes the SQLite file."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,225 @@
+import sqlite3
+import threading
+import time
+
+
+class CheckpointJournal:
+    """Durable journal of gathering progress, on a SQLite file, so interrupted runs can be resumed.
+    It keeps the completed searches, as (subreddit, query) time ranges, and the submissions already gathered
+    by searches not completed yet. When a search completes, its submissions are dropped and its interval is merged
+    into the adjacent ranges of the same subreddit and query, so the journal stays small over long runs.
+
+    Progress is recorded in memory and only persisted by `checkpoint`, right after the recorded documents
+    are flushed to the database, so the journal is never ahead of the gathered data.
+
+    Parameters:
+
+    path (str): SQLite file of the journal
+
+    checkpoint_interval (float) - optional: no. of seconds between checkpoints made by `checkpoint_if_due`
+    """
+    def __init__(self, path, checkpoint_interval = 30):
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript('''
+            CREATE TABLE IF NOT EXISTS completed_ranges (
+                subreddit TEXT NOT NULL, query TEXT NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS completed_ranges_search ON completed_ranges (subreddit, query, start);
+            CREATE TABLE IF NOT EXISTS gathered_submissions (
+                id TEXT PRIMARY KEY, subreddit TEXT NOT NULL, query TEXT NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL
+            );
+        ''')
+
+        self._gathered_ids = set(row[0] for row in self._connection.execute('SELECT id FROM gathered_submissions'))
+        # in-flight searches: search to no. of submissions left, and submission id to search
+        self._pending_searches = {}
+        self._submission_searches = {}
+        # recorded progress waiting for the next checkpoint
+        self._completed_searches = []
+        self._new_gathered_submissions = []
+
+
+    def reset(self):
+        """Forgets every recorded progress, to start over."""
+        with self._lock:
+            self._connection.execute('DELETE FROM completed_ranges')
+            self._connection.execute('DELETE FROM gathered_submissions')
+            self._connection.commit()
+            self._gathered_ids = set()
+
+
+    def is_search_completed(self, subreddit, query, interval):
+        """Checks whether a search was completed, on this run or on a previous one.
+
+        Parameters:
+
+        subreddit (str): subreddit title
+
+        query (str): searched query, or None
+
+        interval (tuple): interval object (tuple) representing starting timestamp and ending timestamp
+
+        Returns:
+
+        bool: whether the interval is covered by the completed ranges of the subreddit and query
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT 1 FROM completed_ranges WHERE subreddit = ? AND query = ? AND start <= ? AND end >= ? LIMIT 1',
+                (subreddit, _query_key(query), interval[0], interval[1])
+            ).fetchone()
+
+        return row is not None
+
+
+    def is_submission_gathered(self, submission_id):
+        """Checks whether a submission was gathered by a search not completed yet."""
+        with self._lock:
+            return submission_id in self._gathered_ids
+
+
+    def begin_search(self, search, submission_ids):
+        """Starts tracking a search, which completes once every given submission is recorded with `record_submissions`.
+
+        Parameters:
+
+        search (tuple): (subreddit, query, interval) of the search
+
+        submission_ids (list of str): ids of the submissions left to be gathered by the search
+        """
+        with self._lock:
+            if len(submission_ids) == 0:
+                self._completed_searches.append(search)
+                return
+
+            self._pending_searches[search] = self._pending_searches.get(search, 0) + len(submission_ids)
+            for submission_id in submission_ids:
+                self._submission_searches[submission_id] = search
+
+
+    def record_submissions(self, submission_ids):
+        """Records submissions as gathered, completing the searches left without pending submissions.
+
+        Parameters:
+
+        submission_ids (list of str): ids of gathered submissions
+        """
+        with self._lock:
+            for submission_id in submission_ids:
+                search = self._submission_searches.pop(submission_id, None)
+                if search is None:
+                    continue
+
+                self._new_gathered_submissions.append((submission_id, search))
+                self._pending_searches[search] -= 1
+                if self._pending_searches[search] == 0:
+                    del self._pending_searches[search]
+                    self._completed_searches.append(search)
+
+
+    def complete_search(self, search):
+        """Records a search as completed, whatever its submissions.
+
+        Parameters:
+
+        search (tuple): (subreddit, query, interval) of the search
+        """
+        with self._lock:
+            self._completed_searches.append(search)
+
+
+    def checkpoint_if_due(self, flush = None):
+        """Persists the progress recorded so far, see `checkpoint`, if `checkpoint_interval` seconds have passed since the last checkpoint.
+
+        Parameters:
+
+        flush (function) - optional: called before persisting, to write every document of the recorded progress
+        """
+        if time.monotonic() - self._last_checkpoint_at >= self.checkpoint_interval:
+            self.checkpoint(flush)
+
+
+    def checkpoint(self, flush = None):
+        """Persists the progress recorded so far.
+
+        Parameters:
+
+        flush (function) - optional: called before persisting, to write every document of the recorded progress
+        """
+        self._last_checkpoint_at = time.monotonic()
+        with self._lock:
+            completed_searches = self._completed_searches
+            gathered_submissions = self._new_gathered_submissions
+            self._completed_searches = []
+            self._new_gathered_submissions = []
+
+        if len(completed_searches) == 0 and len(gathered_submissions) == 0:
+            return
+
+        if flush is not None:
+            flush()
+
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO gathered_submissions (id, subreddit, query, start, end) VALUES (?, ?, ?, ?, ?)',
+                [(submission_id, subreddit, _query_key(query), interval[0], interval[1]) for submission_id, (subreddit, query, interval) in gathered_submissions]
+            )
+            self._gathered_ids.update(submission_id for submission_id, _ in gathered_submissions)
+
+            for search in completed_searches:
+                self._compact(search)
+
+            self._connection.commit()
+
+
+    def count(self):
+        """Returns the no. of completed ranges and gathered submissions kept by the journal."""
+        with self._lock:
+            ranges = self._connection.execute('SELECT COUNT(*) FROM completed_ranges').fetchone()[0]
+            submissions = self._connection.execute('SELECT COUNT(*) FROM gathered_submissions').fetchone()[0]
+
+        return ranges, submissions
+
+
+    def close(self):
+        """Closes the SQLite file."""
+        with self._lock:
+            self._connection.close()
+
+
+    def _compact(self, search):
+        subreddit, query, (start, end) = search[0], _query_key(search[1]), search[2]
+
+        completed_ids = [row[0] for row in self._connection.execute(
+            'SELECT id FROM gathered_submissions WHERE subreddit = ? AND query = ? AND start = ? AND end = ?',
+            (subreddit, query, start, end)
+        )]
+        self._connection.execute(
+            'DELETE FROM gathered_submissions WHERE subreddit = ? AND query = ? AND start = ? AND end = ?',
+            (subreddit, query, start, end)
+        )
+        self._gathered_ids.difference_update(completed_ids)
+
+        # consecutive intervals are 1 second apart, see `get_timestamps_interval`
+        adjacent_ranges = self._connection.execute(
+            'SELECT rowid, start, end FROM completed_ranges WHERE subreddit = ? AND query = ? AND start <= ? AND end >= ?',
+            (subreddit, query, end + 1, start - 1)
+        ).fetchall()
+
+        for rowid, range_start, range_end in adjacent_ranges:
+            start = min(start, range_start)
+            end = max(end, range_end)
+            self._connection.execute('DELETE FROM completed_ranges WHERE rowid = ?', (rowid,))
+
+        self._connection.execute(
+            'INSERT INTO completed_ranges (subreddit, query, start, end) VALUES (?, ?, ?, ?)',
+            (subreddit, query, start, end)
+        )
+
+
+def _query_key(query):
+    return query if query is not None else ''
@@ -1,51 +1,149 @@
 import os
-import boto3
+import threading
+import time
 import math
 from datetime import datetime
 
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 SIMPLE_DATE_FORMAT = '%Y-%m-%d'
 
-if os.getenv('AWS_SAM_LOCAL') == 'true':
-    dynamodb = boto3.resource('dynamodb', endpoint_url='http://localhost:8000')
-else:
-    dynamodb = boto3.resource('dynamodb')
+# maximum no. of keys per BatchGetItem request
+BATCH_GET_SIZE = 100
 
-table = dynamodb.Table(os.getenv('LAST_SEARCHED_DATE_TABLE'))
+_dynamodb = None
+_table = None
+_resource_lock = threading.Lock()
 
 
-def get_last_searched_date():
+def get_dynamodb():
+    """Returns the DynamoDB resource, created on first use and reused afterwards, so importing
+    this module neither imports boto3 nor loads its service models.
+
+    Returns:
+
+    boto3.resources.base.ServiceResource: DynamoDB resource
+    """
+    global _dynamodb
+
+    with _resource_lock:
+        if _dynamodb is None:
+            import boto3
+
+            if os.getenv('AWS_SAM_LOCAL') == 'true':
+                _dynamodb = boto3.resource('dynamodb', endpoint_url='http://localhost:8000')
+            else:
+                _dynamodb = boto3.resource('dynamodb')
+
+    return _dynamodb
+
+
+def get_table():
+    """Returns the `LAST_SEARCHED_DATE_TABLE` table, created on first use and reused afterwards."""
+    global _table
+
+    dynamodb = get_dynamodb()
+    with _resource_lock:
+        if _table is None:
+            _table = dynamodb.Table(os.getenv('LAST_SEARCHED_DATE_TABLE'))
+
+    return _table
+
+
+def get_stream_id(subreddit, keyword = None):
+    """Builds the watermark id of a (subreddit, keyword) stream, within the current `LANGUAGE`.
+
+    Parameters:
+
+    subreddit (str): subreddit title
+
+    keyword (str) - optional: searched keyword, None when every submission is gathered
+
+    Returns:
+
+    str: watermark id
+    """
+    return f'{os.getenv("LANGUAGE")}#{subreddit}#{keyword if keyword is not None else ""}'
+
+
+def get_last_searched_dates(streams):
+    """Reads the watermarks of (subreddit, keyword) streams, in BatchGetItem requests.
+    Streams without a watermark of their own start where the single watermark of the `LANGUAGE`,
+    saved by previous versions, stopped, or at `START_DATE`.
+
+    Parameters:
+
+    streams (list of tuples): (subreddit, keyword) pairs
+
+    Returns:
+
+    dict: (subreddit, keyword) pair to the next date to be searched
+    """
     default_date = datetime.strptime(os.getenv('START_DATE'), SIMPLE_DATE_FORMAT)
+    language_id = os.getenv('LANGUAGE')
 
     try:
-        response = table.get_item(
-            Key = { 'id': os.getenv('LANGUAGE') }
-        )
-        item = response['Item']
-        print(f'Item found: {item}')
-        if item != None:
-            db_date = datetime.strptime(item['last_searched_date'], DATE_FORMAT)
-            timestamp = math.ceil(db_date.timestamp()) + 1
-            return datetime.fromtimestamp(timestamp)
-
-        return default_date
+        stream_ids = { get_stream_id(subreddit, keyword): (subreddit, keyword) for subreddit, keyword in streams }
+        items = _batch_get_items([language_id] + list(stream_ids.keys()))
+        print(f'{len(items)} watermarks found')
+
+        dates = { item['id']: _get_next_date(item['last_searched_date']) for item in items }
+        default_date = dates.get(language_id, default_date)
+
+        return { stream: dates.get(stream_id, default_date) for stream_id, stream in stream_ids.items() }
     except Exception as e:
-        print(f'Error while retrieving date from Dynamo: {e}')
-        return default_date
+        print(f'Error while retrieving dates from Dynamo: {e}')
+        return { stream: default_date for stream in streams }
+
 
+def save_last_searched_dates(last_searched_dates):
+    """Saves the watermarks of (subreddit, keyword) streams, in BatchWriteItem requests.
 
-def save_last_searched_date(last_searched_date):
+    Parameters:
+
+    last_searched_dates (dict): (subreddit, keyword) pair to its last searched date
+    """
     try:
-        date_string = last_searched_date.strftime(DATE_FORMAT)
-        response = table.put_item(
-            Item = {
-                'id': os.getenv('LANGUAGE'),
-                'last_searched_date': date_string,
-            }
-        )
-
-        print(f'Put response: {response}')
+        with get_table().batch_writer(overwrite_by_pkeys=['id']) as batch:
+            for (subreddit, keyword), last_searched_date in last_searched_dates.items():
+                batch.put_item(
+                    Item = {
+                        'id': get_stream_id(subreddit, keyword),
+                        'last_searched_date': last_searched_date.strftime(DATE_FORMAT),
+                    }
+                )
+
+        print(f'{len(last_searched_dates)} watermarks saved')
         return None
     except Exception as e:
-        print(f'Error while saving date {last_searched_date} on Dynamo: {e}')
+        print(f'Error while saving {len(last_searched_dates)} watermarks on Dynamo: {e}')
         raise e
+
+
+def _batch_get_items(ids, max_attempts = 5):
+    dynamodb = get_dynamodb()
+    table = get_table()
+    items = []
+
+    for i in range(0, len(ids), BATCH_GET_SIZE):
+        request_items = { table.name: { 'Keys': [{ 'id': id } for id in ids[i:i + BATCH_GET_SIZE]] } }
+
+        for attempt in range(max_attempts):
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response['Responses'].get(table.name, []))
+
+            # keys left unprocessed by throttling are requested again
+            request_items = response.get('UnprocessedKeys', {})
+            if len(request_items) == 0:
+                break
+
+            time.sleep(0.1 * 2 ** attempt)
+        else:
+            raise Exception(f'{len(request_items[table.name]["Keys"])} watermarks left unprocessed by Dynamo')
+
+    return items
+
+
+def _get_next_date(last_searched_date):
+    db_date = datetime.strptime(last_searched_date, DATE_FORMAT)
+    timestamp = math.ceil(db_date.timestamp()) + 1
+    return datetime.fromtimestamp(timestamp)
@@ -1,5 +1,23 @@
 import os
-from pymongo import MongoClient
+import threading
 
-client = MongoClient(os.getenv('MONGODB_URL'))
-mongo_db = client[os.getenv('MONGO_DATABASE')]
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_mongo_db():
+    """Returns the `MONGO_DATABASE` database. The MongoDB client is created on first use and reused afterwards,
+    so importing the gatherer modules neither imports pymongo nor connects to MongoDB, e.g. when writing on files.
+
+    Returns:
+
+    pymongo.database.Database: MongoDB database
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            from pymongo import MongoClient
+            _client = MongoClient(os.getenv('MONGODB_URL'))
+
+    return _client[os.getenv('MONGO_DATABASE')]
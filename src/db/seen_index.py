@@ -0,0 +1,212 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+
+
+# file header: magic, format version, bytes per id and no. of ids
+HEADER = struct.Struct('<4sBBxxQ')
+MAGIC = b'RSID'
+VERSION = 1
+
+# Reddit ids are base 36 numbers, 7 digits today, 6 bytes hold up to 9 digits
+ID_BYTES = 6
+MAX_ID = 2 ** (8 * ID_BYTES) - 1
+
+
+class SeenIndex:
+    """Persistent index of the ids already gathered, so overlapping runs skip known submissions before
+    requesting or writing them. Ids are stored as sorted base 36 numbers, `ID_BYTES` bytes each, on a file
+    that is memory-mapped instead of read: loading takes the same time whatever its size, and only the pages
+    touched by lookups, binary searches over the file, are read from disk. A million ids take 6 MB.
+
+    Ids added are kept in memory and merged into the file by `save`, which should only be called once
+    the added documents are written, so the index is never ahead of the gathered data. When writing them fails,
+    `discard` forgets them, as they are seen until then.
+
+    Parameters:
+
+    path (str): index file, created by the first `save`
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._data = b''
+        self._size = 0
+        self._new_ids = set()
+        self._open()
+
+
+    def is_seen(self, id):
+        """Checks whether an id was gathered, on this run or on a previous one.
+
+        Parameters:
+
+        id (str): Reddit id, with or without its type prefix, e.g. `t3_`
+
+        Returns:
+
+        bool: whether the id is on the index
+        """
+        value = _encode(id)
+        if value is None:
+            return False
+
+        with self._lock:
+            return value in self._new_ids or self._contains(value)
+
+
+    def add(self, ids):
+        """Adds gathered ids to the index, persisted by the next `save`.
+
+        Parameters:
+
+        ids (iterable of str): Reddit ids
+        """
+        values = [value for value in map(_encode, ids) if value is not None]
+
+        with self._lock:
+            self._new_ids.update(value for value in values if not self._contains(value))
+
+
+    def save(self):
+        """Merges the added ids into the index file, replacing it atomically."""
+        with self._lock:
+            if len(self._new_ids) == 0 and self._file is not None:
+                return
+
+            new_ids = sorted(self._new_ids)
+            temporary_path = f'{self.path}.tmp'
+
+            with open(temporary_path, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, VERSION, ID_BYTES, self._size + len(new_ids)))
+
+                # runs of stored ids between two new ids are copied as they are
+                chunk = []
+                start = 0
+                for value in new_ids:
+                    end = self._bisect(value) if self._size > 0 else 0
+                    if end > start:
+                        chunk.append(self._data[HEADER.size + start * ID_BYTES:HEADER.size + end * ID_BYTES])
+                    chunk.append(value.to_bytes(ID_BYTES, 'big'))
+                    start = end
+
+                    if len(chunk) >= 65536:
+                        file.write(b''.join(chunk))
+                        chunk = []
+                chunk.append(self._data[HEADER.size + start * ID_BYTES:HEADER.size + self._size * ID_BYTES])
+                file.write(b''.join(chunk))
+
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temporary_path, self.path)
+            self._new_ids = set()
+            self._close()
+            self._open()
+
+
+    def discard(self):
+        """Forgets the ids added since the last `save`, e.g. when their documents could not be written."""
+        with self._lock:
+            self._new_ids = set()
+
+
+    def rebuild(self, ids):
+        """Replaces every id of the index, e.g. with the ids stored on the database.
+
+        Parameters:
+
+        ids (iterable of str): Reddit ids
+        """
+        with self._lock:
+            self._close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._new_ids = set(value for value in map(_encode, ids) if value is not None)
+
+        self.save()
+
+
+    def count(self):
+        """Counts the ids of the index.
+
+        Returns:
+
+        int: no. of ids saved or added
+        """
+        with self._lock:
+            return self._size + len(self._new_ids)
+
+
+    def close(self):
+        """Unmaps the index file. Ids added since the last `save` are lost."""
+        with self._lock:
+            self._close()
+
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= HEADER.size:
+            return
+
+        self._file = open(self.path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, id_bytes, size = HEADER.unpack(self._data[:HEADER.size])
+        if magic != MAGIC or version != VERSION or id_bytes != ID_BYTES:
+            self._close()
+            raise Exception(f'"{self.path}" is not a seen id index, or was written by another version')
+
+        self._size = size
+
+
+    def _close(self):
+        if self._file is not None:
+            self._data.close()
+            self._file.close()
+
+        self._file = None
+        self._data = b''
+        self._size = 0
+
+
+    def _contains(self, value):
+        position = self._bisect(value)
+        return position < self._size and self._get(position) == value
+
+
+    def _bisect(self, value):
+        return bisect.bisect_left(_IdView(self), value)
+
+
+    def _get(self, position):
+        offset = HEADER.size + position * ID_BYTES
+        return int.from_bytes(self._data[offset:offset + ID_BYTES], 'big')
+
+
+class _IdView:
+    """Sequence of the ids of an index file, to be binary searched."""
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index._size
+
+    def __getitem__(self, position):
+        return self._index._get(position)
+
+
+def _encode(id):
+    if not isinstance(id, str):
+        return None
+
+    # fullnames, e.g. `t3_abc123`, are stored by their id
+    id = id.rsplit('_', 1)[-1]
+    try:
+        value = int(id, 36)
+    except ValueError:
+        return None
+
+    return value if 0 <= value <= MAX_ID else None
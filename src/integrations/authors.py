@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from src.utils.metrics import metrics
+
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+
+class AuthorCache:
+    """Bounded LRU cache of author objects, keyed by Redditor fullname (`t2_` prefixed id).
+    Entries expire after `ttl` seconds, and the cache can be persisted to a JSON file across runs.
+
+    Parameters:
+
+    max_size (int) - optional: maximum no. of cached authors
+
+    ttl (float) - optional: no. of seconds an author is kept before being resolved again
+
+    path (str) - optional: JSON file where the cache is loaded from and saved to
+    """
+    def __init__(self, max_size = 100000, ttl = DEFAULT_TTL, path = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, fullname):
+        """Returns a cached author.
+
+        Parameters:
+
+        fullname (str): Redditor fullname
+
+        Returns:
+
+        tuple: (True, author object) when cached, (False, None) when missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(fullname)
+            if entry is None:
+                return False, None
+
+            cached_at, author = entry
+            if time.time() - cached_at > self.ttl:
+                del self._entries[fullname]
+                return False, None
+
+            self._entries.move_to_end(fullname)
+            return True, author
+
+
+    def put(self, fullname, author, cached_at = None):
+        """Caches an author, evicting the least recently used one when full.
+
+        Parameters:
+
+        fullname (str): Redditor fullname
+
+        author (dict): author object, or None for authors that could not be resolved
+
+        cached_at (float) - optional: timestamp of the entry, defaults to now
+        """
+        with self._lock:
+            self._entries[fullname] = (cached_at if cached_at is not None else time.time(), author)
+            self._entries.move_to_end(fullname)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    def load(self):
+        """Loads the non-expired entries persisted on `path`, if any."""
+        if self.path is None or not os.path.exists(self.path):
+            return
+
+        with open(self.path) as file:
+            entries = json.load(file)
+
+        now = time.time()
+        for fullname, (cached_at, author) in entries.items():
+            if now - cached_at <= self.ttl:
+                self.put(fullname, author, cached_at)
+
+        print(f'{len(self._entries)} authors loaded from cache')
+
+
+    def save(self):
+        """Persists the cache entries on `path`, if given."""
+        if self.path is None:
+            return
+
+        with self._lock:
+            entries = { fullname: list(entry) for fullname, entry in self._entries.items() }
+
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(entries, file)
+        os.replace(temporary_path, self.path)
+
+
+class AuthorResolver:
+    """Resolves the authors of comments and submissions in bulk through Reddit's partial redditors endpoint,
+    100 authors per request, keeping them on an `AuthorCache` so each author is only fetched once.
+    The endpoint only returns name, karma and creation date, so the remaining author fields, e.g. `is_mod`, are left as None,
+    unlike authors fetched on their own, see `get_author_data`. It is thus opt-in, e.g. through `--bulkAuthors` on `main.py`.
+
+    Parameters:
+
+    reddit (praw.Reddit): PRAW Reddit instance
+
+    cache (AuthorCache): cache of resolved authors
+    """
+    def __init__(self, reddit, cache):
+        self.reddit = reddit
+        self.cache = cache
+
+
+    def resolve(self, fullnames):
+        """Resolves the given authors, fetching only the ones missing from the cache.
+
+        Parameters:
+
+        fullnames (iterable of str): Redditor fullnames. None values are ignored
+
+        Returns:
+
+        dict: Redditor fullname to author object map. Authors not found (e.g. suspended ones) map to None
+        """
+        authors = {}
+        missing_fullnames = []
+
+        for fullname in set(fullname for fullname in fullnames if fullname is not None):
+            is_cached, author = self.cache.get(fullname)
+            if is_cached:
+                authors[fullname] = author
+            else:
+                missing_fullnames.append(fullname)
+
+        if len(missing_fullnames) == 0:
+            return authors
+
+        with metrics.time('reddit.partial_redditors_ms'):
+            partial_redditors = list(self.reddit.redditors.partial_redditors(missing_fullnames))
+        metrics.increment('reddit.authors', len(missing_fullnames))
+
+        for partial_redditor in partial_redditors:
+            authors[partial_redditor.fullname] = get_author_data_from_partial_redditor(partial_redditor)
+
+        for fullname in missing_fullnames:
+            authors.setdefault(fullname, None)
+            self.cache.put(fullname, authors[fullname])
+
+        return authors
+
+
+    def resolve_for(self, items):
+        """Resolves the authors of PRAW comments or submissions by their `author_fullname`. The attribute is read
+        from the instance data only, so lazy instances are never fetched.
+
+        Parameters:
+
+        items (list of praw.models.Comment or praw.models.Submission): PRAW instances
+
+        Returns:
+
+        dict: Redditor fullname to author object map
+        """
+        return self.resolve(vars(item).get('author_fullname') for item in items)
+
+
+def get_author_data_from_partial_redditor(partial_redditor):
+    """Creates a author object from a PRAW PartialRedditor, with the same fields as `get_author_data`
+
+    Parameters:
+
+    partial_redditor (praw.models.redditors.PartialRedditor): PRAW PartialRedditor instance
+
+    Returns:
+
+    dict: object with information about a Reddit user, like his name or id
+    """
+    return {
+        "name": getattr(partial_redditor, 'name', None),
+        "id": partial_redditor.fullname[3:],
+        "comment_karma": getattr(partial_redditor, 'comment_karma', None),
+        "created_utc": getattr(partial_redditor, 'created_utc', None),
+        "is_suspended": getattr(partial_redditor, 'is_suspended', None),
+        "is_mod": None,
+        "is_employee": None,
+        "has_verified_email": None
+    }
@@ -0,0 +1,205 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappop, heappush
+from itertools import count
+from praw.models import MoreComments
+from src.parsers.reddit_parser import get_comments_data
+from src.utils.metrics import metrics
+
+
+class CommentHarvester:
+    """Expands and parses the comment trees of several submissions concurrently. The no. of MoreComments
+    expansions per submission can be limited by `more_comments_budget`, and comments deeper than `max_depth`
+    are left out, without expanding the MoreComments holding them. Submissions whose trees were not completely harvested are recorded on `truncated_threads`,
+    so they can be revisited later.
+
+    A `praw.Reddit` instance is not thread safe, and PRAW submissions fetch their comment trees through the
+    instance that created them. Given a `ThreadLocalReddit`, each worker fetches the trees, and parses their comments,
+    through submissions bound to its own instance. Otherwise, the trees are expanded one at a time,
+    so the instance of the submissions is never used by two workers at once.
+
+    Parameters:
+
+    max_workers (int) - optional: no. of comment trees expanded at the same time
+
+    more_comments_budget (int) - optional: maximum no. of MoreComments expanded per submission. None expands all of them
+
+    max_depth (int) - optional: maximum depth of harvested comments, starting at 0 for top-level comments. None harvests every level
+
+    author_resolver (AuthorResolver) - optional: resolves the comment authors in bulk. Without it, each author is fetched on its own.
+    It should resolve through the same `ThreadLocalReddit`, as it is called by the workers
+
+    reddit (ThreadLocalReddit) - optional: Reddit instance per worker, through which comment trees are fetched
+    """
+    def __init__(self, max_workers = 4, more_comments_budget = None, max_depth = None, author_resolver = None, reddit = None):
+        self.max_workers = max_workers
+        self.author_resolver = author_resolver
+        self.more_comments_budget = more_comments_budget
+        self.max_depth = max_depth
+        self.reddit = reddit
+        self.truncated_threads = []
+        self._lock = threading.Lock()
+        self._expand_lock = threading.Lock()
+
+
+    def harvest(self, submissions, on_harvested = None):
+        """Expands the comment trees of the given submissions on a thread pool and yields their parsed comments,
+        one submission after another, in the given submissions order. Only a bounded window of submissions is
+        expanded ahead of the consumer.
+
+        Parameters:
+
+        submissions (iterable of praw.models.Submission): PRAW submission instances
+
+        on_harvested (function) - optional: called with each submission once all of its comments were yielded
+
+        Returns:
+
+        generator of dicts: non-empty comment objects
+        """
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                for submission in submissions:
+                    in_flight.append((submission, executor.submit(self._expand, submission)))
+
+                    if len(in_flight) >= self.max_workers * 2:
+                        yield from self._parse(*in_flight.popleft(), on_harvested)
+
+                while len(in_flight) > 0:
+                    yield from self._parse(*in_flight.popleft(), on_harvested)
+            finally:
+                for _, future in in_flight:
+                    future.cancel()
+
+
+    def _expand(self, submission):
+        if self.reddit is not None:
+            # fetched through the Reddit instance of this worker, instead of the one that hydrated the submission
+            return self._expand_tree(submission, self.reddit.submission(id=submission.id))
+
+        with self._expand_lock:
+            return self._expand_tree(submission, submission)
+
+
+    def _expand_tree(self, submission, tree_submission):
+        with metrics.time('reddit.comment_tree_ms'):
+            if self.max_depth is None:
+                skipped_more_comments = tree_submission.comments.replace_more(limit=self.more_comments_budget)
+                raw_comments = tree_submission.comments.list()
+                depth_capped_more_comments = []
+            else:
+                raw_comments, skipped_more_comments, depth_capped_more_comments = self._expand_to_depth(tree_submission)
+        metrics.increment('reddit.comment_trees')
+        metrics.increment('reddit.comments', len(raw_comments))
+        metrics.increment('reddit.more_comments_skipped', len(skipped_more_comments) + len(depth_capped_more_comments))
+
+        if self.max_depth is not None:
+            all_comments = len(raw_comments)
+            # comments deeper than the cap already loaded along with the tree, at no extra request
+            raw_comments = [raw_comment for raw_comment in raw_comments if getattr(raw_comment, 'depth', 0) <= self.max_depth]
+            depth_capped_comments = all_comments - len(raw_comments) + sum(getattr(more_comments, 'count', 0) for more_comments in depth_capped_more_comments)
+        else:
+            depth_capped_comments = 0
+
+        if len(skipped_more_comments) > 0 or depth_capped_comments > 0 or len(depth_capped_more_comments) > 0:
+            self._record_truncated_thread(submission, skipped_more_comments, depth_capped_comments, depth_capped_more_comments)
+
+        authors = self.author_resolver.resolve_for(raw_comments) if self.author_resolver is not None else None
+
+        # parsed on the worker, as it may fetch lazy comment attributes, e.g. authors, through its Reddit instance
+        return get_comments_data(raw_comments, authors)
+
+
+    def _expand_to_depth(self, submission):
+        """Expands the MoreComments of a comment tree, largest first as `replace_more` does, but only the ones
+        holding comments within `max_depth`, so no request is made for comments left out anyway.
+
+        Returns:
+
+        tuple: (list of comments, MoreComments skipped by the budget, MoreComments deeper than `max_depth`)
+        """
+        comments = []
+        depths = {}
+        more_comments = []
+        skipped_more_comments = []
+        depth_capped_more_comments = []
+        order = count()
+
+        def add(items):
+            for item in _flatten(items):
+                if isinstance(item, MoreComments):
+                    item.submission = submission
+                    # the largest MoreComments first, in discovery order among equal ones
+                    heappush(more_comments, (-(item.count or 0), next(order), item))
+                else:
+                    comments.append(item)
+                    depths[item.id] = getattr(item, 'depth', None)
+
+        add(submission.comments)
+        expanded = 0
+
+        while len(more_comments) > 0:
+            _, _, item = heappop(more_comments)
+
+            if _get_more_comments_depth(item, depths) > self.max_depth:
+                depth_capped_more_comments.append(item)
+                continue
+
+            if self.more_comments_budget is not None and expanded >= self.more_comments_budget:
+                skipped_more_comments.append(item)
+                continue
+
+            expanded += 1
+            add(item.comments())
+
+        return comments, skipped_more_comments, depth_capped_more_comments
+
+
+    def _parse(self, submission, expanded_submission, on_harvested):
+        yield from expanded_submission.result()
+
+        if on_harvested is not None:
+            on_harvested(submission)
+
+
+    def _record_truncated_thread(self, submission, skipped_more_comments, depth_capped_comments, depth_capped_more_comments = ()):
+        with self._lock:
+            self.truncated_threads.append({
+                "id": submission.id,
+                "submission_name": getattr(submission, 'name', None),
+                "num_comments": getattr(submission, 'num_comments', None),
+                "more_comments_left": len(skipped_more_comments),
+                "comments_left": sum(getattr(more_comments, 'count', 0) for more_comments in skipped_more_comments),
+                "depth_capped_comments": depth_capped_comments,
+                "depth_capped_more_comments": len(depth_capped_more_comments),
+            })
+
+
+def _flatten(items):
+    """Flattens comments, along with their replies, and MoreComments, as `CommentForest.list` does."""
+    flattened = []
+    queue = deque(items)
+    while len(queue) > 0:
+        item = queue.popleft()
+        flattened.append(item)
+        if not isinstance(item, MoreComments):
+            queue.extend(getattr(item, 'replies', []))
+
+    return flattened
+
+
+def _get_more_comments_depth(more_comments, depths):
+    """Returns the depth of the comments behind a MoreComments: the depth sent by Reddit or, when missing,
+    the depth below its parent. Unknown depths are assumed to be within any cap."""
+    depth = getattr(more_comments, 'depth', None)
+    if depth is not None:
+        return depth
+
+    parent_id = more_comments.parent_id or ''
+    if parent_id.startswith('t3_'):
+        return 0
+
+    parent_depth = depths.get(parent_id[3:])
+    return parent_depth + 1 if parent_depth is not None else 0
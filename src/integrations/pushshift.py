@@ -1,10 +1,337 @@
 import json
+import os
+import random
+import threading
+import time
 import requests
-from datetime import datetime
+from urllib.parse import quote
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from src.db.capture_store import normalize_request
+from src.utils.metrics import metrics
+from src.utils.rate_limiter import TokenBucket
 
 
 PUSHSHIFT_URL = "https://api.pushshift.io/reddit/search/submission/"
 
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+# maximum URL encoded length of a search query, keeping full request URLs, along with
+# a group of comma separated subreddits, under the usual 2048 characters limit
+MAX_QUERY_LENGTH = 1200
+
+
+class PushshiftClient:
+    """Reusable Pushshift API client. Keeps a pool of keep-alive connections, applies a timeout to every request
+    and retries throttled (429), failed (5xx) and broken requests with jittered exponential backoff,
+    honoring the `Retry-After` header when sent. Every attempt takes a token from the rate limiter.
+
+    Parameters:
+
+    rate_limiter (TokenBucket): rate limiter shared by every request made through the client
+
+    timeout (float or tuple) - optional: requests timeout, in seconds, as accepted by `requests`
+
+    max_retries (int) - optional: no. of retries before giving up on a request
+
+    backoff_factor (float) - optional: base delay, in seconds, of the exponential backoff
+
+    max_backoff (float) - optional: maximum delay, in seconds, between retries
+
+    pool_size (int) - optional: maximum no. of kept-alive connections
+    """
+    def __init__(self, rate_limiter, timeout = (5, 30), max_retries = 5, backoff_factor = 1, max_backoff = 60, pool_size = 16):
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0,
+        }
+
+
+    def get_json(self, request_url):
+        """Requests an URL, retrying when possible, and returns its decoded JSON body.
+
+        Parameters:
+
+        request_url (str): full request URL
+
+        Returns:
+
+        dict: decoded response body, or None when empty
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+
+            response = None
+            error = None
+            started_at = time.monotonic()
+            try:
+                response = self.session.get(request_url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                self._record_request(time.monotonic() - started_at)
+
+            if response is not None and response.status_code == 200:
+                return response.json() if response.text else None
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                self._increment('failures')
+                raise Exception(response.text)
+
+            reason = error if error is not None else f'status code {response.status_code}'
+            if attempt == self.max_retries:
+                self._increment('failures')
+                raise Exception(f'Giving up on {request_url} after {attempt + 1} attempts: {reason}')
+
+            delay = self._get_retry_delay(attempt, response)
+            self._increment('retries')
+            print(f'Request failed ({reason}), retrying in {delay:.1f}s...')
+            time.sleep(delay)
+
+
+    def get_stats(self):
+        """Returns the request counters of the client.
+
+        Returns:
+
+        dict: no. of requests, retries and failures, plus average and maximum latency in seconds
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats['average_latency'] = stats['total_latency'] / stats['requests'] if stats['requests'] > 0 else 0.0
+        return stats
+
+
+    def _get_retry_delay(self, attempt, response):
+        retry_after = _parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+
+    def _record_request(self, latency):
+        with self._stats_lock:
+            self._stats['requests'] += 1
+            self._stats['total_latency'] += latency
+            self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+
+        metrics.increment('pushshift.requests')
+        metrics.observe('pushshift.request_ms', latency * 1000)
+
+
+    def _increment(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+        metrics.increment(f'pushshift.{counter}')
+
+
+def _parse_retry_after(value):
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# shared by every thread searching Pushshift, so concurrent searches never exceed the API rate limit
+pushshift_client = PushshiftClient(
+    rate_limiter=TokenBucket(
+        rate=float(os.getenv('PUSHSHIFT_REQUESTS_PER_SECOND', 1)),
+        capacity=int(os.getenv('PUSHSHIFT_BURST_SIZE', 1)),
+    ),
+    timeout=float(os.getenv('PUSHSHIFT_TIMEOUT', 30)),
+    max_retries=int(os.getenv('PUSHSHIFT_MAX_RETRIES', 5)),
+)
+
+
+_capture_store = None
+
+
+def set_capture_store(capture_store):
+    """Sets where Pushshift responses are captured and replayed from, according to the store mode.
+
+    Parameters:
+
+    capture_store (CaptureStore): capture store, or None to always request Pushshift
+    """
+    global _capture_store
+    _capture_store = capture_store
+
+
+def get_pushshift_json(request_url):
+    """Requests an URL from Pushshift API through the shared client and returns its decoded JSON body.
+    With a capture store set, responses are captured, and reused or replayed depending on its mode.
+
+    Parameters:
+
+    request_url (str): full request URL
+
+    Returns:
+
+    dict: decoded response body, or None when empty
+    """
+    capture_store = _capture_store
+    if capture_store is None:
+        return pushshift_client.get_json(request_url)
+
+    capture_key = normalize_request(request_url)
+    if capture_store.reads:
+        captured_body = capture_store.get(capture_key)
+        if captured_body is not None:
+            return json.loads(captured_body)
+
+    if not capture_store.requests:
+        raise Exception(f'No captured response to replay for {request_url}')
+
+    response_json = pushshift_client.get_json(request_url)
+    capture_store.put(capture_key, json.dumps(response_json).encode('utf-8'))
+    return response_json
+
+
+def build_keyword_queries(keywords, max_length = MAX_QUERY_LENGTH):
+    """Folds keywords into as few Pushshift OR queries (e.g. `soccer|"world cup"`) as possible,
+    so a single search returns the submissions of several keywords. Multi-word keywords are quoted
+    to be searched as phrases, and each query is kept within `max_length` URL encoded characters.
+
+    Parameters:
+
+    keywords (list of str): keywords to search
+
+    max_length (int) - optional: maximum URL encoded length of each query. Longer keywords get a query of their own
+
+    Returns:
+
+    list of str: OR queries, covering every given keyword once
+    """
+    queries = []
+    terms = []
+    length = 0
+
+    for keyword in dict.fromkeys(keyword.strip() for keyword in keywords if keyword.strip() != ''):
+        term = f'"{keyword}"' if ' ' in keyword else keyword
+        term_length = len(quote(term))
+        # the `|` separator takes 3 URL encoded characters
+        if len(terms) > 0 and length + 3 + term_length > max_length:
+            queries.append('|'.join(terms))
+            terms = []
+            length = 0
+
+        length += term_length if len(terms) == 0 else 3 + term_length
+        terms.append(term)
+
+    if len(terms) > 0:
+        queries.append('|'.join(terms))
+
+    return queries
+
+
+def walk_pages(search_url, after, before = None, size = 500, query = ''):
+    """Lazily walks every page of a Pushshift search. Results are requested in ascending `created_utc` order
+    and the `created_utc` of the last result of a page is used as cursor for the next one, until the `total_results`
+    reported on the response metadata fits in the current page.
+
+    Parameters:
+
+    search_url (str): search endpoint URL along with its filters, e.g. `...?subreddit=news`
+
+    after (int): timestamp results are created after
+
+    before (int) - optional: timestamp results are created before, unbounded by default
+
+    size (int) - optional: page size requested to the Pushshift API.
+
+    query (str) - optional: URL parameters appended to every request, e.g. `&q=soccer`
+
+    Returns:
+
+    generator of lists: pages of results
+    """
+    before_filter = f'&before={before}' if before is not None else ''
+    # results sharing the cursor timestamp are requested again on the next page
+    # (the cursor is moved one second back), so the ones already yielded are skipped
+    ids_at_cursor = set()
+
+    while True:
+        request_url = f'{search_url}&after={after}{before_filter}&size={size}' \
+            f'&sort=asc&sort_type=created_utc&metadata=true{query}'
+
+        response_json = get_pushshift_json(request_url)
+        if response_json is None or len(response_json.get("data", [])) == 0:
+            return
+
+        data = response_json["data"]
+        page = [result for result in data if result["id"] not in ids_at_cursor]
+
+        if len(page) > 0:
+            yield page
+
+        total_results = response_json.get("metadata", {}).get("total_results")
+        is_last_page = total_results <= len(data) if total_results is not None else len(data) < size
+        if is_last_page:
+            return
+
+        cursor = data[-1]["created_utc"]
+        if len(page) == 0:
+            # a whole page within the same second: nothing new can be reached by rewinding the cursor
+            if after >= cursor:
+                return
+            after = cursor
+            ids_at_cursor = set()
+            continue
+
+        if cursor - 1 != after:
+            ids_at_cursor = set()
+        ids_at_cursor.update(result["id"] for result in data if result["created_utc"] == cursor)
+        after = cursor - 1
+
+
+def get_submission_pages_for_interval(subreddit, interval, keyword = None, size = 500):
+    """Lazily walks every page of a Pushshift search for a keyword, if given, inside a subreddit
+    within a time interval, see `walk_pages`.
+
+    Parameters:
+
+    keyword (str): keyword or query to search, see `build_keyword_queries`
+
+    subreddit (str): subreddit title, or comma separated subreddit titles to search them together
+
+    interval (tuple): interval object (tuple) representing starting timestamp and ending timestamp
+
+    size (int) - optional: page size requested to the Pushshift API.
+
+    Returns:
+
+    generator of lists: pages of submissions
+    """
+    keyword_query = f'&q={quote(keyword)}' if keyword is not None else ''
+
+    return walk_pages(f'{PUSHSHIFT_URL}?subreddit={subreddit}', interval[0], interval[1], size, keyword_query)
+
 
 def get_ids_from_submissions_with_keywords_for_interval(subreddit, interval, keyword = None, size = 500):
     """Search for a keyword, if given, inside a subreddit within a time interval
@@ -22,30 +349,15 @@ def get_ids_from_submissions_with_keywords_for_interval(subreddit, interval, key
 
     Returns:
 
-    list: a list of submission ids
+    generator of lists: lazy pages of submission ids, walking the whole interval
     """
-    keyword_query = f'&q={keyword}' if keyword is not None else ''
-    if keyword is None:
-        print(f'Searching without keywords...')
-    
-    request_url = f'{PUSHSHIFT_URL}?subreddit={subreddit}&after={interval[0]}&before={interval[1]}&size={size}&metadata=true{keyword_query}'
-    print(request_url)
-
-    response = requests.get(request_url)
-    if response.status_code != 200 or response.text is None:
-        raise Exception(response.text)
-    
-    response_json = response.json()
-
-    if (response_json == None):
-        return []
-
-    return list(map(lambda submission: submission["id"], response_json["data"]))
+    for page in get_submission_pages_for_interval(subreddit, interval, keyword, size):
+        yield list(map(lambda submission: submission["id"], page))
 
 
 def get_submissions_with_keywords_for_interval(subreddit, interval, keyword = None, size = 500):
     """Search for a keyword, if given, inside a subreddit within a time interval
-    and returns the respective submission ids found. Pushshift API is used for searching.
+    and returns the respective submissions found. Pushshift API is used for searching.
 
     Parameters:
 
@@ -59,22 +371,6 @@ def get_submissions_with_keywords_for_interval(subreddit, interval, keyword = No
 
     Returns:
 
-    list: a list of submissions
+    generator of lists: lazy pages of submissions, walking the whole interval
     """
-    keyword_query = f'&q={keyword}' if keyword is not None else ''
-    if keyword is None:
-        print(f'Searching without keywords...')
-    
-    request_url = f'{PUSHSHIFT_URL}?subreddit={subreddit}&after={interval[0]}&before={interval[1]}&size={size}&metadata=true{keyword_query}'
-    print(request_url)
-
-    response = requests.get(request_url)
-    if response.status_code != 200 or response.text is None:
-        raise Exception(response.text)
-    
-    response_json = response.json()
-
-    if (response_json == None):
-        return []
-
-    return response_json["data"]
+    return get_submission_pages_for_interval(subreddit, interval, keyword, size)
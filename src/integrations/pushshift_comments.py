@@ -0,0 +1,56 @@
+from itertools import islice
+from src.integrations.pushshift import walk_pages
+from src.utils.metrics import metrics
+
+
+PUSHSHIFT_COMMENT_URL = "https://api.pushshift.io/reddit/search/comment/"
+
+# no. of submissions whose comments are searched together: 100 ids of 6 or 7 characters
+# keep request URLs under the usual 2048 characters limit
+COMMENT_SEARCH_BATCH_SIZE = 100
+
+
+def get_submission_id(fullname):
+    """Returns the id of a submission from its fullname (e.g. `t3_abc123`), or the id itself when given.
+
+    Parameters:
+
+    fullname (str): submission fullname or id
+
+    Returns:
+
+    str: submission id
+    """
+    return fullname[3:] if fullname.startswith('t3_') else fullname
+
+
+def get_comment_pages_for_submissions(submission_ids, after = 0, size = 500, batch_size = COMMENT_SEARCH_BATCH_SIZE):
+    """Lazily walks every page of the Pushshift comments of the given submissions, searched by `link_id`,
+    `batch_size` submissions per search, instead of walking each comment tree through Reddit. Pages
+    mix the comments of the submissions of a batch, in ascending `created_utc` order.
+
+    Parameters:
+
+    submission_ids (iterable of str): submission ids or fullnames
+
+    after (int) - optional: timestamp the comments are created after, e.g. right before the oldest submission
+
+    size (int) - optional: page size requested to the Pushshift API.
+
+    batch_size (int) - optional: no. of submissions searched per request
+
+    Returns:
+
+    generator of lists: pages of Pushshift comments
+    """
+    submission_ids = iter(submission_ids)
+
+    while True:
+        batch = list(islice(submission_ids, batch_size))
+        if len(batch) == 0:
+            return
+
+        link_ids = ','.join(get_submission_id(submission_id) for submission_id in batch)
+        for page in walk_pages(f'{PUSHSHIFT_COMMENT_URL}?link_id={link_ids}', after, size=size):
+            metrics.increment('pushshift.comments', len(page))
+            yield page
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import praw
+import prawcore
+import requests
+from src.db.capture_store import normalize_request
+from src.utils.metrics import metrics
+
+
+# maximum no. of fullnames accepted by Reddit's /api/info endpoint
+INFO_BATCH_SIZE = 100
+
+ACCESS_TOKEN_PATH = '/api/v1/access_token'
+
+
+class CapturingRequestor(prawcore.Requestor):
+    """PRAW requestor capturing Reddit responses on a `CaptureStore`, and reusing or replaying them
+    depending on the store mode. Access tokens are never captured: the captured token responses
+    only allow replaying, so live runs always request a fresh token.
+
+    Parameters:
+
+    capture_store (CaptureStore): store where responses are captured
+    """
+    def __init__(self, *args, capture_store, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.capture_store = capture_store
+
+
+    def request(self, method, url, *args, **kwargs):
+        capture_key = normalize_request(url, kwargs.get('params'), kwargs.get('data'), method)
+        is_token_request = url.endswith(ACCESS_TOKEN_PATH)
+
+        if self.capture_store.reads and (not is_token_request or not self.capture_store.requests):
+            captured_body = self.capture_store.get(capture_key)
+            if captured_body is not None:
+                return _to_response(json.loads(captured_body), url)
+
+        if not self.capture_store.requests:
+            raise Exception(f'No captured response to replay for {method} {url}')
+
+        response = super().request(method, url, *args, **kwargs)
+        if response.status_code < 500:
+            self.capture_store.put(capture_key, json.dumps(_from_response(response, is_token_request)).encode('utf-8'))
+        return response
+
+
+def _from_response(response, is_token_request):
+    text = response.text
+    if is_token_request and response.status_code == 200:
+        text = json.dumps({ **response.json(), 'access_token': 'captured' })
+
+    # the text is already decoded, and rate limit headers are dropped so replays are not slowed down by them
+    headers = {
+        key: value for key, value in response.headers.items()
+        if key.lower() not in ['content-encoding', 'content-length'] and not key.lower().startswith('x-ratelimit')
+    }
+    return { 'status_code': response.status_code, 'headers': headers, 'text': text }
+
+
+def _to_response(captured_response, url):
+    response = requests.Response()
+    response.status_code = captured_response['status_code']
+    response.headers.update(captured_response['headers'])
+    response._content = captured_response['text'].encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
+
+
+def create_reddit_client(capture_store = None):
+    """Creates a PRAW Reddit instance from the REDDIT_* environment variables.
+
+    Parameters:
+
+    capture_store (CaptureStore) - optional: store where Reddit responses are captured, see `CapturingRequestor`
+
+    Returns:
+
+    praw.Reddit: authenticated Reddit instance
+    """
+    capture_options = {
+        'requestor_class': CapturingRequestor,
+        'requestor_kwargs': { 'capture_store': capture_store },
+    } if capture_store is not None else {}
+
+    return praw.Reddit(
+        client_id=os.getenv('REDDIT_CLIENT_ID'),
+        client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
+        password=os.getenv('REDDIT_PASSWORD'),
+        user_agent=os.getenv('REDDIT_USERAGENT'),
+        username=os.getenv('REDDIT_USERNAME'),
+        **capture_options
+    )
+
+
+class ThreadLocalReddit:
+    """PRAW Reddit instance per thread, as a `praw.Reddit` instance is not thread safe. Attributes are read from the
+    instance of the calling thread, created by `create_client` on its first use, so the threads of a pipeline or of
+    a pool can share this object. PRAW models keep the instance that created them, so the lazy loads of a model
+    should happen on the thread that created it, see `CommentHarvester`.
+
+    Parameters:
+
+    create_client (function): called with no arguments to create the praw.Reddit instance of a thread
+    """
+    def __init__(self, create_client):
+        self._create_client = create_client
+        self._local = threading.local()
+
+
+    def get_client(self):
+        """Returns the Reddit instance of the calling thread, creating it on first use.
+
+        Returns:
+
+        praw.Reddit: Reddit instance
+        """
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._create_client()
+            self._local.client = client
+
+        return client
+
+
+    def __getattr__(self, name):
+        return getattr(self.get_client(), name)
+
+
+def hydrate_submissions(reddit, submission_ids, batch_size = INFO_BATCH_SIZE, on_missing = None):
+    """Fetches submissions by id through Reddit's /api/info endpoint, `batch_size` fullnames per request,
+    instead of lazily fetching each submission on its own.
+    Submissions not returned by Reddit (e.g. deleted ones) are skipped.
+
+    Parameters:
+
+    reddit (praw.Reddit): PRAW Reddit instance
+
+    submission_ids (list of str): base-36 submission ids, without the `t3_` prefix
+
+    batch_size (int) - optional: no. of submissions fetched per request, up to 100
+
+    on_missing (function) - optional: called with the list of ids of each batch not returned by Reddit
+
+    Returns:
+
+    generator of praw.models.Submission: hydrated submissions, in the given ids order
+    """
+    for start in range(0, len(submission_ids), batch_size):
+        batch_ids = submission_ids[start:start + batch_size]
+        fullnames = [f't3_{submission_id}' for submission_id in batch_ids]
+
+        # the batch is requested on the first iteration, so it is timed as a whole
+        with metrics.time('reddit.info_ms'):
+            submissions = list(reddit.info(fullnames=fullnames))
+        metrics.increment('reddit.info_requests')
+        metrics.increment('reddit.submissions', len(submissions))
+
+        found_ids = set()
+        for submission in submissions:
+            found_ids.add(submission.id)
+            yield submission
+
+        if len(found_ids) < len(fullnames):
+            print(f'{len(fullnames) - len(found_ids)} out of {len(fullnames)} submissions not found on Reddit')
+            if on_missing is not None:
+                on_missing([submission_id for submission_id in batch_ids if submission_id not in found_ids])
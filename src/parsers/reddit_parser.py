@@ -1,4 +1,30 @@
+import time
 from datetime import datetime
+from src.utils.keyword_matcher import KeywordMatcher
+
+
+RECORD_TYPES = ['submission', 'comment', 'subreddit']
+
+# fields always extracted, whatever the projection, since documents are identified by them
+REQUIRED_FIELDS = ['id']
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# sources a field can be extracted from
+ATTRIBUTE = 'attribute'
+PARENT_ATTRIBUTE = 'parent_attribute'
+KEY = 'key'
+DATE = 'date'
+KEY_DATE = 'key_date'
+AUTHOR = 'author'
+KEY_AUTHOR = 'key_author'
+KEYWORDS = 'keywords'
+KEY_KEYWORDS = 'key_keywords'
+KEY_FULLNAME_ID = 'key_fullname_id'
+INSTANCE_ATTRIBUTE = 'instance_attribute'
+INSTANCE_FULLNAME_ID = 'instance_fullname_id'
+
+_MISSING = object()
 
 
 def get_author_data(author):
@@ -30,98 +56,443 @@ def get_author_data(author):
         return None
 
 
-def get_comment_data(raw_comment):
-    """Creates a comment object from a PRAW Comment instance
+def _format_date(timestamp):
+    if timestamp is _MISSING:
+        return None
+
+    # time.strftime is much cheaper than datetime and identical for whole seconds
+    if type(timestamp) is int or (type(timestamp) is float and timestamp.is_integer()):
+        return time.strftime(DATE_FORMAT, time.localtime(timestamp))
+
+    return datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
+
+
+def _get_author(raw, authors):
+    return get_author_data(raw.author) if authors is None else authors.get(vars(raw).get('author_fullname'))
+
+
+_keyword_matcher = None
+
+
+def _get_key_author(raw, authors):
+    fullname = raw.get('author_fullname')
+    if authors is not None:
+        return authors.get(fullname)
+
+    # deleted authors have no fullname
+    if fullname is None:
+        return None
+
+    # same fields as `get_author_data`, with the ones only Reddit knows left empty
+    return {
+        "name": raw.get('author'),
+        "id": fullname[3:],
+        "comment_karma": None,
+        "created_utc": None,
+        "is_suspended": None,
+        "is_mod": None,
+        "is_employee": None,
+        "has_verified_email": None
+    }
+
+
+def _match_keywords(title, body):
+    return _keyword_matcher.match(title, body) if _keyword_matcher is not None else None
+
+
+# (field, source, name) triples, in the order fields are written on each record.
+# Only projected fields are extracted, so lazy PRAW attributes of the other fields are never loaded
+
+COMMENT_FIELDS = [
+    ("author", AUTHOR, None),
+    ("body", ATTRIBUTE, 'body'),
+    ("created_utc", ATTRIBUTE, 'created_utc'),
+    ("date", DATE, None),
+    ("distinguished", ATTRIBUTE, 'distinguished'),
+    ("edited", ATTRIBUTE, 'edited'),
+    ("id", ATTRIBUTE, 'id'),
+    ("is_submitter", ATTRIBUTE, 'is_submitter'),
+    ("link_id", ATTRIBUTE, 'link_id'),
+    ("parent_id", ATTRIBUTE, 'parent_id'),
+    ("permalink", ATTRIBUTE, 'permalink'),
+    ("score", ATTRIBUTE, 'score'),
+    ("stickied", ATTRIBUTE, 'stickied'),
+    ("submission_id", PARENT_ATTRIBUTE, ('submission', 'id')),
+    ("submission_name", PARENT_ATTRIBUTE, ('submission', 'name')),
+    ("submission_url", PARENT_ATTRIBUTE, ('submission', 'url')),
+    ("subreddit_id", INSTANCE_FULLNAME_ID, 'subreddit_id'),
+    ("subreddit_name", INSTANCE_ATTRIBUTE, 'subreddit_id'),
+]
+
+# same fields and values as COMMENT_FIELDS, so `subreddit_name` is the subreddit fullname like on PRAW comments.
+# `submission_url` isn't sent by Pushshift, it is set by the callers knowing the submissions
+PUSHSHIFT_COMMENT_FIELDS = [
+    ("author", KEY_AUTHOR, None),
+    ("body", KEY, 'body'),
+    ("created_utc", KEY, 'created_utc'),
+    ("date", KEY_DATE, None),
+    ("distinguished", KEY, 'distinguished'),
+    ("edited", KEY, 'edited'),
+    ("id", KEY, 'id'),
+    ("is_submitter", KEY, 'is_submitter'),
+    ("link_id", KEY, 'link_id'),
+    ("parent_id", KEY, 'parent_id'),
+    ("permalink", KEY, 'permalink'),
+    ("score", KEY, 'score'),
+    ("stickied", KEY, 'stickied'),
+    ("submission_id", KEY_FULLNAME_ID, 'link_id'),
+    ("submission_name", KEY, 'link_id'),
+    ("submission_url", KEY, 'submission_url'),
+    ("subreddit_id", KEY_FULLNAME_ID, 'subreddit_id'),
+    ("subreddit_name", KEY, 'subreddit_id'),
+]
+
+SUBMISSION_FIELDS = [
+    ("author", AUTHOR, None),
+    ("clicked", ATTRIBUTE, 'clicked'),
+    ("created_utc", ATTRIBUTE, 'created_utc'),
+    ("date", DATE, None),
+    ("distinguished", ATTRIBUTE, 'distinguished'),
+    ("edited", ATTRIBUTE, 'edited'),
+    ("id", ATTRIBUTE, 'id'),
+    ("is_original_content", ATTRIBUTE, 'is_original_content'),
+    ("is_text_only", ATTRIBUTE, 'is_self'),
+    ("keywords", KEYWORDS, None),
+    ("link_flair_template_id", ATTRIBUTE, 'link_flair_template_id'),
+    ("link_flair_text", ATTRIBUTE, 'link_flair_text'),
+    ("locked", ATTRIBUTE, 'locked'),
+    ("name", ATTRIBUTE, 'name'),
+    ("num_comments", ATTRIBUTE, 'num_comments'),
+    ("over_18", ATTRIBUTE, 'over_18'),
+    ("permalink", ATTRIBUTE, 'permalink'),
+    ("score", ATTRIBUTE, 'score'),
+    ("body", ATTRIBUTE, 'selftext'),
+    ("spoiler", ATTRIBUTE, 'spoiler'),
+    ("stickied", ATTRIBUTE, 'stickied'),
+    ("subreddit_id", INSTANCE_FULLNAME_ID, 'subreddit_id'),
+    ("subreddit_name", INSTANCE_ATTRIBUTE, 'subreddit_id'),
+    ("title", ATTRIBUTE, 'title'),
+    ("upvote_ratio", ATTRIBUTE, 'upvote_ratio'),
+    ("url", ATTRIBUTE, 'url'),
+]
+
+PUSHSHIFT_SUBMISSION_FIELDS = [
+    ("author", KEY, 'author'),
+    ("created_utc", KEY, 'created_utc'),
+    ("date", KEY_DATE, None),
+    ("id", KEY, 'id'),
+    ("is_original_content", KEY, 'is_original_content'),
+    ("is_text_only", KEY, 'is_self'),
+    ("keywords", KEY_KEYWORDS, None),
+    ("locked", KEY, 'locked'),
+    ("num_comments", KEY, 'num_comments'),
+    ("over_18", KEY, 'over_18'),
+    ("permalink", KEY, 'permalink'),
+    ("score", KEY, 'score'),
+    ("body", KEY, 'selftext'),
+    ("spoiler", KEY, 'spoiler'),
+    ("stickied", KEY, 'stickied'),
+    ("subreddit_id", KEY, 'subreddit_id'),
+    ("subreddit_name", KEY, 'subreddit'),
+    ("title", KEY, 'title'),
+    ("upvote_ratio", KEY, 'upvote_ratio'),
+    ("url", KEY, 'url'),
+]
+
+SUBREDDIT_FIELDS = [
+    ("date", DATE, None),
+    ("can_assign_link_flair", ATTRIBUTE, 'can_assign_link_flair'),
+    ("can_assign_user_flair", ATTRIBUTE, 'can_assign_user_flair'),
+    ("created_utc", ATTRIBUTE, 'created_utc'),
+    ("description", ATTRIBUTE, 'description'),
+    ("description_html", ATTRIBUTE, 'description_html'),
+    ("display_name", ATTRIBUTE, 'display_name'),
+    ("id", ATTRIBUTE, 'id'),
+    ("name", ATTRIBUTE, 'name'),
+    ("over18", ATTRIBUTE, 'over18'),
+    ("public_description", ATTRIBUTE, 'public_description'),
+    ("spoilers_enabled", ATTRIBUTE, 'spoilers_enabled'),
+    ("subscribers", ATTRIBUTE, 'subscribers'),
+]
+
+# extracted table to (record type of its projection, fields) map
+EXTRACTED_TABLES = {
+    'comment': ('comment', COMMENT_FIELDS),
+    'pushshift_comment': ('comment', PUSHSHIFT_COMMENT_FIELDS),
+    'submission': ('submission', SUBMISSION_FIELDS),
+    'pushshift_submission': ('submission', PUSHSHIFT_SUBMISSION_FIELDS),
+    'subreddit': ('subreddit', SUBREDDIT_FIELDS),
+}
+
+AVAILABLE_FIELDS = {
+    'submission': set(field for field, _, _ in SUBMISSION_FIELDS + PUSHSHIFT_SUBMISSION_FIELDS),
+    'comment': set(field for field, _, _ in COMMENT_FIELDS),
+    'subreddit': set(field for field, _, _ in SUBREDDIT_FIELDS),
+}
+
+# one lookup per field: getattr/dict.get with a default instead of hasattr/`in` followed by the access
+_EXPRESSIONS = {
+    ATTRIBUTE: lambda name: f'getattr(raw, {name!r}, None)',
+    PARENT_ATTRIBUTE: lambda name: f'getattr(getattr(raw, {name[0]!r}, None), {name[1]!r}, None)',
+    KEY: lambda name: f'raw.get({name!r})',
+    KEY_FULLNAME_ID: lambda name: f'(raw.get({name!r}) or "")[3:] or None',
+    # read from the instance dict: `subreddit.id`/`subreddit.name` would fetch the whole subreddit
+    INSTANCE_ATTRIBUTE: lambda name: f'vars(raw).get({name!r})',
+    INSTANCE_FULLNAME_ID: lambda name: f'(vars(raw).get({name!r}) or "")[3:] or None',
+    DATE: lambda name: "_format_date(getattr(raw, 'created_utc', _MISSING))",
+    KEY_DATE: lambda name: "_format_date(raw.get('created_utc', _MISSING))",
+    AUTHOR: lambda name: '_get_author(raw, authors)',
+    KEY_AUTHOR: lambda name: '_get_key_author(raw, authors)',
+    KEYWORDS: lambda name: "_match_keywords(getattr(raw, 'title', None), getattr(raw, 'selftext', None))",
+    KEY_KEYWORDS: lambda name: "_match_keywords(raw.get('title'), raw.get('selftext'))",
+}
+
+
+def compile_extractor(fields, projection = None):
+    """Compiles a record extractor for a fields table: a function building the whole record
+    on a single dict literal, with a single lookup per projected field.
+
+    Parameters:
+
+    fields (list of tuple): (field, source, name) triples, e.g. SUBMISSION_FIELDS
+
+    projection (set of str) - optional: fields to extract. None extracts every field
+
+    Returns:
+
+    function: extractor called as extractor(raw, authors)
+    """
+    entries = [
+        f'        {field!r}: {_EXPRESSIONS[source](name)},'
+        for field, source, name in fields
+        if projection is None or field in projection
+    ]
+    code = 'def extract(raw, authors = None):\n    return {\n' + '\n'.join(entries) + '\n    }\n'
+
+    namespace = { '_format_date': _format_date, '_get_author': _get_author, '_get_key_author': _get_key_author, '_match_keywords': _match_keywords, '_MISSING': _MISSING }
+    exec(compile(code, '<record extractor>', 'exec'), namespace)
+    return namespace['extract']
+
+
+def _compile_extractors(projection):
+    return {
+        table: compile_extractor(fields, projection[record_type])
+        for table, (record_type, fields) in EXTRACTED_TABLES.items()
+    }
+
+
+_field_projection = { record_type: None for record_type in RECORD_TYPES }
+_extractors = _compile_extractors(_field_projection)
+
+
+def parse_field_projection(spec):
+    """Parses a field projection spec: a list of field names, or a string of comma or space separated field names.
+    Plain names (e.g. `title`) apply to every record type having that field, while prefixed names (e.g. `comment.body`)
+    apply to a single record type. Record types without any listed field keep all of their fields.
+
+    Parameters:
+
+    spec (str or list of str): field projection spec
+
+    Returns:
+
+    dict: record type to set of projected fields map, with None for record types keeping all fields
+    """
+    names = spec.replace(',', ' ').split() if isinstance(spec, str) else list(spec)
+    projection = { record_type: None for record_type in RECORD_TYPES }
+
+    for name in names:
+        record_type, _, field = name.rpartition('.')
+        record_types = [record_type] if record_type != '' else [t for t in RECORD_TYPES if field in AVAILABLE_FIELDS[t]]
+
+        if len(record_types) == 0 or any(t not in AVAILABLE_FIELDS or field not in AVAILABLE_FIELDS[t] for t in record_types):
+            raise ValueError(f'Unknown field "{name}", available fields: {AVAILABLE_FIELDS}')
+
+        for t in record_types:
+            projection[t] = (projection[t] or set(REQUIRED_FIELDS)) | { field }
+
+    return projection
+
+
+def set_field_projection(spec):
+    """Sets which fields are extracted by the parsers, see `parse_field_projection`, and compiles their extractors.
+    Fields left out are never read from the raw records, so PRAW never fetches them. None restores every field.
+
+    Parameters:
+
+    spec (str or list of str): field projection spec
+    """
+    global _field_projection, _extractors
+    _field_projection = parse_field_projection(spec if spec is not None else [])
+    _extractors = _compile_extractors(_field_projection)
+
+
+def is_field_projected(record_type, field):
+    """Checks whether a field is extracted by the parsers.
+
+    Parameters:
+
+    record_type (str): `submission`, `comment` or `subreddit`
+
+    field (str): field name
+
+    Returns:
+
+    bool: whether the field is extracted
+    """
+    fields = _field_projection[record_type]
+    return fields is None or field in fields
+
+
+def set_search_keywords(keywords):
+    """Sets the searched keywords. Submissions are tagged with the ones found on their title or body,
+    on their `keywords` field, so the keywords of a submission found by an OR query are known.
+    Without keywords, the field is None.
+
+    Parameters:
+
+    keywords (list of str): searched keywords
+    """
+    global _keyword_matcher
+    _keyword_matcher = KeywordMatcher(keywords) if keywords is not None and len(keywords) > 0 else None
+
+
+def _is_empty_comment(raw_comment):
+    body = raw_comment.body
+    return body == "" or body == "[deleted]"
+
+
+def _is_empty_pushshift_comment(raw_comment):
+    body = raw_comment.get('body')
+    return body is None or body == "" or body == "[deleted]"
+
+
+def _is_empty_submission(raw_submission):
+    selftext = raw_submission.selftext
+    return selftext is not None and (selftext.strip() == "" or selftext == "[deleted]" or selftext == "[removed]")
+
+
+def _is_empty_pushshift_submission(raw_submission):
+    if 'selftext' not in raw_submission:
+        return True
+
+    selftext = raw_submission["selftext"]
+    return selftext is not None and (selftext.strip() == "" or selftext == "[deleted]" or selftext == "[removed]")
+
+
+def get_comment_data(raw_comment, authors = None):
+    """Creates a comment object from a PRAW Comment instance, with the projected fields
 
     Parameters:
 
     raw_comment (praw.models.Comment): PRAW Comment instance
 
+    authors (dict) - optional: Redditor fullname to author object map, see `AuthorResolver`. When given,
+    the author is taken from it instead of being fetched from Reddit
+
     Returns:
 
     dict: object with information about a comment, like body, author, permalink or score
     """
-    if (raw_comment.body == "") or (raw_comment.body == "[deleted]"):
+    if _is_empty_comment(raw_comment):
         return None
 
-    author = get_author_data(raw_comment.author)
-    date = datetime.fromtimestamp(raw_comment.created_utc) if hasattr(raw_comment, 'created_utc') else None
-    has_submission = hasattr(raw_comment, 'submission')
-    has_subreddit = hasattr(raw_comment, 'subreddit')
+    return _extractors['comment'](raw_comment, authors)
 
-    return {
-        "author": author,
-        "body": raw_comment.body if hasattr(raw_comment, 'body') else None,
-        "created_utc": raw_comment.created_utc if hasattr(raw_comment, 'created_utc') else None,
-        "date": date.strftime('%Y-%m-%d %H:%M:%S') if date is not None else None,
-        "distinguished": raw_comment.distinguished if hasattr(raw_comment, 'distinguished') else None,
-        "edited": raw_comment.edited if hasattr(raw_comment, 'edited') else None,
-        "id": raw_comment.id if hasattr(raw_comment, 'id') else None,
-        "is_submitter": raw_comment.is_submitter if hasattr(raw_comment, 'is_submitter') else None,
-        "link_id": raw_comment.link_id if hasattr(raw_comment, 'link_id') else None,
-        "parent_id": raw_comment.parent_id if hasattr(raw_comment, 'parent_id') else None,
-        "permalink": raw_comment.permalink if hasattr(raw_comment, 'permalink') else None,
-        "score": raw_comment.score if hasattr(raw_comment, 'score') else None,
-        "stickied": raw_comment.stickied if hasattr(raw_comment, 'stickied') else None,
-        "submission_id": raw_comment.submission.id if has_submission and hasattr(raw_comment.submission, 'id') else None,
-        "submission_name": raw_comment.submission.name if has_submission and hasattr(raw_comment.submission, 'name') else None,
-        "submission_url": raw_comment.submission.url if has_submission and hasattr(raw_comment.submission, 'url') else None,
-        "subreddit_id": raw_comment.subreddit.id if has_subreddit and hasattr(raw_comment.subreddit, 'id') else None,
-        "subreddit_name": raw_comment.subreddit.name if has_subreddit and hasattr(raw_comment.subreddit, 'name') else None
-    }
+
+def get_comments_data(raw_comments, authors = None):
+    """Creates comment objects from a batch of PRAW Comment instances, see `get_comment_data`
+
+    Parameters:
+
+    raw_comments (iterable of praw.models.Comment): PRAW Comment instances
+
+    authors (dict) - optional: Redditor fullname to author object map
+
+    Returns:
+
+    list of dicts: non-empty comment objects
+    """
+    extract = _extractors['comment']
+    return [extract(raw_comment, authors) for raw_comment in raw_comments if not _is_empty_comment(raw_comment)]
+
+
+def get_comment_data_from_pushshift(raw_comment, authors = None):
+    """Creates a comment object from a Pushshift Comment JSON, with the projected fields, in the same shape as `get_comment_data`
+
+    Parameters:
+
+    raw_comment (dict): Pushshift Comment instance
+
+    authors (dict) - optional: Redditor fullname to author object map, see `AuthorResolver`. Otherwise,
+    authors only have the name and id sent by Pushshift
+
+    Returns:
+
+    dict: object with information about a comment, like body, author, permalink or score
+    """
+    if _is_empty_pushshift_comment(raw_comment):
+        return None
+
+    return _extractors['pushshift_comment'](raw_comment, authors)
 
 
-def get_submission_data(raw_submission):
-    """Creates a submission object from a PRAW Submission instance
+def get_comments_data_from_pushshift(raw_comments, authors = None):
+    """Creates comment objects from a page of Pushshift Comment JSONs, see `get_comment_data_from_pushshift`
+
+    Parameters:
+
+    raw_comments (iterable of dicts): Pushshift Comment instances
+
+    authors (dict) - optional: Redditor fullname to author object map
+
+    Returns:
+
+    list of dicts: non-empty comment objects
+    """
+    extract = _extractors['pushshift_comment']
+    return [extract(raw_comment, authors) for raw_comment in raw_comments if not _is_empty_pushshift_comment(raw_comment)]
+
+
+def get_submission_data(raw_submission, authors = None):
+    """Creates a submission object from a PRAW Submission instance, with the projected fields
 
     Parameters:
 
     raw_submission (praw.models.Submission): PRAW Submission instance
 
+    authors (dict) - optional: Redditor fullname to author object map, see `AuthorResolver`. When given,
+    the author is taken from it instead of being fetched from Reddit
+
     Returns:
 
     dict: object with information about a submission, like body, author or URL
     """
-    if raw_submission.selftext == "" or \
-        (hasattr(raw_submission, 'selftext') and raw_submission.selftext != None and raw_submission.selftext.strip() == "") or \
-            raw_submission.selftext == "[deleted]" or raw_submission.selftext == "[removed]":
+    if _is_empty_submission(raw_submission):
         return None
 
-    author = get_author_data(raw_submission.author)
-    date = datetime.fromtimestamp(raw_submission.created_utc) if hasattr(raw_submission, 'created_utc') else None
-    has_subreddit = hasattr(raw_submission, 'subreddit')
+    return _extractors['submission'](raw_submission, authors)
 
-    return {
-        "author": author,
-        "clicked": raw_submission.clicked if hasattr(raw_submission, 'clicked') else None,
-        "created_utc": raw_submission.created_utc if hasattr(raw_submission, 'created_utc') else None,
-        "date": date.strftime('%Y-%m-%d %H:%M:%S') if date is not None else None,
-        "distinguished": raw_submission.distinguished if hasattr(raw_submission, 'distinguished') else None,
-        "edited": raw_submission.edited if hasattr(raw_submission, 'edited') else None,
-        "id": raw_submission.id if hasattr(raw_submission, 'id') else None,
-        "is_original_content": raw_submission.is_original_content if hasattr(raw_submission, 'is_original_content') else None,
-        "is_text_only": raw_submission.is_self if hasattr(raw_submission, 'is_self') else None,
-        "link_flair_template_id": raw_submission.link_flair_template_id if hasattr(raw_submission, 'link_flair_template_id') else None,
-        "link_flair_text": raw_submission.link_flair_text if hasattr(raw_submission, 'link_flair_text') else None,
-        "locked": raw_submission.locked if hasattr(raw_submission, 'locked') else None,
-        "name": raw_submission.name if hasattr(raw_submission, 'name') else None,
-        "num_comments": raw_submission.num_comments if hasattr(raw_submission, 'num_comments') else None,
-        "over_18": raw_submission.over_18 if hasattr(raw_submission, 'over_18') else None,
-        "permalink": raw_submission.permalink if hasattr(raw_submission, 'permalink') else None,
-        "score": raw_submission.score if hasattr(raw_submission, 'score') else None,
-        "body": raw_submission.selftext if hasattr(raw_submission, 'selftext') else None,
-        "spoiler": raw_submission.spoiler if hasattr(raw_submission, 'spoiler') else None,
-        "stickied": raw_submission.stickied if hasattr(raw_submission, 'stickied') else None,
-        "subreddit_id": raw_submission.subreddit.id if has_subreddit and hasattr(raw_submission.subreddit, 'id') else None,
-        "subreddit_name": raw_submission.subreddit.name if has_subreddit and hasattr(raw_submission.subreddit, 'name') else None,
-        "title": raw_submission.title if hasattr(raw_submission, 'title') else None,
-        "upvote_ratio": raw_submission.upvote_ratio if hasattr(raw_submission, 'upvote_ratio') else None,
-        "url": raw_submission.url if hasattr(raw_submission, 'url') else None
-    }
+
+def get_submissions_data(raw_submissions, authors = None):
+    """Creates submission objects from a batch of PRAW Submission instances, see `get_submission_data`
+
+    Parameters:
+
+    raw_submissions (iterable of praw.models.Submission): PRAW Submission instances
+
+    authors (dict) - optional: Redditor fullname to author object map
+
+    Returns:
+
+    list of dicts: non-empty submission objects
+    """
+    extract = _extractors['submission']
+    return [extract(raw_submission, authors) for raw_submission in raw_submissions if not _is_empty_submission(raw_submission)]
 
 
 def get_submission_data_from_pushshift(raw_submission):
-    """Creates a submission object from a Pushshift Submission JSON
+    """Creates a submission object from a Pushshift Submission JSON, with the projected fields
 
     Parameters:
 
@@ -131,78 +502,36 @@ def get_submission_data_from_pushshift(raw_submission):
 
     dict: object with information about a submission, like body, author or URL
     """
-    if (not 'selftext' in raw_submission) or ('selftext' in raw_submission and raw_submission["selftext"] == "") or \
-        ('selftext' in raw_submission and raw_submission["selftext"] is not None and raw_submission["selftext"].strip() == "") or \
-            raw_submission["selftext"] == "[deleted]" or raw_submission["selftext"] == "[removed]":
+    if _is_empty_pushshift_submission(raw_submission):
         return None
 
-    date = datetime.fromtimestamp(raw_submission["created_utc"]) if 'created_utc' in raw_submission else None
+    return _extractors['pushshift_submission'](raw_submission)
 
-    return {
-        "author": raw_submission["author"] if 'author' in raw_submission else None,
-        "created_utc": raw_submission["created_utc"] if 'created_utc' in raw_submission else None,
-        "date": date.strftime('%Y-%m-%d %H:%M:%S') if date is not None else None,
-        "id": raw_submission["id"] if 'id' in raw_submission else None,
-        "is_original_content": raw_submission["is_original_content"] if 'is_original_content' in raw_submission else None,
-        "is_text_only": raw_submission["is_self"] if 'is_self' in raw_submission else None,
-        "locked": raw_submission["locked"] if 'locked' in raw_submission else None,
-        "num_comments": raw_submission["num_comments"] if 'num_comments' in raw_submission else None,
-        "over_18": raw_submission["over_18"] if 'over_18' in raw_submission else None,
-        "permalink": raw_submission["permalink"] if 'permalink' in raw_submission else None,
-        "score": raw_submission["score"] if 'score' in raw_submission else None,
-        "body": raw_submission["selftext"] if 'selftext' in raw_submission else None,
-        "spoiler": raw_submission["spoiler"] if 'spoiler' in raw_submission else None,
-        "stickied": raw_submission["stickied"] if 'stickied' in raw_submission else None,
-        "subreddit_id": raw_submission["subreddit_id"] if 'subreddit_id' in raw_submission else None,
-        "subreddit_name": raw_submission["subreddit"] if 'subreddit' in raw_submission else None,
-        "title": raw_submission["title"] if 'title' in raw_submission else None,
-        "upvote_ratio": raw_submission["upvote_ratio"] if 'upvote_ratio' in raw_submission else None,
-        "url": raw_submission["url"] if 'url' in raw_submission else None
-    }
 
-def get_subreddit_data(raw_subreddit):
-    """Creates a subreddit object from a PRAW Subreddit instance
+def get_submissions_data_from_pushshift(raw_submissions):
+    """Creates submission objects from a page of Pushshift Submission JSONs, see `get_submission_data_from_pushshift`
 
     Parameters:
 
-    raw_subreddit (praw.models.Subreddit): PRAW Subreddit instance
+    raw_submissions (iterable of dicts): Pushshift Submission instances
 
     Returns:
 
-    dict: object with information about a subreddit
+    list of dicts: non-empty submission objects
     """
-    date = datetime.fromtimestamp(raw_subreddit.created_utc) if hasattr(raw_subreddit, 'created_utc') else None
+    extract = _extractors['pushshift_submission']
+    return [extract(raw_submission) for raw_submission in raw_submissions if not _is_empty_pushshift_submission(raw_submission)]
 
-    return {
-        "date": date.strftime('%Y-%m-%d %H:%M:%S') if date != None else None,
-        "can_assign_link_flair": raw_subreddit.can_assign_link_flair if hasattr(raw_subreddit, 'can_assign_link_flair') else None,
-        "can_assign_user_flair": raw_subreddit.can_assign_user_flair if hasattr(raw_subreddit, 'can_assign_user_flair') else None,
-        "created_utc": raw_subreddit.created_utc if hasattr(raw_subreddit, 'created_utc') else None,
-        "description": raw_subreddit.description if hasattr(raw_subreddit, 'description') else None,
-        "description_html": raw_subreddit.description_html if hasattr(raw_subreddit, 'description_html') else None,
-        "display_name": raw_subreddit.display_name if hasattr(raw_subreddit, 'display_name') else None,
-        "id": raw_subreddit.id if hasattr(raw_subreddit, 'id') else None,
-        "name": raw_subreddit.name if hasattr(raw_subreddit, 'name') else None,
-        "over18": raw_subreddit.over18 if hasattr(raw_subreddit, 'over18') else None,
-        "public_description": raw_subreddit.public_description if hasattr(raw_subreddit, 'public_description') else None,
-        "spoilers_enabled": raw_subreddit.spoilers_enabled if hasattr(raw_subreddit, 'spoilers_enabled') else None,
-        "subscribers": raw_subreddit.subscribers if hasattr(raw_subreddit, 'subscribers') else None
-    }
 
-def get_comments(submission):
-    """Get all comments from submission, regardless of its place on the discussion hierarchy.
+def get_subreddit_data(raw_subreddit):
+    """Creates a subreddit object from a PRAW Subreddit instance, with the projected fields
 
     Parameters:
-    
-    submission (praw.models.Submission): PRAW submission instance
+
+    raw_subreddit (praw.models.Subreddit): PRAW Subreddit instance
 
     Returns:
 
-    list of comment objects: list of non-empty comments
+    dict: object with information about a subreddit
     """
-    submission.comments.replace_more(limit=None)
-
-    result = map(lambda raw_comment: get_comment_data(raw_comment),
-                 submission.comments.list())
-
-    return list(filter(lambda x: x != None, result))
\ No newline at end of file
+    return _extractors['subreddit'](raw_subreddit)
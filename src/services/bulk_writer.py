@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+from src.utils.metrics import metrics
+
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+WRITE_MODES = ['insert', 'upsert']
+
+_STOP = object()
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BulkWriter:
+    """Buffers documents per collection and writes them to MongoDB through unordered `insert_many` calls
+    or, on `upsert` mode, unordered `bulk_write` calls replacing documents by their Reddit `id`,
+    on a background thread. A collection buffer is flushed when it reaches `max_documents` documents,
+    `max_bytes` BSON bytes, or when its oldest document has waited for `max_interval` seconds.
+    Writes are handed to the background thread through a bounded queue, so producers block
+    (backpressure) whenever the database can't keep up. pymongo is imported by the first writer,
+    so importing the services doesn't import it, e.g. on the Lambda cold start or when writing on files.
+
+    Parameters:
+
+    database (pymongo.database.Database): database where the documents are written
+
+    mode (str) - optional: `insert` to always insert documents, `upsert` to replace documents with the same `id`
+
+    max_documents (int) - optional: no. of buffered documents that triggers a collection flush
+
+    max_bytes (int) - optional: BSON size of buffered documents that triggers a collection flush
+
+    max_interval (float) - optional: maximum no. of seconds a document waits on the buffer
+
+    queue_size (int) - optional: maximum no. of documents waiting to be buffered
+    """
+    def __init__(self, database, mode = 'insert', max_documents = 1000, max_bytes = 8 * 1024 * 1024, max_interval = 5.0, queue_size = 10000):
+        if mode not in WRITE_MODES:
+            raise ValueError(f'Invalid write mode "{mode}", expected one of {WRITE_MODES}')
+
+        import bson
+        self._encode = bson.encode
+
+        self.database = database
+        self.mode = mode
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.max_interval = max_interval
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._buffers = {}
+        self._buffer_sizes = {}
+        self._buffer_deadlines = {}
+        self._error = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+
+    def write(self, document, collection):
+        """Queues a document to be written. Blocks while the queue is full.
+
+        Parameters:
+
+        document (dict): document to write
+
+        collection (str): name of the collection where the document should be saved
+        """
+        self._raise_background_error()
+        self._start()
+        self._queue.put((collection, document))
+
+
+    def flush(self):
+        """Blocks until every document queued so far is written."""
+        if self._thread is None:
+            return
+
+        request = _FlushRequest()
+        self._queue.put(request)
+        request.done.wait()
+        self._raise_background_error()
+
+
+    def close(self):
+        """Writes every queued document and stops the background thread. The writer is restarted on the next write."""
+        with self._thread_lock:
+            if self._thread is None:
+                return
+
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+        self._raise_background_error()
+
+
+    def _start(self):
+        if self._thread is not None:
+            return
+
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='mongo-bulk-writer', daemon=True)
+                self._thread.start()
+
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._get_wait_time())
+            except queue.Empty:
+                self._flush_expired()
+                continue
+
+            if item is _STOP:
+                self._flush_all()
+                return
+
+            if isinstance(item, _FlushRequest):
+                self._flush_all()
+                item.done.set()
+                continue
+
+            collection, document = item
+            try:
+                self._buffer(collection, document)
+            except Exception as e:
+                print(f'Error while buffering document for "{collection}": {e}')
+                self._error = e
+
+            self._flush_expired()
+
+
+    def _buffer(self, collection, document):
+        document_size = len(self._encode(document))
+
+        if collection not in self._buffers:
+            self._buffers[collection] = []
+            self._buffer_sizes[collection] = 0
+            self._buffer_deadlines[collection] = time.monotonic() + self.max_interval
+
+        self._buffers[collection].append(document)
+        self._buffer_sizes[collection] += document_size
+
+        if len(self._buffers[collection]) >= self.max_documents or self._buffer_sizes[collection] >= self.max_bytes:
+            self._flush_collection(collection)
+
+
+    def _get_wait_time(self):
+        if len(self._buffer_deadlines) == 0:
+            return None
+
+        return max(0, min(self._buffer_deadlines.values()) - time.monotonic())
+
+
+    def _flush_expired(self):
+        now = time.monotonic()
+        for collection in [c for c, deadline in self._buffer_deadlines.items() if deadline <= now]:
+            self._flush_collection(collection)
+
+
+    def _flush_all(self):
+        for collection in list(self._buffers.keys()):
+            self._flush_collection(collection)
+
+
+    def _flush_collection(self, collection):
+        from pymongo.errors import BulkWriteError
+
+        documents = self._buffers.pop(collection)
+        del self._buffer_sizes[collection]
+        del self._buffer_deadlines[collection]
+
+        metrics.increment('mongo.writes')
+        metrics.increment('mongo.documents', len(documents))
+
+        try:
+            with metrics.time('mongo.write_ms'):
+                if self.mode == 'upsert':
+                    self.database[collection].bulk_write(list(map(_to_upsert_operation, documents)), ordered=False)
+                else:
+                    self.database[collection].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != DUPLICATE_KEY_ERROR_CODE]
+            if len(errors) > 0:
+                print(f'Error while writing {len(documents)} documents on "{collection}": {errors[0]}')
+                metrics.increment('mongo.write_errors')
+                self._error = e
+        except Exception as e:
+            print(f'Error while writing {len(documents)} documents on "{collection}": {e}')
+            metrics.increment('mongo.write_errors')
+            self._error = e
+
+
+    def _raise_background_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+
+
+def _to_upsert_operation(document):
+    from pymongo import InsertOne, ReplaceOne
+
+    if document.get('id') is None:
+        return InsertOne(document)
+
+    return ReplaceOne({ 'id': document['id'] }, document, upsert=True)
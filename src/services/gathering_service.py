@@ -0,0 +1,283 @@
+import os
+from src.integrations.pushshift_comments import get_comment_pages_for_submissions, get_submission_id, COMMENT_SEARCH_BATCH_SIZE
+from src.parsers.reddit_parser import get_comments_data_from_pushshift, get_submissions_data_from_pushshift
+from src.services.reddit_service import insert_comment, insert_submission, close_writes
+from src.utils.pipeline import Pipeline
+
+
+# maximum no. of items waiting between two stages of the gathering pipelines
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 16))
+
+
+def parse_search_results(results):
+    """Pipeline stage parsing the Pushshift submissions of each search.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of Pushshift submissions) pairs
+
+    Returns:
+
+    generator of tuples: ((subreddit, query, interval), list of submission objects) pairs
+    """
+    for search, submissions in results:
+        yield search, get_submissions_data_from_pushshift(submissions)
+
+
+def dedupe_search_results(results):
+    """Pipeline stage dropping the submissions already found, by another query, within the same subreddit and interval.
+    Searches are grouped by interval and intervals don't overlap, so only the ids of the current interval are kept,
+    whatever the size of the searched range.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of submissions) pairs, grouped by interval
+
+    Returns:
+
+    generator of tuples: ((subreddit, query, interval), list of new submissions) pairs
+    """
+    current_interval = None
+    seen_ids = set()
+
+    for (subreddit, query, interval), submissions in results:
+        if interval != current_interval:
+            current_interval = interval
+            seen_ids = set()
+
+        new_submissions = []
+        for submission in submissions:
+            if (subreddit, submission["id"]) not in seen_ids:
+                seen_ids.add((subreddit, submission["id"]))
+                new_submissions.append(submission)
+
+        yield (subreddit, query, interval), new_submissions
+
+
+def skip_seen_submissions(results, seen_index):
+    """Pipeline stage dropping the submissions gathered by previous runs, see `SeenIndex`,
+    before they are requested or written again.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of submissions) pairs
+
+    seen_index (SeenIndex): index of the gathered ids
+
+    Returns:
+
+    generator of tuples: ((subreddit, query, interval), list of unseen submissions) pairs
+    """
+    for search, submissions in results:
+        unseen_submissions = [submission for submission in submissions if not seen_index.is_seen(submission["id"])]
+        if len(unseen_submissions) < len(submissions):
+            print(f'{len(submissions) - len(unseen_submissions)} submissions already gathered skipped inside "{search[0]}"')
+
+        yield search, unseen_submissions
+
+
+def track_searches(results, journal):
+    """Pipeline stage dropping the submissions already gathered by an interrupted run, and tracking each search
+    on the checkpoint journal, so it is completed once its submissions are recorded as gathered.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of submissions) pairs
+
+    journal (CheckpointJournal): checkpoint journal
+
+    Returns:
+
+    generator of tuples: ((subreddit, query, interval), list of submissions left) pairs
+    """
+    for search, submissions in results:
+        submissions = [submission for submission in submissions if not journal.is_submission_gathered(submission["id"])]
+        journal.begin_search(search, [submission["id"] for submission in submissions])
+
+        yield search, submissions
+
+
+def write_search_results(results, collection, seen_index = None):
+    """Pipeline stage writing the submissions of each search.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of submission objects) pairs
+
+    collection (str): name of the collection where the submissions should be saved
+
+    seen_index (SeenIndex) - optional: index where the ids of the written submissions are added
+
+    Returns:
+
+    generator of tuples: ((subreddit, query, interval), no. of written submissions) pairs
+    """
+    for search, submissions in results:
+        for submission in submissions:
+            insert_submission(submission, collection)
+
+        if seen_index is not None:
+            seen_index.add(submission["id"] for submission in submissions)
+
+        yield search, len(submissions)
+
+
+def write_pushshift_comments(submissions, collection, author_resolver = None):
+    """Writes the comments of a batch of submissions, searched on Pushshift by submission instead of
+    walking each comment tree through Reddit.
+
+    Parameters:
+
+    submissions (list of dicts): submission objects or Pushshift submissions, with their `id` and, when known,
+    their `created_utc` and `url`
+
+    collection (str): name of the collection where the comments should be saved
+
+    author_resolver (AuthorResolver) - optional: resolves the authors of each page of comments in bulk through Reddit.
+    Otherwise, authors only have the name and id sent by Pushshift
+
+    Returns:
+
+    int: no. of written comments
+    """
+    submission_urls = { submission["id"]: submission.get("url") for submission in submissions }
+    created_dates = [submission["created_utc"] for submission in submissions if submission.get("created_utc") is not None]
+    # comments are never older than their submission
+    after = int(min(created_dates)) - 1 if len(created_dates) > 0 else 0
+    count = 0
+
+    for page in get_comment_pages_for_submissions(submission_urls.keys(), after):
+        for raw_comment in page:
+            raw_comment.setdefault("submission_url", submission_urls.get(get_submission_id(raw_comment.get("link_id", ""))))
+
+        authors = author_resolver.resolve(raw_comment.get("author_fullname") for raw_comment in page) if author_resolver is not None else None
+
+        for comment in get_comments_data_from_pushshift(page, authors):
+            insert_comment(comment, collection)
+            count += 1
+
+    return count
+
+
+def write_search_comments(results, collection, batch_size = COMMENT_SEARCH_BATCH_SIZE):
+    """Pipeline stage writing the comments of the submissions of each search, searched on Pushshift,
+    and passing each search along once its comments are written. Submissions of consecutive searches
+    are searched together, up to `batch_size` per request.
+
+    Parameters:
+
+    results (iterable of tuples): ((subreddit, query, interval), list of submission objects) pairs
+
+    collection (str): name of the collection where the comments should be saved
+
+    batch_size (int) - optional: no. of submissions whose comments are searched together
+
+    Returns:
+
+    generator of tuples: the given ((subreddit, query, interval), list of submission objects) pairs
+    """
+    pending_results = []
+    pending_submissions = []
+
+    for search, submissions in results:
+        pending_results.append((search, submissions))
+        pending_submissions.extend(submissions)
+
+        if len(pending_submissions) >= batch_size:
+            write_pushshift_comments(pending_submissions, collection)
+            yield from pending_results
+            pending_results = []
+            pending_submissions = []
+
+    if len(pending_submissions) > 0:
+        write_pushshift_comments(pending_submissions, collection)
+    yield from pending_results
+
+
+def close_writes_and_save(seen_index = None):
+    """Writes every buffered document and closes the sink, then saves the ids added to the seen index.
+    Ids are not saved when closing fails, so the index is never ahead of the written documents.
+
+    Parameters:
+
+    seen_index (SeenIndex) - optional: index of the gathered ids
+    """
+    close_writes()
+
+    if seen_index is not None:
+        seen_index.save()
+
+
+def schedule_streams(last_searched_dates, max_end_date, max_batches, excluded_streams = ()):
+    """Plans the next searches of independent (subreddit, keyword) streams, furthest behind first.
+    Streams at the same date are batched together, subreddits sharing the same keywords, so they are
+    searched with OR queries and subreddit groups, as when every stream advanced at once.
+
+    Parameters:
+
+    last_searched_dates (dict): (subreddit, keyword) pair to the next date to be searched
+
+    max_end_date (datetime): date where streams are finished
+
+    max_batches (int): maximum no. of batches to plan
+
+    excluded_streams (iterable of tuples) - optional: (subreddit, keyword) pairs left out, e.g. after failing
+
+    Returns:
+
+    list of tuples: (start date, list of subreddits, list of keywords) batches, in start date order.
+    Keywords are [None] for streams gathering every submission
+    """
+    excluded_streams = set(excluded_streams)
+    keywords_by_date = {}
+
+    for (subreddit, keyword), start_date in last_searched_dates.items():
+        if start_date < max_end_date and (subreddit, keyword) not in excluded_streams:
+            keywords_by_date.setdefault(start_date, {}).setdefault(subreddit, []).append(keyword)
+
+    batches = []
+    for start_date in sorted(keywords_by_date):
+        subreddits_by_keywords = {}
+        for subreddit, keywords in keywords_by_date[start_date].items():
+            subreddits_by_keywords.setdefault(tuple(keywords), []).append(subreddit)
+
+        for keywords, subreddits in subreddits_by_keywords.items():
+            batches.append((start_date, subreddits, list(keywords)))
+
+    return batches[:max_batches]
+
+
+def build_pushshift_pipeline(search_results, collection, queue_size = PIPELINE_QUEUE_SIZE, seen_index = None, profiler = None, comments_collection = None):
+    """Builds the search -> parse -> dedupe -> [skip seen] -> [write comments] -> write pipeline of Pushshift submissions, every stage on its own thread,
+    so submissions are written while the next searches are still running.
+
+    Parameters:
+
+    search_results (iterable of tuples): ((subreddit, query, interval), list of Pushshift submissions) pairs
+
+    collection (str): name of the collection where the submissions should be saved
+
+    queue_size (int) - optional: maximum no. of searches waiting between two stages
+
+    seen_index (SeenIndex) - optional: index of the gathered ids, whose submissions are skipped, and where written ids are added
+
+    profiler (SamplingProfiler) - optional: profiler sampling every stage
+
+    comments_collection (str) - optional: name of the collection where the comments of the submissions,
+    searched on Pushshift, should be saved. Comments aren't gathered by default
+
+    Returns:
+
+    Pipeline: pipeline yielding ((subreddit, query, interval), no. of written submissions) pairs
+    """
+    pipeline = Pipeline(search_results, queue_size, profiler) \
+        .stage(parse_search_results, 'parse') \
+        .stage(dedupe_search_results, 'dedupe')
+
+    if seen_index is not None:
+        pipeline.stage(lambda results: skip_seen_submissions(results, seen_index), 'seen')
+
+    if comments_collection is not None:
+        pipeline.stage(lambda results: write_search_comments(results, comments_collection), 'comments')
+
+    return pipeline.stage(lambda results: write_search_results(results, collection, seen_index), 'write')
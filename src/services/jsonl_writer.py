@@ -0,0 +1,182 @@
+import gzip
+import io
+import json
+import os
+import threading
+import time
+
+
+COMPRESSIONS = ['gzip', 'zstd']
+
+EXTENSIONS = {
+    'gzip': '.jsonl.gz',
+    'zstd': '.jsonl.zst',
+}
+
+
+class JsonlWriter:
+    """Writes documents on JSON Lines files, one directory per collection, compressed with gzip or zstd.
+    Lines are buffered per collection and compressed and appended `chunk_bytes` at a time, each chunk
+    a complete gzip member or zstd frame, so the disk only sees large sequential writes, while every file
+    is still readable as a single stream, see `read_jsonl`. Files are rotated once they hold `max_file_bytes`
+    uncompressed bytes. Documents are only appended: gathering again duplicates them, and they are replaced
+    by `id` when loaded into MongoDB on `upsert` mode.
+
+    Parameters:
+
+    directory (str): directory where the collection directories are created
+
+    compression (str) - optional: `gzip` or `zstd`, the latter requiring the zstandard package
+
+    level (int) - optional: compression level, 6 for gzip and 3 for zstd by default
+
+    chunk_bytes (int) - optional: uncompressed bytes buffered per collection before being written
+
+    max_file_bytes (int) - optional: uncompressed bytes per file before it is rotated
+    """
+    def __init__(self, directory, compression = 'gzip', level = None, chunk_bytes = 4 * 1024 * 1024, max_file_bytes = 256 * 1024 * 1024):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f'Invalid compression "{compression}", expected one of {COMPRESSIONS}')
+
+        self.directory = directory
+        self.compression = compression
+        self.chunk_bytes = chunk_bytes
+        self.max_file_bytes = max_file_bytes
+
+        self._compress = _get_compressor(compression, level)
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._buffer_sizes = {}
+        # collection to its current (file, no. of uncompressed bytes written) pair
+        self._files = {}
+        self._file_counts = {}
+        self._run_id = f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}'
+
+
+    def write(self, document, collection):
+        """Buffers a document to be written.
+
+        Parameters:
+
+        document (dict): document to write
+
+        collection (str): name of the collection where the document should be saved
+        """
+        line = (json.dumps(document, default=str, ensure_ascii=False) + '\n').encode('utf-8')
+
+        with self._lock:
+            self._buffers.setdefault(collection, []).append(line)
+            self._buffer_sizes[collection] = self._buffer_sizes.get(collection, 0) + len(line)
+
+            if self._buffer_sizes[collection] >= self.chunk_bytes:
+                self._write_chunk(collection)
+
+
+    def flush(self):
+        """Blocks until every document buffered so far is written and synced to disk."""
+        with self._lock:
+            for collection in list(self._buffers.keys()):
+                self._write_chunk(collection)
+
+            for file, _ in self._files.values():
+                file.flush()
+                os.fsync(file.fileno())
+
+
+    def close(self):
+        """Writes every buffered document and closes the files. New files are opened on the next write."""
+        self.flush()
+
+        with self._lock:
+            for file, _ in self._files.values():
+                file.close()
+            self._files = {}
+
+
+    def _write_chunk(self, collection):
+        chunk = b''.join(self._buffers.pop(collection))
+        del self._buffer_sizes[collection]
+
+        file, written_bytes = self._files.get(collection) or (self._open_file(collection), 0)
+        file.write(self._compress(chunk))
+        written_bytes += len(chunk)
+
+        if written_bytes >= self.max_file_bytes:
+            file.close()
+            del self._files[collection]
+        else:
+            self._files[collection] = (file, written_bytes)
+
+
+    def _open_file(self, collection):
+        collection_directory = os.path.join(self.directory, collection)
+        os.makedirs(collection_directory, exist_ok=True)
+
+        self._file_counts[collection] = self._file_counts.get(collection, 0) + 1
+        file_name = f'{collection}-{self._run_id}-{self._file_counts[collection]:05d}{EXTENSIONS[self.compression]}'
+        return open(os.path.join(collection_directory, file_name), 'ab')
+
+
+def list_jsonl_files(directory, collection):
+    """Lists the JSON Lines files of a collection, in the order they were written.
+
+    Parameters:
+
+    directory (str): directory where the collection directories were created
+
+    collection (str): collection name
+
+    Returns:
+
+    list of str: file paths
+    """
+    collection_directory = os.path.join(directory, collection)
+    if not os.path.isdir(collection_directory):
+        return []
+
+    return [
+        os.path.join(collection_directory, file_name)
+        for file_name in sorted(os.listdir(collection_directory))
+        if any(file_name.endswith(extension) for extension in EXTENSIONS.values())
+    ]
+
+
+def read_jsonl(path):
+    """Reads the documents of a JSON Lines file written by `JsonlWriter`.
+
+    Parameters:
+
+    path (str): gzip (.jsonl.gz) or zstd (.jsonl.zst) compressed file
+
+    Returns:
+
+    generator of dict: documents, in the order they were written
+    """
+    if path.endswith(EXTENSIONS['zstd']):
+        zstandard = _import_zstandard()
+        with open(path, 'rb') as file:
+            reader = zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True)
+            for line in io.TextIOWrapper(reader, encoding='utf-8'):
+                yield json.loads(line)
+        return
+
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def _get_compressor(compression, level):
+    if compression == 'gzip':
+        level = level if level is not None else 6
+        return lambda data: gzip.compress(data, compresslevel=level)
+
+    # used under the writer lock, since zstd compressors are not thread safe
+    return _import_zstandard().ZstdCompressor(level=level if level is not None else 3).compress
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise Exception('zstd compression requires the zstandard package, install it with `pip install zstandard`')
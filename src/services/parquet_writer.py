@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import threading
+import time
+
+
+# Arrow type of each gathered field, fields not listed are strings. Values of another type are converted
+# or dropped, so every file of a collection shares the same schema whatever the source of its records
+COLUMN_TYPES = {
+    'created_utc': 'int64',
+    'num_comments': 'int64',
+    'score': 'int64',
+    'subscribers': 'int64',
+    'upvote_ratio': 'float64',
+    # edit timestamp, null for records never edited
+    'edited': 'float64',
+    'clicked': 'bool',
+    'is_original_content': 'bool',
+    'is_text_only': 'bool',
+    'is_submitter': 'bool',
+    'locked': 'bool',
+    'over_18': 'bool',
+    'over18': 'bool',
+    'spoiler': 'bool',
+    'stickied': 'bool',
+    'can_assign_link_flair': 'bool',
+    'can_assign_user_flair': 'bool',
+    'keywords': 'list<string>',
+    'author_comment_karma': 'int64',
+    'author_created_utc': 'int64',
+    'author_is_suspended': 'bool',
+    'author_is_mod': 'bool',
+    'author_is_employee': 'bool',
+    'author_has_verified_email': 'bool',
+}
+
+# fields of PRAW authors, see `get_author_data`, flattened as `author_<field>` columns
+AUTHOR_FIELDS = ['id', 'comment_karma', 'created_utc', 'is_suspended', 'is_mod', 'is_employee', 'has_verified_email']
+
+# low cardinality fields, dictionary encoded
+DICTIONARY_COLUMNS = ['subreddit_name', 'subreddit_id', 'author', 'link_flair_text', 'link_flair_template_id', 'distinguished']
+
+
+class ParquetWriter:
+    """Writes documents on Parquet files, partitioned by collection, subreddit and month of creation, on
+    `<directory>/<collection>/subreddit=<subreddit>/month=<YYYY-MM>/` directories, so datasets are scanned
+    by column and only over the partitions they need. Documents are buffered per partition and written
+    `row_group_size` rows at a time, as a single row group. Low cardinality fields are dictionary encoded.
+
+    Records are flattened on a stable schema, see `COLUMN_TYPES`: authors become an `author` name column,
+    as Pushshift authors are plain names, plus the `author_<field>` columns of PRAW authors. The columns
+    of a collection are the fields of its first document, as every document of a collection has the same fields.
+
+    A Parquet file is only readable once closed, as its footer is written last, so `flush` closes and syncs
+    every open file, and the next writes of a partition open a new file. Checkpoints, see `CheckpointJournal`,
+    thus leave one file per written partition, with full row groups but for its last one, which is why the parquet
+    sink is checkpointed every 10 minutes by default instead of every 30 seconds, see `CHECKPOINT_INTERVALS`.
+    Between flushes, files are also closed when they are the least recently written one beyond `max_open_files`.
+
+    Parameters:
+
+    directory (str): directory where the collection directories are created
+
+    row_group_size (int) - optional: no. of rows per row group
+
+    compression (str) - optional: Parquet compression codec, e.g. `zstd`, `snappy` or `none`
+
+    max_buffered_rows (int) - optional: no. of rows buffered over every partition, before the largest buffer is written
+
+    max_open_files (int) - optional: no. of files kept open, the least recently written one is closed beyond it
+    """
+    def __init__(self, directory, row_group_size = 65536, compression = 'zstd', max_buffered_rows = 1000000, max_open_files = 64):
+        self._pyarrow, self._parquet = _import_pyarrow()
+
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.max_buffered_rows = max_buffered_rows
+        self.max_open_files = max_open_files
+
+        self._lock = threading.Lock()
+        self._columns = {}
+        self._buffers = {}
+        self._buffered_rows = 0
+        # partition to its open (file writer, file) pair, from the least to the most recently written
+        self._writers = {}
+        self._file_count = 0
+        self._run_id = f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}'
+
+
+    def write(self, document, collection):
+        """Buffers a document to be written.
+
+        Parameters:
+
+        document (dict): document to write
+
+        collection (str): name of the collection where the document should be saved
+        """
+        row = _flatten(document)
+
+        with self._lock:
+            if collection not in self._columns:
+                self._columns[collection] = list(row.keys())
+
+            partition = (collection, _get_subreddit(row), _get_month(row))
+            self._buffers.setdefault(partition, []).append(row)
+            self._buffered_rows += 1
+
+            if len(self._buffers[partition]) >= self.row_group_size:
+                self._write_row_group(partition)
+            elif self._buffered_rows >= self.max_buffered_rows:
+                self._write_row_group(max(self._buffers, key=lambda partition: len(self._buffers[partition])))
+
+
+    def flush(self):
+        """Blocks until every document buffered so far is written on closed files synced to disk, so they can be read.
+        New files are opened on the next write."""
+        with self._lock:
+            for partition in list(self._buffers.keys()):
+                self._write_row_group(partition)
+
+            for writer, file in self._writers.values():
+                _close_file(writer, file)
+            self._writers = {}
+
+
+    def close(self):
+        """Writes every buffered document and closes the files. New files are opened on the next write."""
+        self.flush()
+
+
+    def _write_row_group(self, partition):
+        rows = self._buffers.pop(partition)
+        self._buffered_rows -= len(rows)
+
+        collection = partition[0]
+        schema = self._get_schema(collection)
+        table = self._pyarrow.Table.from_pydict({
+            column: [_convert(row.get(column), COLUMN_TYPES.get(column, 'string')) for row in rows]
+            for column in self._columns[collection]
+        }, schema=schema)
+
+        writer, file = self._writers.pop(partition, None) or self._open_file(partition, schema)
+        writer.write_table(table, row_group_size=len(rows))
+        self._writers[partition] = (writer, file)
+
+
+    def _open_file(self, partition, schema):
+        if len(self._writers) >= self.max_open_files:
+            least_recent_partition = next(iter(self._writers))
+            _close_file(*self._writers.pop(least_recent_partition))
+
+        collection, subreddit, month = partition
+        partition_directory = os.path.join(self.directory, collection, f'subreddit={subreddit}', f'month={month}')
+        os.makedirs(partition_directory, exist_ok=True)
+
+        self._file_count += 1
+        file = open(os.path.join(partition_directory, f'part-{self._run_id}-{self._file_count:05d}.parquet'), 'wb')
+        writer = self._parquet.ParquetWriter(
+            file,
+            schema,
+            compression=self.compression,
+            use_dictionary=[column for column in DICTIONARY_COLUMNS if column in self._columns[collection]],
+        )
+        return writer, file
+
+
+    def _get_schema(self, collection):
+        types = {
+            'int64': self._pyarrow.int64(),
+            'float64': self._pyarrow.float64(),
+            'bool': self._pyarrow.bool_(),
+            'string': self._pyarrow.string(),
+            'list<string>': self._pyarrow.list_(self._pyarrow.string()),
+        }
+
+        return self._pyarrow.schema([
+            (column, types[COLUMN_TYPES.get(column, 'string')]) for column in self._columns[collection]
+        ])
+
+
+def _close_file(writer, file):
+    # the writer leaves file objects it did not open unclosed, so they are synced here
+    writer.close()
+    file.flush()
+    os.fsync(file.fileno())
+    file.close()
+
+
+def _flatten(document):
+    row = {}
+    for key, value in document.items():
+        if key == '_id':
+            continue
+
+        if key == 'author':
+            # the author columns are kept whatever the first author, e.g. a deleted one
+            author = value if isinstance(value, dict) else {}
+            row['author'] = author.get('name') if isinstance(value, dict) else value
+            for author_field in AUTHOR_FIELDS:
+                row[f'author_{author_field}'] = author.get(author_field)
+        else:
+            row[key] = value
+
+    return row
+
+
+def _convert(value, column_type):
+    if value is None:
+        return None
+
+    if column_type == 'int64':
+        return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if column_type == 'float64':
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if column_type == 'bool':
+        return value if isinstance(value, bool) else None
+    if column_type == 'list<string>':
+        return [str(item) for item in value] if isinstance(value, (list, tuple)) else None
+
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+def _get_subreddit(row):
+    subreddit = row.get('subreddit_name') or row.get('display_name')
+    # subreddit names are alphanumeric, anything else is kept out of paths
+    return re.sub(r'[^A-Za-z0-9_-]', '_', str(subreddit)) if subreddit is not None else '__unknown__'
+
+
+def _get_month(row):
+    created_utc = row.get('created_utc')
+    if not isinstance(created_utc, (int, float)) or isinstance(created_utc, bool):
+        return '__unknown__'
+
+    return time.strftime('%Y-%m', time.gmtime(created_utc))
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow, pyarrow.parquet
+    except ImportError:
+        raise Exception('the parquet sink requires the pyarrow package, install it with `pip install pyarrow`')
@@ -1,8 +1,129 @@
-from src.db.mongo import mongo_db
+import os
+import threading
+from src.db.mongo import get_mongo_db
+from src.services.bulk_writer import BulkWriter, WRITE_MODES
+from src.services.jsonl_writer import JsonlWriter, COMPRESSIONS
+from src.services.parquet_writer import ParquetWriter
+from src.utils.metrics import metrics
+
+
+# unique index on the Reddit id, ignoring documents without one
+ID_INDEX = {
+    'keys': [('id', 1)],
+    'unique': True,
+    'partialFilterExpression': { 'id': { '$type': 'string' } },
+}
+
+# index keys are ascending, 1 being pymongo.ASCENDING, as pymongo is only imported once MongoDB is written on
+COLLECTION_INDEXES = {
+    'submissions': [
+        ID_INDEX,
+        { 'keys': [('subreddit_name', 1), ('created_utc', 1)] },
+        # only set on refreshed submissions, see `get_submissions_to_refresh`
+        { 'keys': [('next_refresh_utc', 1)], 'sparse': True },
+    ],
+    'comments': [
+        ID_INDEX,
+        { 'keys': [('subreddit_name', 1), ('created_utc', 1)] },
+        { 'keys': [('submission_id', 1)] },
+    ],
+    'subreddits': [
+        ID_INDEX,
+    ],
+}
+
+# `mongo` writes on the MongoDB database, `jsonl` on compressed JSON Lines files, to be loaded into MongoDB later,
+# and `parquet` on Parquet files partitioned by subreddit and month, for analysis
+SINKS = ['mongo', 'jsonl', 'parquet']
+
+# default no. of seconds between checkpoints of each sink, see `CheckpointJournal`. Flushing the `parquet` sink
+# closes its files, so it is checkpointed less often, leaving fewer and larger files
+CHECKPOINT_INTERVALS = { 'mongo': 30, 'jsonl': 30, 'parquet': 600 }
+
+_indexed_collections = set()
+
+_write_mode = os.getenv('WRITE_MODE', 'upsert')
+_sink_options = {
+    'sink': os.getenv('SINK', 'mongo'),
+    'path': os.getenv('SINK_PATH', 'output'),
+    'compression': os.getenv('SINK_COMPRESSION', 'gzip'),
+}
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """Returns the sink buffering every write, created on first use, so MongoDB is only connected to
+    when something is written on it. Sinks have the same interface: `write(document, collection)`,
+    `flush()` and `close()`.
+
+    Returns:
+
+    BulkWriter, JsonlWriter or ParquetWriter: bulk writer of the `MONGO_DATABASE` database, JSON Lines writer or Parquet writer, see `set_sink`
+    """
+    global _sink
+
+    with _sink_lock:
+        if _sink is None and _sink_options['sink'] == 'jsonl':
+            _sink = JsonlWriter(
+                _sink_options['path'],
+                compression=_sink_options['compression'],
+                chunk_bytes=int(os.getenv('JSONL_CHUNK_BYTES', 4 * 1024 * 1024)),
+                max_file_bytes=int(os.getenv('JSONL_FILE_BYTES', 256 * 1024 * 1024)),
+            )
+        elif _sink is None and _sink_options['sink'] == 'parquet':
+            _sink = ParquetWriter(
+                _sink_options['path'],
+                row_group_size=int(os.getenv('PARQUET_ROW_GROUP_SIZE', 65536)),
+                compression=os.getenv('PARQUET_COMPRESSION', 'zstd'),
+            )
+        elif _sink is None:
+            _sink = BulkWriter(
+                get_mongo_db(),
+                mode=_write_mode,
+                max_documents=int(os.getenv('MONGO_BULK_SIZE', 1000)),
+                max_bytes=int(os.getenv('MONGO_BULK_BYTES', 8 * 1024 * 1024)),
+                max_interval=float(os.getenv('MONGO_BULK_INTERVAL', 5)),
+            )
+
+    return _sink
+
+
+def set_sink(sink, path = None, compression = None):
+    """Sets where objects are written. Objects already buffered are written on the previous sink.
+
+    Parameters:
+
+    sink (str): `mongo`, `jsonl` or `parquet`
+
+    path (str) - optional: directory of the `jsonl` or `parquet` files
+
+    compression (str) - optional: compression of the `jsonl` files, `gzip` or `zstd`
+    """
+    global _sink
+
+    if sink not in SINKS:
+        raise ValueError(f'Invalid sink "{sink}", expected one of {SINKS}')
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f'Invalid compression "{compression}", expected one of {COMPRESSIONS}')
+
+    with _sink_lock:
+        previous_sink = _sink
+        _sink = None
+        _sink_options['sink'] = sink
+        _sink_options['path'] = path if path is not None else _sink_options['path']
+        _sink_options['compression'] = compression if compression is not None else _sink_options['compression']
+
+    if previous_sink is not None:
+        previous_sink.close()
+
+    # file sinks are created right away, so missing optional packages fail before gathering
+    if sink != 'mongo':
+        get_sink()
 
 
 def insert_subreddit(subreddit, collection):
-    """Inserts subreddit object on database.
+    """Inserts subreddit object on database. The write is buffered, see `flush_writes`.
 
     Parameters:
     
@@ -10,11 +131,11 @@ def insert_subreddit(subreddit, collection):
 
     collection (str): name of the collection where the object should be saved
     """
-    mongo_db[collection].insert_one(subreddit)
+    get_sink().write(subreddit, collection)
 
 
 def insert_submission(submission, collection):
-    """Inserts submission object on database.
+    """Inserts submission object on database. The write is buffered, see `flush_writes`.
 
     Parameters:
     
@@ -22,11 +143,11 @@ def insert_submission(submission, collection):
 
     collection (str): name of the collection where the object should be saved
     """
-    mongo_db[collection].insert_one(submission)
+    get_sink().write(submission, collection)
 
 
 def insert_comment(comment, collection):
-    """Inserts comment object on database.
+    """Inserts comment object on database. The write is buffered, see `flush_writes`.
 
     Parameters:
     
@@ -34,4 +155,174 @@ def insert_comment(comment, collection):
 
     collection (str): name of the collection where the object should be saved
     """
-    mongo_db[collection].insert_one(comment)
+    get_sink().write(comment, collection)
+
+
+def insert_truncated_thread(thread, collection):
+    """Inserts the record of a submission whose comments were not completely gathered on database.
+    The write is buffered, see `flush_writes`.
+
+    Parameters:
+
+    thread (dict): truncated thread record
+
+    collection (str): name of the collection where the object should be saved
+    """
+    get_sink().write(thread, collection)
+
+
+def flush_writes():
+    """Blocks until every buffered object is written on database."""
+    if _sink is not None:
+        _sink.flush()
+
+
+def close_writes():
+    """Writes every buffered object on database and stops the background writer."""
+    if _sink is not None:
+        _sink.close()
+
+
+def get_gathered_ids(collection):
+    """Reads the Reddit ids of the documents stored on a MongoDB collection, e.g. to rebuild a `SeenIndex`.
+
+    Parameters:
+
+    collection (str): name of the collection
+
+    Returns:
+
+    generator of str: Reddit ids
+    """
+    for document in get_mongo_db()[collection].find({ 'id': { '$type': 'string' } }, { 'id': 1, '_id': 0 }, batch_size=10000):
+        yield document['id']
+
+
+def get_submissions_to_refresh(collection, now, min_created_utc, fields, limit = None):
+    """Reads the stored submissions due for a refresh: the ones whose `next_refresh_utc` is past, and the ones
+    never refreshed created after `min_created_utc`. Submissions refreshed for the last time have a null `next_refresh_utc`.
+
+    Parameters:
+
+    collection (str): name of the collection where the submissions are saved
+
+    now (float): current timestamp
+
+    min_created_utc (float): timestamp never refreshed submissions are created after
+
+    fields (list of str): fields read along with the id
+
+    limit (int) - optional: maximum no. of submissions read
+
+    Returns:
+
+    generator of dicts: submission documents, with the given fields only
+    """
+    query = { '$or': [
+        { 'next_refresh_utc': { '$lte': now } },
+        { 'next_refresh_utc': { '$exists': False }, 'created_utc': { '$gte': min_created_utc } },
+    ] }
+    projection = { 'id': 1, '_id': 0, **{ field: 1 for field in fields } }
+
+    cursor = get_mongo_db()[collection].find(query, projection, batch_size=10000)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+
+    for document in cursor:
+        yield document
+
+
+def update_documents(updates, collection):
+    """Sets fields of stored documents by their Reddit id, through a single unordered `bulk_write` call.
+    Written right away, unlike the buffered inserts, and only on MongoDB.
+
+    Parameters:
+
+    updates (list of tuples): (Reddit id, field to value map) pairs
+
+    collection (str): name of the collection where the documents are saved
+
+    Returns:
+
+    int: no. of updated documents
+    """
+    if len(updates) == 0:
+        return 0
+
+    from pymongo import UpdateOne
+
+    with metrics.time('mongo.update_ms'):
+        result = get_mongo_db()[collection].bulk_write([
+            UpdateOne({ 'id': document_id }, { '$set': fields }) for document_id, fields in updates
+        ], ordered=False)
+    metrics.increment('mongo.updates', len(updates))
+
+    return result.modified_count
+
+
+def set_write_mode(mode):
+    """Sets how objects are written on database: `insert` always inserts them, while
+    `upsert` replaces objects with the same Reddit id, so gathering again is idempotent.
+    Only applies to the `mongo` sink, `jsonl` files are appended to.
+
+    Parameters:
+
+    mode (str): `insert` or `upsert`
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f'Invalid write mode "{mode}", expected one of {WRITE_MODES}')
+
+    global _write_mode
+    _write_mode = mode
+
+    if isinstance(_sink, BulkWriter):
+        _sink.flush()
+        _sink.mode = mode
+
+
+def ensure_indexes(submissions_collection = None, comments_collection = None, subreddits_collection = None):
+    """Creates, if missing, and verifies the indexes of the given collections: an unique index on the Reddit id
+    and compound indexes on (subreddit_name, created_utc) and, for submissions, on next_refresh_utc or, for comments, on submission_id.
+    Each collection is only checked once per process, and only on the `mongo` sink.
+
+    Parameters:
+
+    submissions_collection (str) - optional: name of the collection where submissions are saved
+
+    comments_collection (str) - optional: name of the collection where comments are saved
+
+    subreddits_collection (str) - optional: name of the collection where subreddits are saved
+    """
+    collections = [
+        (submissions_collection, COLLECTION_INDEXES['submissions']),
+        (comments_collection, COLLECTION_INDEXES['comments']),
+        (subreddits_collection, COLLECTION_INDEXES['subreddits']),
+    ]
+
+    if _sink_options['sink'] != 'mongo':
+        return
+
+    from pymongo.errors import OperationFailure
+
+    mongo_db = get_mongo_db()
+
+    for collection, indexes in collections:
+        if collection is None or collection in _indexed_collections:
+            continue
+
+        for index in indexes:
+            options = { key: value for key, value in index.items() if key != 'keys' }
+            try:
+                mongo_db[collection].create_index(index['keys'], **options)
+            except OperationFailure as e:
+                # e.g. duplicated ids stored before the unique index existed
+                print(f'Error while creating index {index["keys"]} on "{collection}": {e}')
+
+        existing_keys = [info['key'] for info in mongo_db[collection].index_information().values()]
+        missing_keys = [index['keys'] for index in indexes if index['keys'] not in existing_keys]
+        if len(missing_keys) > 0:
+            print(f'Missing indexes on "{collection}": {missing_keys}')
+        else:
+            print(f'Indexes verified on "{collection}"')
+
+        _indexed_collections.add(collection)
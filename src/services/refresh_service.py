@@ -0,0 +1,160 @@
+import time
+from src.integrations.reddit import hydrate_submissions, INFO_BATCH_SIZE
+from src.services.reddit_service import get_submissions_to_refresh, update_documents
+from src.utils.metrics import metrics
+
+
+# engagement fields changing after a submission is gathered, along with their PRAW attribute
+REFRESHED_FIELDS = [
+    ('score', 'score'),
+    ('num_comments', 'num_comments'),
+    ('upvote_ratio', 'upvote_ratio'),
+]
+
+# a submission is refreshed again after a fraction of its age, e.g. a 2 hours old submission after 1 hour,
+# within the minimum and maximum intervals
+REFRESH_AGE_FACTOR = 0.5
+MIN_REFRESH_INTERVAL = 60 * 60
+MAX_REFRESH_INTERVAL = 30 * 24 * 60 * 60
+
+# Reddit archives submissions after 6 months, freezing their votes and comments
+MAX_REFRESH_AGE = 180 * 24 * 60 * 60
+
+
+def get_refresh_interval(age, age_factor = REFRESH_AGE_FACTOR, min_interval = MIN_REFRESH_INTERVAL, max_interval = MAX_REFRESH_INTERVAL):
+    """Returns how long to wait before refreshing a submission again, growing with its age,
+    so young submissions, whose engagement changes fast, are refreshed often and old ones rarely.
+
+    Parameters:
+
+    age (float): no. of seconds since the submission was created
+
+    age_factor (float) - optional: fraction of the age waited
+
+    min_interval (float) - optional: minimum no. of seconds waited
+
+    max_interval (float) - optional: maximum no. of seconds waited
+
+    Returns:
+
+    float: no. of seconds to wait
+    """
+    return min(max_interval, max(min_interval, age * age_factor))
+
+
+def get_next_refresh_utc(created_utc, now, max_age = MAX_REFRESH_AGE):
+    """Schedules the next refresh of a submission just refreshed, see `get_refresh_interval`.
+
+    Parameters:
+
+    created_utc (float): timestamp the submission was created
+
+    now (float): current timestamp
+
+    max_age (float) - optional: age after which submissions aren't refreshed anymore
+
+    Returns:
+
+    float: timestamp of the next refresh, or None when the submission is too old to be refreshed again
+    """
+    next_refresh_utc = now + get_refresh_interval(now - created_utc)
+    return next_refresh_utc if next_refresh_utc - created_utc <= max_age else None
+
+
+def get_changed_fields(document, submission):
+    """Compares the engagement fields of a stored submission with a fresh PRAW instance.
+    Fields left out of the stored document, e.g. by a field projection, are ignored.
+
+    Parameters:
+
+    document (dict): stored submission document
+
+    submission (praw.models.Submission): hydrated PRAW submission instance
+
+    Returns:
+
+    dict: changed field to fresh value map
+    """
+    changed_fields = {}
+    for field, attribute in REFRESHED_FIELDS:
+        if field not in document:
+            continue
+
+        value = getattr(submission, attribute, None)
+        if value != document[field]:
+            changed_fields[field] = value
+
+    return changed_fields
+
+
+def refresh_submissions(reddit, collection, now = None, max_age = MAX_REFRESH_AGE, limit = None, batch_size = INFO_BATCH_SIZE):
+    """Refreshes the engagement fields of the stored submissions due for it, see `get_next_refresh_utc`,
+    instead of gathering them again. Submissions are fetched `batch_size` per request, and each batch is written
+    through a single bulk update setting the changed fields, along with the refresh schedule.
+
+    Parameters:
+
+    reddit (praw.Reddit): PRAW Reddit instance
+
+    collection (str): name of the collection where the submissions are saved
+
+    now (float) - optional: current timestamp, the actual time by default
+
+    max_age (float) - optional: age after which submissions aren't refreshed anymore
+
+    limit (int) - optional: maximum no. of submissions refreshed
+
+    batch_size (int) - optional: no. of submissions fetched per request, up to 100
+
+    Returns:
+
+    dict: no. of submissions selected, refreshed, changed and missing from Reddit
+    """
+    now = now if now is not None else time.time()
+    fields = ['created_utc'] + [field for field, _ in REFRESHED_FIELDS]
+    summary = { 'selected': 0, 'refreshed': 0, 'changed': 0, 'missing': 0 }
+
+    documents = iter(get_submissions_to_refresh(collection, now, now - max_age, fields, limit))
+
+    while True:
+        batch = {}
+        for document in documents:
+            batch[document['id']] = document
+            if len(batch) == batch_size:
+                break
+
+        if len(batch) == 0:
+            break
+
+        updates = []
+        missing_ids = []
+        for submission in hydrate_submissions(reddit, list(batch.keys()), batch_size, on_missing=missing_ids.extend):
+            document = batch[submission.id]
+            changed_fields = get_changed_fields(document, submission)
+            if len(changed_fields) > 0:
+                summary['changed'] += 1
+
+            updates.append((submission.id, {
+                **changed_fields,
+                'refreshed_utc': now,
+                'next_refresh_utc': get_next_refresh_utc(document['created_utc'], now, max_age),
+            }))
+
+        # deleted submissions are checked again on their schedule, like the others
+        for submission_id in missing_ids:
+            updates.append((submission_id, {
+                'refreshed_utc': now,
+                'next_refresh_utc': get_next_refresh_utc(batch[submission_id]['created_utc'], now, max_age),
+            }))
+
+        update_documents(updates, collection)
+
+        summary['selected'] += len(batch)
+        summary['refreshed'] += len(batch) - len(missing_ids)
+        summary['missing'] += len(missing_ids)
+        print(f'Refreshed {summary["selected"]} submissions, {summary["changed"]} changed')
+
+    metrics.increment('refresh.submissions', summary['refreshed'])
+    metrics.increment('refresh.changed', summary['changed'])
+
+    return summary
@@ -0,0 +1,239 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.metrics import metrics
+
+
+DEFAULT_MAX_WORKERS = int(os.getenv('PUSHSHIFT_MAX_WORKERS', 8))
+
+# maximum no. of comma separated subreddits searched by a single query. 1 searches every subreddit on its own
+MAX_SUBREDDITS_PER_QUERY = int(os.getenv('PUSHSHIFT_MAX_SUBREDDITS_PER_QUERY', 20))
+
+
+class SubredditGrouper:
+    """Groups subreddits to be searched together on a single Pushshift query, learning how many results
+    each subreddit returns per second of searched interval. Subreddits are packed while their expected
+    results fit in `max_group_results`, so sparse subreddits share requests, while dense subreddits, expected
+    to fill it by themselves, are searched alone and concurrently. Subreddits not searched yet are expected to be sparse.
+
+    Parameters:
+
+    max_group_results (int) - optional: expected no. of results of a group, usually the page size
+
+    max_group_size (int) - optional: maximum no. of subreddits per group
+    """
+    def __init__(self, max_group_results = 500, max_group_size = MAX_SUBREDDITS_PER_QUERY):
+        self.max_group_results = max_group_results
+        self.max_group_size = max_group_size
+        self._rates = {}
+        self._lock = threading.Lock()
+
+
+    def group(self, subreddits, interval, query = None):
+        """Splits subreddits into groups to be searched together.
+
+        Parameters:
+
+        subreddits (list of str): subreddit titles
+
+        interval (tuple): interval object (tuple) representing starting timestamp and ending timestamp
+
+        query (str) - optional: searched query, since the no. of results depends on it
+
+        Returns:
+
+        list of lists: groups of subreddit titles, in the given subreddits order
+        """
+        duration = max(1, interval[1] - interval[0])
+        groups = []
+        group = []
+        group_results = 0
+
+        with self._lock:
+            expected_results = [self._rates.get((subreddit.lower(), query), 0) * duration for subreddit in subreddits]
+
+        for subreddit, expected in zip(subreddits, expected_results):
+            if expected >= self.max_group_results or self.max_group_size <= 1:
+                groups.append([subreddit])
+                continue
+
+            if len(group) > 0 and (group_results + expected > self.max_group_results or len(group) >= self.max_group_size):
+                groups.append(group)
+                group = []
+                group_results = 0
+
+            group.append(subreddit)
+            group_results += expected
+
+        if len(group) > 0:
+            groups.append(group)
+
+        return groups
+
+
+    def observe(self, subreddit, interval, query, count):
+        """Records the no. of results of a subreddit search, to estimate the results of the next ones.
+
+        Parameters:
+
+        subreddit (str): subreddit title
+
+        interval (tuple): searched interval
+
+        query (str): searched query
+
+        count (int): no. of results found
+        """
+        with self._lock:
+            self._rates[(subreddit.lower(), query)] = count / max(1, interval[1] - interval[0])
+
+
+def _run_query(search_function, query):
+    subreddit, keyword, interval = query
+    return [result for page in search_function(subreddit, interval, keyword) for result in page]
+
+
+def _search_windowed(search_function, queries, max_workers):
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for query in queries:
+                in_flight.append((query, executor.submit(_run_query, search_function, query)))
+
+                if len(in_flight) >= max_workers * 2:
+                    query, future = in_flight.popleft()
+                    yield query, future.result()
+
+            while len(in_flight) > 0:
+                query, future = in_flight.popleft()
+                yield query, future.result()
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+
+def search_concurrently(search_function, subreddits, intervals, keywords = None, max_workers = DEFAULT_MAX_WORKERS):
+    """Runs a paginated Pushshift search for every (subreddit, keyword, interval) combination
+    on a thread pool and yields the results in deterministic order: by subreddit, then keyword, then interval.
+    Only a bounded window of queries is in flight at a time, so results are not piled up in memory
+    ahead of the consumer. Request rate is controlled by the rate limiter of the integration itself.
+
+    Parameters:
+
+    search_function (function): paginated search, called as search_function(subreddit, interval, keyword)
+
+    subreddits (list of str): subreddit titles
+
+    intervals (list of tuple): list of interval objects (tuples) representing starting timestamp and ending timestamp
+
+    keywords (list of str) - optional: keywords to search. Without keywords, a single search per subreddit and interval is made
+
+    max_workers (int) - optional: no. of concurrent searches
+
+    Returns:
+
+    generator of tuples: ((subreddit, keyword, interval), results) pairs
+    """
+    keywords = keywords if keywords is not None and len(keywords) > 0 else [None]
+    queries = [
+        (subreddit, keyword, interval)
+        for subreddit in subreddits
+        for keyword in keywords
+        for interval in intervals
+    ]
+
+    return _search_windowed(search_function, queries, max_workers)
+
+
+def search_subreddit_groups_concurrently(search_function, subreddits, intervals, keywords = None, grouper = None, max_workers = DEFAULT_MAX_WORKERS, is_completed = None):
+    """Like `search_concurrently`, but searches groups of subreddits together, through comma separated
+    subreddit titles, and splits the results back by their `subreddit` field. Groups are planned by
+    `grouper` right before each interval is searched, so they adapt to the results of the previous intervals.
+    Results are yielded in interval, keyword and subreddit order.
+
+    Parameters:
+
+    search_function (function): paginated search, called as search_function(subreddits, interval, keyword)
+
+    subreddits (list of str): subreddit titles
+
+    intervals (list of tuple): list of interval objects (tuples) representing starting timestamp and ending timestamp
+
+    keywords (list of str) - optional: keywords to search. Without keywords, a single search per group and interval is made
+
+    grouper (SubredditGrouper) - optional: groups planner, shared across calls to keep what it learned
+
+    max_workers (int) - optional: no. of concurrent searches
+
+    is_completed (function) - optional: called as is_completed(subreddit, keyword, interval), skips the searches it returns True for
+
+    Returns:
+
+    generator of tuples: ((subreddit, keyword, interval), results) pairs, for every subreddit searched
+    """
+    keywords = keywords if keywords is not None and len(keywords) > 0 else [None]
+    grouper = grouper if grouper is not None else SubredditGrouper()
+
+    # planned lazily, as the window of in-flight searches moves forward
+    queries = (
+        (','.join(group), keyword, interval)
+        for interval in intervals
+        for keyword in keywords
+        for group in grouper.group(_get_pending_subreddits(subreddits, keyword, interval, is_completed), interval, keyword)
+    )
+
+    for (joined_subreddits, keyword, interval), results in _search_windowed(search_function, queries, max_workers):
+        group = joined_subreddits.split(',')
+        group_results = _split_by_subreddit(results, group)
+
+        for subreddit in group:
+            grouper.observe(subreddit, interval, keyword, len(group_results[subreddit]))
+            metrics.observe('search.submissions', len(group_results[subreddit]))
+            yield (subreddit, keyword, interval), group_results[subreddit]
+
+
+def isolate_search_failures(search_function, failed_subreddits):
+    """Wraps a paginated search, so a failing search ends early instead of raising, recording the failed
+    subreddits. The searches of other subreddits go on, and the caller decides what to do with the failed ones.
+
+    Parameters:
+
+    search_function (function): paginated search, called as search_function(subreddits, interval, keyword)
+
+    failed_subreddits (set): set where the titles of the subreddits whose search failed are added
+
+    Returns:
+
+    function: paginated search, with the same arguments
+    """
+    def search(subreddits, interval, keyword = None):
+        try:
+            yield from search_function(subreddits, interval, keyword)
+        except Exception as e:
+            print(f'Error searching "{subreddits}" within {interval}: {e}')
+            failed_subreddits.update(subreddits.split(','))
+
+    return search
+
+
+def _get_pending_subreddits(subreddits, keyword, interval, is_completed):
+    if is_completed is None:
+        return subreddits
+
+    return [subreddit for subreddit in subreddits if not is_completed(subreddit, keyword, interval)]
+
+
+def _split_by_subreddit(results, subreddits):
+    # Pushshift returns the subreddit titles with their own capitalization
+    subreddit_titles = { subreddit.lower(): subreddit for subreddit in subreddits }
+    results_by_subreddit = { subreddit: [] for subreddit in subreddits }
+
+    for result in results:
+        subreddit = subreddit_titles.get(str(result.get("subreddit")).lower())
+        if subreddit is not None:
+            results_by_subreddit[subreddit].append(result)
+        elif len(subreddits) == 1:
+            results_by_subreddit[subreddits[0]].append(result)
+
+    return results_by_subreddit
@@ -0,0 +1,97 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """Case-insensitive multi-keyword matcher built on an Aho-Corasick automaton, so texts are scanned
+    once whatever the no. of keywords. Like Pushshift searches, only whole words match: a keyword
+    must not be preceded nor followed by a letter or digit.
+
+    Parameters:
+
+    keywords (list of str): keywords to match. Multi-word keywords match as phrases
+    """
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword.strip() != ''))
+
+        # state 0 is the root; each state has its transitions, failure state and (keyword index, length) outputs
+        self._transitions = [{}]
+        self._failures = [0]
+        self._outputs = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            self._add(keyword.lower(), index)
+        self._build_failures()
+
+
+    def match(self, *texts):
+        """Finds the keywords present on the given texts.
+
+        Parameters:
+
+        texts (str): texts to scan, e.g. a submission title and body. None values are ignored
+
+        Returns:
+
+        list of str: matched keywords, in the order they were given
+        """
+        matched = set()
+        for text in texts:
+            if text:
+                matched.update(self._scan(text.lower()))
+
+        return [keyword for index, keyword in enumerate(self.keywords) if index in matched]
+
+
+    def _add(self, keyword, index):
+        state = 0
+        for character in keyword:
+            next_state = self._transitions[state].get(character)
+            if next_state is None:
+                next_state = len(self._transitions)
+                self._transitions.append({})
+                self._failures.append(0)
+                self._outputs.append([])
+                self._transitions[state][character] = next_state
+            state = next_state
+
+        self._outputs[state].append((index, len(keyword)))
+
+
+    def _build_failures(self):
+        states = deque(self._transitions[0].values())
+
+        while len(states) > 0:
+            state = states.popleft()
+            for character, next_state in self._transitions[state].items():
+                states.append(next_state)
+
+                failure = self._failures[state]
+                while failure != 0 and character not in self._transitions[failure]:
+                    failure = self._failures[failure]
+
+                failure = self._transitions[failure].get(character, 0)
+                self._failures[next_state] = failure
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[failure]
+
+
+    def _scan(self, text):
+        transitions = self._transitions
+        failures = self._failures
+        outputs = self._outputs
+        matched = set()
+        state = 0
+
+        for position, character in enumerate(text):
+            while state != 0 and character not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(character, 0)
+
+            for index, length in outputs[state]:
+                if index in matched:
+                    continue
+
+                start = position - length + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (position + 1 == len(text) or not text[position + 1].isalnum()):
+                    matched.add(index)
+
+        return matched
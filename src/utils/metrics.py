@@ -0,0 +1,327 @@
+import json
+import threading
+import time
+
+
+# upper bounds of the histogram buckets, doubling from 1 to 65536, e.g. milliseconds or no. of submissions
+BUCKETS = [2 ** i for i in range(17)]
+
+PERCENTILES = [50, 90, 99]
+
+
+class Histogram:
+    """Distribution of observed values over exponential buckets, with their count, sum, minimum and maximum.
+
+    Parameters:
+
+    buckets (list of float) - optional: upper bounds of the buckets, in ascending order. Larger values go to an overflow bucket
+    """
+    def __init__(self, buckets = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+
+    def observe(self, value):
+        position = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[position] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+
+    def percentile(self, percentile):
+        """Estimates a percentile, interpolating within its bucket.
+
+        Parameters:
+
+        percentile (float): percentile, from 0 to 100
+
+        Returns:
+
+        float: estimated value, or None without observations
+        """
+        if self.count == 0:
+            return None
+
+        rank = percentile / 100 * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            if count > 0 and seen + count >= rank:
+                lower = self.buckets[position - 1] if position > 0 else self.min
+                upper = self.buckets[position] if position < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+
+        return self.max
+
+
+    def get_values(self):
+        """Returns the representative value and count of each non-empty bucket, the midpoint of its bounds,
+        as expected by CloudWatch Embedded Metric Format.
+
+        Returns:
+
+        tuple: (list of values, list of counts)
+        """
+        values = []
+        counts = []
+        for position, count in enumerate(self.counts):
+            if count == 0:
+                continue
+
+            lower = max(self.buckets[position - 1] if position > 0 else self.min, self.min)
+            upper = min(self.buckets[position] if position < len(self.buckets) else self.max, self.max)
+            values.append((lower + upper) / 2)
+            counts.append(count)
+
+        return values, counts
+
+
+    def to_dict(self):
+        summary = {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'min': self.min,
+            'max': self.max,
+        }
+        for percentile in PERCENTILES:
+            value = self.percentile(percentile)
+            summary[f'p{percentile}'] = round(value, 3) if value is not None else None
+
+        return summary
+
+
+class _Timer:
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+
+    def __enter__(self):
+        self._started_at = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self._metrics.observe(self._name, (time.perf_counter() - self._started_at) * 1000)
+        return False
+
+
+class Metrics:
+    """Thread safe registry of counters and histograms. Names are dotted, by area, e.g. `pushshift.requests`,
+    and histograms of durations end with `_ms`."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+
+    def increment(self, name, value = 1):
+        """Adds to a counter.
+
+        Parameters:
+
+        name (str): counter name
+
+        value (int) - optional: amount added
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+
+    def observe(self, name, value):
+        """Records a value on a histogram.
+
+        Parameters:
+
+        name (str): histogram name
+
+        value (float): observed value
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+
+    def time(self, name):
+        """Times a block, recording its duration in milliseconds on a histogram.
+
+        Parameters:
+
+        name (str): histogram name, ending with `_ms`
+
+        Returns:
+
+        context manager: timer of the `with` block
+        """
+        return _Timer(self, name)
+
+
+    def get_counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+
+    def get_histogram(self, name):
+        """Returns the summary of a histogram, see `Histogram.to_dict`, or None when nothing was observed."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return histogram.to_dict() if histogram is not None else None
+
+
+    def snapshot(self):
+        """Returns every counter and histogram summary.
+
+        Returns:
+
+        dict: `counters` (name to value) and `histograms` (name to summary) maps
+        """
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': { name: histogram.to_dict() for name, histogram in self._histograms.items() },
+            }
+
+
+    def to_json_log(self, **fields):
+        """Formats every metric as a single structured JSON log line.
+
+        Parameters:
+
+        fields (dict) - optional: fields added to the log line, e.g. the gathering parameters
+
+        Returns:
+
+        str: JSON log line
+        """
+        return json.dumps({ 'metrics': self.snapshot(), **fields }, default=str)
+
+
+    def to_emf(self, namespace, dimensions = None):
+        """Formats every metric as a CloudWatch Embedded Metric Format log line, so CloudWatch Logs extracts them
+        as metrics. Histograms are sent as value and count arrays.
+
+        Parameters:
+
+        namespace (str): CloudWatch namespace
+
+        dimensions (dict) - optional: dimension name to value map, e.g. the gathered language
+
+        Returns:
+
+        str: JSON log line
+        """
+        dimensions = dimensions if dimensions is not None else {}
+        definitions = []
+        values = {}
+
+        with self._lock:
+            for name, value in self._counters.items():
+                definitions.append({ 'Name': name, 'Unit': 'Count' })
+                values[name] = value
+
+            for name, histogram in self._histograms.items():
+                bucket_values, bucket_counts = histogram.get_values()
+                definitions.append({ 'Name': name, 'Unit': 'Milliseconds' if name.endswith('_ms') else 'None' })
+                values[name] = { 'Values': bucket_values, 'Counts': bucket_counts }
+
+        return json.dumps({
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [
+                    # at most 100 metrics per directive
+                    { 'Namespace': namespace, 'Dimensions': [list(dimensions.keys())], 'Metrics': definitions[i:i + 100] }
+                    for i in range(0, len(definitions), 100)
+                ],
+            },
+            **dimensions,
+            **values,
+        })
+
+
+    def reset(self):
+        """Forgets every metric, e.g. between invocations of a warm Lambda container."""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+
+class ThroughputReporter:
+    """Prints the gathering throughput and ETA, along with the request latencies of each service,
+    at most once every `interval` seconds.
+
+    Parameters:
+
+    name (str) - optional: what is counted, e.g. `submissions`
+
+    interval (float) - optional: minimum no. of seconds between reports
+
+    registry (Metrics) - optional: metrics whose latencies are reported
+    """
+    # latency histograms reported, by service
+    LATENCIES = [
+        ('pushshift', 'pushshift.request_ms'),
+        ('reddit', 'reddit.info_ms'),
+        ('comments', 'reddit.comment_tree_ms'),
+        ('mongo', 'mongo.write_ms'),
+    ]
+
+    def __init__(self, name = 'submissions', interval = 10, registry = None):
+        self.name = name
+        self.interval = interval
+        self.registry = registry if registry is not None else metrics
+        self._started_at = time.monotonic()
+        self._reported_at = self._started_at
+
+
+    def update(self, done, total = None, force = False):
+        """Reports progress, unless the last report is too recent.
+
+        Parameters:
+
+        done (int): no. of items done
+
+        total (int) - optional: no. of items known so far, for the ETA
+
+        force (bool) - optional: whether to report anyway, e.g. once finished
+        """
+        now = time.monotonic()
+        if not force and now - self._reported_at < self.interval:
+            return
+
+        self._reported_at = now
+        print(self.format(done, total, now - self._started_at))
+
+
+    def format(self, done, total, elapsed):
+        rate = done / elapsed if elapsed > 0 else 0.0
+        message = f'{done}{f" of {total}" if total is not None else ""} {self.name} in {elapsed:.0f}s ({rate:.1f}/s'
+        if total is not None and rate > 0 and total > done:
+            message += f', ETA {_format_duration((total - done) / rate)}'
+        message += ')'
+
+        latencies = []
+        for service, name in self.LATENCIES:
+            histogram = self.registry.get_histogram(name)
+            if histogram is not None:
+                latencies.append(f'{service} {histogram["count"]} x p50 {histogram["p50"]:.0f}ms p99 {histogram["p99"]:.0f}ms')
+
+        return message + (f' | {", ".join(latencies)}' if len(latencies) > 0 else '')
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}h{minutes:02d}m{seconds:02d}s' if hours > 0 else f'{minutes}m{seconds:02d}s'
+
+
+# shared by every module, so each area records its metrics without passing a registry around
+metrics = Metrics()
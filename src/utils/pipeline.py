@@ -0,0 +1,117 @@
+import queue
+import threading
+
+
+DEFAULT_QUEUE_SIZE = 16
+
+_END = object()
+
+
+class Pipeline:
+    """Streams items from a source through a chain of stages, each one running on its own thread
+    and connected to the next one by a bounded queue. Stages work at the same time on different items,
+    and a slow stage blocks the ones before it (backpressure) instead of letting items pile up in memory.
+    The first error raised by the source or a stage stops the whole pipeline and is raised to the consumer.
+
+    Parameters:
+
+    source (iterable): items fed to the first stage
+
+    queue_size (int) - optional: maximum no. of items waiting between two stages
+
+    profiler (SamplingProfiler) - optional: profiler tracking the thread of the source and of each stage
+    """
+    def __init__(self, source, queue_size = DEFAULT_QUEUE_SIZE, profiler = None):
+        self.source = source
+        self.queue_size = queue_size
+        self.profiler = profiler
+        self._stages = []
+        self._stopped = threading.Event()
+        self._error = None
+
+
+    def stage(self, function, name = None):
+        """Appends a stage to the pipeline.
+
+        Parameters:
+
+        function (function): stage, called with an iterator of the previous stage items and returning an iterable
+        of its own items. Being a generator, it can filter, split, batch or keep state across items
+
+        name (str) - optional: name of the stage thread
+
+        Returns:
+
+        Pipeline: the pipeline itself, to chain calls
+        """
+        self._stages.append((function, name if name is not None else f'stage-{len(self._stages) + 1}'))
+        return self
+
+
+    def __iter__(self):
+        """Starts the stages and yields the items of the last one, on the consumer thread.
+        Stopping the iteration early stops every stage."""
+        output_queue = self._start(iter(self.source), 'source')
+        for function, name in self._stages:
+            output_queue = self._start(function(self._consume(output_queue)), name)
+
+        try:
+            for item in self._consume(output_queue):
+                yield item
+
+            if self._error is not None:
+                raise self._error
+        finally:
+            self._stopped.set()
+
+
+    def _start(self, items, name):
+        output_queue = queue.Queue(maxsize=self.queue_size)
+        thread = threading.Thread(target=self._run, args=(items, output_queue, name), name=f'pipeline-{name}', daemon=True)
+        thread.start()
+        return output_queue
+
+
+    def _run(self, items, output_queue, name):
+        if self.profiler is not None:
+            self.profiler.track(name)
+
+        try:
+            for item in items:
+                if not self._put(output_queue, item):
+                    return
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            self._stopped.set()
+        finally:
+            self._put(output_queue, _END, force=True)
+
+            if self.profiler is not None:
+                self.profiler.untrack()
+
+
+    def _put(self, output_queue, item, force = False):
+        while force or not self._stopped.is_set():
+            try:
+                output_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if force and self._stopped.is_set():
+                    return False
+
+        return False
+
+
+    def _consume(self, input_queue):
+        while True:
+            try:
+                item = input_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return
+                continue
+
+            if item is _END:
+                return
+            yield item
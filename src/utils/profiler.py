@@ -0,0 +1,115 @@
+import sys
+import threading
+
+
+class SamplingProfiler:
+    """Statistical profiler of pipeline stages: a background thread samples the stack of every tracked thread
+    every `interval` seconds, so the time of each stage is split among the functions it runs, whether computing
+    or waiting on a request, at a small cost, unlike deterministic profilers hooking every call.
+
+    Parameters:
+
+    interval (float) - optional: no. of seconds between samples
+    """
+    def __init__(self, interval = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        # thread id to the name of its stage
+        self._threads = {}
+        # stage name to its no. of samples, and the samples where each (file, line, function) frame runs, or is on the stack
+        self._samples = {}
+        self._self_samples = {}
+        self._total_samples = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+
+    def start(self):
+        """Starts sampling, on a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+
+    def stop(self):
+        """Stops sampling."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+    def track(self, name):
+        """Tracks the current thread as the given stage, until `untrack` is called.
+
+        Parameters:
+
+        name (str): stage name
+        """
+        with self._lock:
+            self._threads[threading.get_ident()] = name
+
+
+    def untrack(self):
+        """Stops tracking the current thread."""
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+
+    def report(self, top = 10):
+        """Formats the functions where each stage spent the most samples.
+
+        Parameters:
+
+        top (int) - optional: no. of functions per stage
+
+        Returns:
+
+        str: report, one section per stage
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._samples, key=lambda name: -self._samples[name]):
+                samples = self._samples[name]
+                lines.append(f'{name}: {samples} samples, {samples * self.interval:.1f}s')
+
+                for header, counts in [('self', self._self_samples[name]), ('cumulative', self._total_samples[name])]:
+                    lines.append(f'  {header}:')
+                    for (file_name, line, function), count in sorted(counts.items(), key=lambda item: -item[1])[:top]:
+                        lines.append(f'    {100 * count / samples:5.1f}%  {function} ({file_name}:{line})')
+
+        return '\n'.join(lines)
+
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+
+            with self._lock:
+                for thread_id, name in self._threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self._sample(name, frame)
+
+
+    def _sample(self, name, frame):
+        self._samples[name] = self._samples.get(name, 0) + 1
+        self_samples = self._self_samples.setdefault(name, {})
+        total_samples = self._total_samples.setdefault(name, {})
+
+        key = _get_frame_key(frame)
+        self_samples[key] = self_samples.get(key, 0) + 1
+
+        # each function once per sample, however many times it is on the stack
+        seen = set()
+        while frame is not None:
+            key = _get_frame_key(frame)
+            if key not in seen:
+                seen.add(key)
+                total_samples[key] = total_samples.get(key, 0) + 1
+            frame = frame.f_back
+
+
+def _get_frame_key(frame):
+    return (frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name)
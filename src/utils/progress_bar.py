@@ -1,16 +0,0 @@
-def update_progress_bar(iteration, total, prefix='Progress:', suffix='Complete', decimals=1, length=100, fill='█', printEnd="\r"):
-    """Prints and updates a CLI progress bar.
-
-    Parameters:
-    
-    iteration (int): current iteration
-
-    total (int): total number of iterations
-    """
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filledLength = int(length * iteration // total)
-    bar = fill * filledLength + '-' * (length - filledLength)
-    print('\r%s |%s| %s%% %s' % (prefix, bar, percent, suffix), end = printEnd)
-
-    if iteration == total: 
-        print()
@@ -0,0 +1,45 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter. Tokens are refilled continuously at `rate` tokens
+    per second, up to `capacity` tokens, and every call to `acquire` blocks until enough tokens are available.
+
+    Parameters:
+
+    rate (float): tokens refilled per second
+
+    capacity (int) - optional: maximum no. of tokens, i.e. the allowed burst size
+    """
+    def __init__(self, rate, capacity = 1):
+        if rate <= 0:
+            raise ValueError(f'Rate must be positive, got {rate}')
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+
+    def acquire(self, tokens = 1):
+        """Blocks until the requested no. of tokens can be taken from the bucket.
+
+        Parameters:
+
+        tokens (int) - optional: no. of tokens to take
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait_time = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait_time)
@@ -0,0 +1,43 @@
+import pytest
+from src.db.capture_store import CaptureStore, normalize_request
+
+
+class TestNormalizeRequest:
+    def test_equivalent_requests_share_the_key(self):
+        first = normalize_request('HTTPS://API.pushshift.io/reddit/search/submission/?size=500&after=1&q=a%7Cb')
+        second = normalize_request('https://api.pushshift.io/reddit/search/submission/', params={ 'q': 'a|b', 'after': 1, 'size': '500' })
+
+        assert first == second
+
+
+    def test_credentials_are_left_out(self):
+        key = normalize_request('https://www.reddit.com/api/v1/access_token', data=[('password', 'secret'), ('username', 'user')], method='post')
+
+        assert 'secret' not in key
+        assert key.startswith('POST ')
+
+
+class TestCaptureStore:
+    def test_put_and_get(self, tmp_path):
+        store = CaptureStore(str(tmp_path / 'captures.db'))
+
+        store.put('GET https://a', b'{"data": []}')
+
+        assert store.get('GET https://a') == b'{"data": []}'
+        assert store.get('GET https://b') is None
+        assert store.count() == 1
+
+
+    def test_captures_persist_across_instances(self, tmp_path):
+        path = str(tmp_path / 'captures.db')
+        store = CaptureStore(path)
+        store.put('GET https://a', b'first')
+        store.put('GET https://a', b'second')
+        store.close()
+
+        assert CaptureStore(path, 'replay').get('GET https://a') == b'second'
+
+
+    def test_invalid_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            CaptureStore(str(tmp_path / 'captures.db'), 'record')
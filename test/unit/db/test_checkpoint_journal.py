@@ -0,0 +1,98 @@
+from src.db.checkpoint_journal import CheckpointJournal
+
+
+FIRST_SEARCH = ('news', 'a|b', (0, 99))
+SECOND_SEARCH = ('news', 'a|b', (100, 199))
+
+
+class TestCheckpointJournal:
+    def test_search_completes_once_its_submissions_are_recorded(self, tmp_path):
+        journal = CheckpointJournal(str(tmp_path / 'checkpoint.db'))
+
+        journal.begin_search(FIRST_SEARCH, ['a1', 'a2'])
+        journal.record_submissions(['a1'])
+        journal.checkpoint()
+
+        assert not journal.is_search_completed('news', 'a|b', (0, 99))
+        assert journal.is_submission_gathered('a1')
+
+        journal.record_submissions(['a2'])
+        journal.checkpoint()
+
+        assert journal.is_search_completed('news', 'a|b', (0, 99))
+        assert not journal.is_submission_gathered('a1')
+        assert journal.count() == (1, 0)
+
+
+    def test_searches_without_submissions_complete_right_away(self, tmp_path):
+        journal = CheckpointJournal(str(tmp_path / 'checkpoint.db'))
+
+        journal.begin_search(('news', None, (0, 99)), [])
+        journal.checkpoint()
+
+        assert journal.is_search_completed('news', None, (0, 99))
+        assert not journal.is_search_completed('news', 'a|b', (0, 99))
+
+
+    def test_adjacent_ranges_are_merged(self, tmp_path):
+        journal = CheckpointJournal(str(tmp_path / 'checkpoint.db'))
+
+        journal.complete_search(SECOND_SEARCH)
+        journal.complete_search(FIRST_SEARCH)
+        journal.complete_search(('news', 'a|b', (300, 399)))
+        journal.checkpoint()
+
+        assert journal.count() == (2, 0)
+        assert journal.is_search_completed('news', 'a|b', (0, 199))
+        assert not journal.is_search_completed('news', 'a|b', (0, 399))
+
+
+    def test_progress_is_kept_across_runs(self, tmp_path):
+        path = str(tmp_path / 'checkpoint.db')
+        journal = CheckpointJournal(path)
+        journal.complete_search(FIRST_SEARCH)
+        journal.begin_search(SECOND_SEARCH, ['b1', 'b2'])
+        journal.record_submissions(['b1'])
+        journal.checkpoint()
+        journal.close()
+
+        resumed_journal = CheckpointJournal(path)
+
+        assert resumed_journal.is_search_completed('news', 'a|b', (0, 99))
+        assert resumed_journal.is_submission_gathered('b1')
+        assert not resumed_journal.is_submission_gathered('b2')
+
+        resumed_journal.reset()
+
+        assert not resumed_journal.is_search_completed('news', 'a|b', (0, 99))
+        assert not resumed_journal.is_submission_gathered('b1')
+
+
+    def test_progress_is_not_persisted_before_flush(self, tmp_path, mocker):
+        path = str(tmp_path / 'checkpoint.db')
+        journal = CheckpointJournal(path)
+        journal.complete_search(FIRST_SEARCH)
+
+        def flush():
+            assert not CheckpointJournal(path).is_search_completed('news', 'a|b', (0, 99))
+
+        flush = mocker.Mock(side_effect=flush)
+        journal.checkpoint(flush)
+
+        flush.assert_called_once()
+        assert CheckpointJournal(path).is_search_completed('news', 'a|b', (0, 99))
+
+
+    def test_checkpoints_only_when_due(self, tmp_path, mocker):
+        journal = CheckpointJournal(str(tmp_path / 'checkpoint.db'), checkpoint_interval=60)
+        flush = mocker.Mock()
+        journal.complete_search(FIRST_SEARCH)
+
+        journal.checkpoint_if_due(flush)
+
+        flush.assert_not_called()
+
+        journal.checkpoint_interval = 0
+        journal.checkpoint_if_due(flush)
+
+        flush.assert_called_once()
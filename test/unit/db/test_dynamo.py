@@ -0,0 +1,71 @@
+import os
+import socket
+import pytest
+from datetime import datetime
+
+# watermarks are tested against DynamoDB Local, e.g. `docker run -p 8000:8000 amazon/dynamodb-local`
+os.environ.setdefault('AWS_SAM_LOCAL', 'true')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+os.environ.setdefault('LAST_SEARCHED_DATE_TABLE', 'reddit-posts-gatherer-test-last-searched-date-table')
+
+
+def is_dynamodb_local_running():
+    try:
+        socket.create_connection(('localhost', 8000), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(
+    os.environ['AWS_SAM_LOCAL'] != 'true' or not is_dynamodb_local_running(),
+    reason='DynamoDB Local is not running on localhost:8000'
+)
+
+
+@pytest.fixture
+def dynamo(monkeypatch):
+    from src.db import dynamo
+
+    monkeypatch.setenv('LANGUAGE', 'en')
+    monkeypatch.setenv('START_DATE', '2021-01-01')
+
+    table = dynamo.get_dynamodb().create_table(
+        TableName=dynamo.get_table().name,
+        AttributeDefinitions=[{ 'AttributeName': 'id', 'AttributeType': 'S' }],
+        KeySchema=[{ 'AttributeName': 'id', 'KeyType': 'HASH' }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    table.wait_until_exists()
+
+    yield dynamo
+
+    table.delete()
+    table.wait_until_not_exists()
+
+
+class TestWatermarks:
+    def test_streams_without_watermarks_start_at_start_date(self, dynamo):
+        dates = dynamo.get_last_searched_dates([('news', 'a'), ('news', None)])
+
+        assert dates == { ('news', 'a'): datetime(2021, 1, 1), ('news', None): datetime(2021, 1, 1) }
+
+
+    def test_saved_watermarks_are_read_in_batches(self, dynamo):
+        streams = [(f'subreddit{i}', 'a') for i in range(150)]
+
+        dynamo.save_last_searched_dates({ stream: datetime(2021, 1, 5, 23, 59, 59) for stream in streams[:120] })
+        dates = dynamo.get_last_searched_dates(streams)
+
+        assert all(dates[stream] == datetime(2021, 1, 6) for stream in streams[:120])
+        assert all(dates[stream] == datetime(2021, 1, 1) for stream in streams[120:])
+
+
+    def test_new_streams_start_at_the_language_watermark(self, dynamo):
+        dynamo.get_table().put_item(Item={ 'id': 'en', 'last_searched_date': '2021-01-09 23:59:59' })
+
+        dates = dynamo.get_last_searched_dates([('news', 'a')])
+
+        assert dates == { ('news', 'a'): datetime(2021, 1, 10) }
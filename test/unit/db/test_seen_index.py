@@ -0,0 +1,93 @@
+import pytest
+from src.db.seen_index import SeenIndex, HEADER, ID_BYTES
+
+
+class TestSeenIndex:
+    def test_added_ids_are_seen_before_and_after_saving(self, tmp_path):
+        index = SeenIndex(str(tmp_path / 'seen.bin'))
+
+        index.add(['abc123', 't3_zz9'])
+
+        assert index.is_seen('abc123')
+        assert index.is_seen('zz9')
+        assert not index.is_seen('abc124')
+
+        index.save()
+
+        assert index.is_seen('abc123')
+        assert index.is_seen('t3_zz9')
+        assert not index.is_seen('abc124')
+        assert index.count() == 2
+
+
+    def test_saves_merge_ids_in_order(self, tmp_path):
+        path = str(tmp_path / 'seen.bin')
+        index = SeenIndex(path)
+        index.add(['b', 'd', 'f'])
+        index.save()
+        index.add(['a', 'c', 'd', 'g'])
+        index.save()
+        index.close()
+
+        reopened_index = SeenIndex(path)
+
+        assert reopened_index.count() == 6
+        assert all(reopened_index.is_seen(id) for id in ['a', 'b', 'c', 'd', 'f', 'g'])
+        assert not reopened_index.is_seen('e')
+        assert (tmp_path / 'seen.bin').stat().st_size == HEADER.size + 6 * ID_BYTES
+
+
+    def test_unsaved_ids_are_lost(self, tmp_path):
+        path = str(tmp_path / 'seen.bin')
+        index = SeenIndex(path)
+        index.add(['a'])
+        index.save()
+        index.add(['b'])
+        index.close()
+
+        reopened_index = SeenIndex(path)
+
+        assert reopened_index.is_seen('a')
+        assert not reopened_index.is_seen('b')
+
+
+    def test_discarded_ids_are_no_longer_seen(self, tmp_path):
+        index = SeenIndex(str(tmp_path / 'seen.bin'))
+        index.add(['a'])
+        index.save()
+        index.add(['b'])
+        index.discard()
+        index.save()
+
+        assert index.is_seen('a')
+        assert not index.is_seen('b')
+        assert index.count() == 1
+
+
+    def test_rebuild_replaces_every_id(self, tmp_path):
+        index = SeenIndex(str(tmp_path / 'seen.bin'))
+        index.add(['a', 'b'])
+        index.save()
+
+        index.rebuild(id for id in ['c', 'd'])
+
+        assert not index.is_seen('a')
+        assert index.is_seen('c')
+        assert index.count() == 2
+
+
+    def test_invalid_ids_are_never_seen(self, tmp_path):
+        index = SeenIndex(str(tmp_path / 'seen.bin'))
+
+        index.add(['not an id', None, 'z' * 20])
+
+        assert index.count() == 0
+        assert not index.is_seen('not an id')
+
+
+    def test_other_files_are_rejected(self, tmp_path):
+        path = tmp_path / 'seen.bin'
+        path.write_bytes(b'x' * 64)
+
+        with pytest.raises(Exception):
+            SeenIndex(str(path))
@@ -0,0 +1,81 @@
+import pytest
+from types import SimpleNamespace
+from src.integrations import authors
+from src.integrations.authors import AuthorCache, AuthorResolver
+
+
+class FakeRedditors:
+    def __init__(self, existing):
+        self.existing = existing
+        self.requests = []
+
+    def partial_redditors(self, fullnames):
+        self.requests.append(sorted(fullnames))
+        for fullname in fullnames:
+            if fullname in self.existing:
+                yield SimpleNamespace(fullname=fullname, name=f'user-{fullname}', comment_karma=10, created_utc=1)
+
+
+@pytest.fixture
+def reddit():
+    return SimpleNamespace(redditors=FakeRedditors(['t2_a', 't2_b']))
+
+
+class TestAuthorCache:
+    def test_evicts_least_recently_used(self):
+        cache = AuthorCache(max_size=2)
+
+        cache.put('t2_a', { "name": 'a' })
+        cache.put('t2_b', { "name": 'b' })
+        cache.get('t2_a')
+        cache.put('t2_c', { "name": 'c' })
+
+        assert cache.get('t2_a') == (True, { "name": 'a' })
+        assert cache.get('t2_b') == (False, None)
+
+
+    def test_expires_entries(self, mocker):
+        cache = AuthorCache(ttl=10)
+        mocker.patch.object(authors.time, 'time', return_value=100)
+        cache.put('t2_a', { "name": 'a' })
+
+        authors.time.time.return_value = 111
+
+        assert cache.get('t2_a') == (False, None)
+
+
+    def test_persists_entries(self, tmp_path):
+        path = str(tmp_path / 'authors.json')
+        cache = AuthorCache(path=path)
+        cache.put('t2_a', { "name": 'a' })
+        cache.put('t2_b', None)
+        cache.save()
+
+        loaded_cache = AuthorCache(path=path)
+        loaded_cache.load()
+
+        assert loaded_cache.get('t2_a') == (True, { "name": 'a' })
+        assert loaded_cache.get('t2_b') == (True, None)
+
+
+class TestAuthorResolver:
+    def test_resolves_unique_authors_once(self, reddit):
+        resolver = AuthorResolver(reddit, AuthorCache())
+
+        first = resolver.resolve(['t2_a', 't2_a', 't2_b', 't2_x', None])
+        second = resolver.resolve(['t2_a', 't2_b', 't2_x'])
+
+        assert first == second
+        assert first['t2_a']["name"] == 'user-t2_a'
+        assert first['t2_a']["id"] == 'a'
+        assert first['t2_x'] is None
+        assert reddit.redditors.requests == [['t2_a', 't2_b', 't2_x']]
+
+
+    def test_resolves_by_author_fullname_without_fetching(self, reddit):
+        resolver = AuthorResolver(reddit, AuthorCache())
+        comments = [SimpleNamespace(author_fullname='t2_a'), SimpleNamespace()]
+
+        resolved = resolver.resolve_for(comments)
+
+        assert list(resolved.keys()) == ['t2_a']
@@ -0,0 +1,160 @@
+import threading
+from types import SimpleNamespace
+from praw.models import MoreComments
+from src.integrations.comment_harvester import CommentHarvester
+from src.integrations.reddit import ThreadLocalReddit
+
+
+class FakeCommentForest:
+    def __init__(self, comments, more_comments):
+        self.comments = comments
+        self.more_comments = more_comments
+        self.replace_more_limit = 'not called'
+
+    def replace_more(self, limit = 32):
+        self.replace_more_limit = limit
+        if limit is None:
+            return []
+        return self.more_comments[limit:]
+
+    def list(self):
+        return self.comments
+
+    def __iter__(self):
+        return iter(self.comments)
+
+
+class FakeMoreComments(MoreComments):
+    def __init__(self, count, depth, comments = None):
+        self.count = count
+        self.depth = depth
+        self.parent_id = 't3_abc'
+        self.children = []
+        self.submission = None
+        self._fetched_comments = comments if comments is not None else []
+        self.expanded = False
+
+    def comments(self, update = True):
+        self.expanded = True
+        return self._fetched_comments
+
+
+def build_comment(id, depth = 0, body = 'text'):
+    return SimpleNamespace(id=id, body=body, author=None, depth=depth)
+
+
+def build_submission(id, comments, more_comments = None):
+    return SimpleNamespace(
+        id=id, name=f't3_{id}', num_comments=len(comments),
+        comments=FakeCommentForest(comments, more_comments if more_comments is not None else [])
+    )
+
+
+class TestCommentHarvester:
+    def test_streams_comments_in_submissions_order(self):
+        submissions = [
+            build_submission(str(i), [build_comment(f'{i}-a'), build_comment(f'{i}-b', body='[deleted]')])
+            for i in range(10)
+        ]
+        harvester = CommentHarvester(max_workers=3)
+
+        comments = list(harvester.harvest(iter(submissions)))
+
+        assert [comment["id"] for comment in comments] == [f'{i}-a' for i in range(10)]
+        assert harvester.truncated_threads == []
+
+
+    def test_fetches_trees_through_the_reddit_instance_of_each_worker(self):
+        clients = []
+
+        class FakeReddit:
+            def __init__(self):
+                self.thread = threading.get_ident()
+                clients.append(self)
+
+            def submission(self, id):
+                # the comment ids record the instance that fetched the tree, and its thread
+                assert threading.get_ident() == self.thread
+                return build_submission(id, [build_comment(f'{id}-{clients.index(self)}')])
+
+        submissions = [build_submission(str(i), []) for i in range(8)]
+        harvester = CommentHarvester(max_workers=2, reddit=ThreadLocalReddit(FakeReddit))
+
+        comments = list(harvester.harvest(submissions))
+
+        assert [comment["id"].split('-')[0] for comment in comments] == [str(i) for i in range(8)]
+        assert 1 <= len(clients) <= 2
+        assert all(client.thread != threading.get_ident() for client in clients)
+
+
+    def test_notifies_harvested_submissions_after_their_comments(self):
+        submissions = [build_submission(str(i), [build_comment(f'{i}-a')]) for i in range(3)]
+        events = []
+
+        for comment in CommentHarvester(max_workers=2).harvest(submissions, on_harvested=lambda s: events.append(s.id)):
+            events.append(comment["id"])
+
+        assert events == ['0-a', '0', '1-a', '1', '2-a', '2']
+
+
+    def test_records_threads_truncated_by_budget(self):
+        more_comments = [SimpleNamespace(count=5), SimpleNamespace(count=7), SimpleNamespace(count=1)]
+        submission = build_submission('abc', [build_comment('x')], more_comments)
+        harvester = CommentHarvester(more_comments_budget=1)
+
+        list(harvester.harvest([submission]))
+
+        assert submission.comments.replace_more_limit == 1
+        assert harvester.truncated_threads == [{
+            "id": 'abc',
+            "submission_name": 't3_abc',
+            "num_comments": 1,
+            "more_comments_left": 2,
+            "comments_left": 8,
+            "depth_capped_comments": 0,
+            "depth_capped_more_comments": 0,
+        }]
+
+
+    def test_caps_comment_depth(self):
+        submission = build_submission('abc', [build_comment('x', 0), build_comment('y', 1), build_comment('z', 2)])
+        harvester = CommentHarvester(max_depth=1)
+
+        comments = list(harvester.harvest([submission]))
+
+        assert [comment["id"] for comment in comments] == ['x', 'y']
+        assert harvester.truncated_threads[0]["depth_capped_comments"] == 1
+
+
+    def test_does_not_expand_more_comments_below_the_depth_cap(self):
+        deep_more_comments = FakeMoreComments(4, depth=2, comments=[build_comment('deep', 2)])
+        shallow_more_comments = FakeMoreComments(3, depth=1, comments=[build_comment('y2', 1)])
+        comment = build_comment('x', 0)
+        comment.replies = [build_comment('y', 1), shallow_more_comments]
+        comment.replies[0].replies = [deep_more_comments]
+        submission = build_submission('abc', [comment])
+        harvester = CommentHarvester(max_depth=1)
+
+        comments = list(harvester.harvest([submission]))
+
+        assert [comment["id"] for comment in comments] == ['x', 'y', 'y2']
+        assert shallow_more_comments.expanded
+        assert not deep_more_comments.expanded
+        assert submission.comments.replace_more_limit == 'not called'
+        assert harvester.truncated_threads[0]["depth_capped_more_comments"] == 1
+        assert harvester.truncated_threads[0]["depth_capped_comments"] == 4
+
+
+    def test_expands_nested_more_comments_within_budget_and_depth(self):
+        nested_more_comments = FakeMoreComments(2, depth=0, comments=[build_comment('c', 0)])
+        largest_more_comments = FakeMoreComments(9, depth=0, comments=[build_comment('b', 0), nested_more_comments])
+        smallest_more_comments = FakeMoreComments(1, depth=0, comments=[build_comment('d', 0)])
+        submission = build_submission('abc', [build_comment('a', 0), smallest_more_comments, largest_more_comments])
+        harvester = CommentHarvester(max_depth=1, more_comments_budget=2)
+
+        comments = list(harvester.harvest([submission]))
+
+        assert [comment["id"] for comment in comments] == ['a', 'b', 'c']
+        assert not smallest_more_comments.expanded
+        assert harvester.truncated_threads[0]["more_comments_left"] == 1
+        assert harvester.truncated_threads[0]["depth_capped_more_comments"] == 0
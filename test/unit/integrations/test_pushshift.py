@@ -0,0 +1,216 @@
+import pytest
+from src.db.capture_store import CaptureStore
+from src.integrations import pushshift
+
+
+def build_response(data, total_results):
+    return {
+        "data": data,
+        "metadata": { "total_results": total_results },
+    }
+
+
+def build_submission(id, created_utc):
+    return { "id": id, "created_utc": created_utc }
+
+
+class TestBuildKeywordQueries:
+    def test_folds_keywords_into_a_single_query(self):
+        assert pushshift.build_keyword_queries(['soccer', 'world cup', 'soccer']) == ['soccer|"world cup"']
+
+
+    def test_splits_queries_over_max_length(self):
+        queries = pushshift.build_keyword_queries(['aaaa', 'bbbb', 'cccc', 'dddddddddddd'], max_length=11)
+
+        assert queries == ['aaaa|bbbb', 'cccc', 'dddddddddddd']
+
+
+    def test_no_keywords(self):
+        assert pushshift.build_keyword_queries([]) == []
+
+
+class TestGetSubmissionPagesForInterval:
+    def test_single_page_when_total_results_fits(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json', return_value=build_response(
+            [build_submission('a', 10), build_submission('b', 11)], 2
+        ))
+
+        pages = list(pushshift.get_submission_pages_for_interval('sports', (0, 100), size=2))
+
+        assert pages == [[build_submission('a', 10), build_submission('b', 11)]]
+        assert get_json.call_count == 1
+
+
+    def test_walks_interval_by_created_utc_cursor(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json', side_effect=[
+            build_response([build_submission('a', 10), build_submission('b', 11)], 4),
+            build_response([build_submission('b', 11), build_submission('c', 12)], 3),
+            build_response([build_submission('d', 13)], 1),
+        ])
+
+        pages = list(pushshift.get_submission_pages_for_interval('sports', (0, 100), 'soccer', size=2))
+
+        ids = [submission["id"] for page in pages for submission in page]
+        assert ids == ['a', 'b', 'c', 'd']
+        assert '&after=10&' in get_json.call_args_list[1][0][0]
+        assert '&after=11&' in get_json.call_args_list[2][0][0]
+        assert '&q=soccer' in get_json.call_args_list[2][0][0]
+
+
+    def test_skips_page_filled_by_a_single_second(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json', side_effect=[
+            build_response([build_submission('a', 10), build_submission('b', 10)], 3),
+            build_response([build_submission('a', 10), build_submission('b', 10)], 3),
+            build_response([build_submission('c', 12)], 1),
+        ])
+
+        pages = list(pushshift.get_submission_pages_for_interval('sports', (0, 100), size=2))
+
+        assert [[submission["id"] for submission in page] for page in pages] == [['a', 'b'], ['c']]
+        assert '&after=10&' in get_json.call_args_list[2][0][0]
+
+
+    def test_encodes_query(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json', return_value=build_response([], 0))
+
+        list(pushshift.get_submission_pages_for_interval('sports', (0, 100), 'soccer|"world cup"'))
+
+        assert '&q=soccer%7C%22world%20cup%22' in get_json.call_args[0][0]
+
+
+    def test_empty_response(self, mocker):
+        mocker.patch.object(pushshift, 'get_pushshift_json', return_value=build_response([], 0))
+
+        assert list(pushshift.get_submission_pages_for_interval('sports', (0, 100))) == []
+
+
+class TestGetIdsFromSubmissionsWithKeywordsForInterval:
+    def test_yields_ids_per_page(self, mocker):
+        mocker.patch.object(pushshift, 'get_pushshift_json', side_effect=[
+            build_response([build_submission('a', 10), build_submission('b', 11)], 3),
+            build_response([build_submission('c', 12)], 1),
+        ])
+
+        pages = list(pushshift.get_ids_from_submissions_with_keywords_for_interval('sports', (0, 100), size=2))
+
+        assert pages == [['a', 'b'], ['c']]
+
+
+class FakeResponse:
+    def __init__(self, status_code, body = None, headers = None):
+        self.status_code = status_code
+        self._body = body
+        self.text = 'response text' if body is not None or status_code != 200 else ''
+        self.headers = headers if headers is not None else {}
+
+    def json(self):
+        return self._body
+
+
+class FakeRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+@pytest.fixture
+def client(mocker):
+    mocker.patch.object(pushshift.time, 'sleep')
+    return pushshift.PushshiftClient(FakeRateLimiter(), max_retries=2, backoff_factor=1, max_backoff=10)
+
+
+class TestPushshiftClient:
+    def test_returns_json_body(self, client, mocker):
+        get = mocker.patch.object(client.session, 'get', return_value=FakeResponse(200, { "data": [] }))
+
+        assert client.get_json('url') == { "data": [] }
+        get.assert_called_once_with('url', timeout=client.timeout)
+        assert client.get_stats()['requests'] == 1
+
+
+    def test_retries_throttled_request_honoring_retry_after(self, client, mocker):
+        mocker.patch.object(client.session, 'get', side_effect=[
+            FakeResponse(429, headers={ 'Retry-After': '3' }),
+            FakeResponse(200, { "data": [] }),
+        ])
+
+        assert client.get_json('url') == { "data": [] }
+        pushshift.time.sleep.assert_called_once_with(3.0)
+        assert client.rate_limiter.acquired == 2
+        assert client.get_stats()['retries'] == 1
+
+
+    def test_retries_server_errors_and_connection_errors(self, client, mocker):
+        mocker.patch.object(client.session, 'get', side_effect=[
+            FakeResponse(502),
+            pushshift.requests.ConnectionError('connection reset'),
+            FakeResponse(200, { "data": [] }),
+        ])
+
+        assert client.get_json('url') == { "data": [] }
+        delays = [call[0][0] for call in pushshift.time.sleep.call_args_list]
+        assert 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+
+
+    def test_gives_up_after_max_retries(self, client, mocker):
+        mocker.patch.object(client.session, 'get', return_value=FakeResponse(503))
+
+        with pytest.raises(Exception):
+            client.get_json('url')
+
+        stats = client.get_stats()
+        assert stats['requests'] == 3 and stats['retries'] == 2 and stats['failures'] == 1
+
+
+    def test_does_not_retry_client_errors(self, client, mocker):
+        get = mocker.patch.object(client.session, 'get', return_value=FakeResponse(400, { "error": "bad" }))
+
+        with pytest.raises(Exception):
+            client.get_json('url')
+
+        assert get.call_count == 1
+
+
+class TestGetPushshiftJson:
+    @pytest.fixture
+    def capture_store(self, tmp_path):
+        def build(mode):
+            store = CaptureStore(str(tmp_path / 'captures.db'), mode)
+            pushshift.set_capture_store(store)
+            return store
+
+        yield build
+        pushshift.set_capture_store(None)
+
+
+    def test_read_through_requests_once(self, mocker, capture_store):
+        get_json = mocker.patch.object(pushshift.pushshift_client, 'get_json', return_value=build_response([], 0))
+        capture_store('read-through')
+
+        assert pushshift.get_pushshift_json('https://api.pushshift.io/?a=1&b=2') == build_response([], 0)
+        assert pushshift.get_pushshift_json('https://api.pushshift.io/?b=2&a=1') == build_response([], 0)
+        assert get_json.call_count == 1
+
+
+    def test_write_through_always_requests(self, mocker, capture_store):
+        get_json = mocker.patch.object(pushshift.pushshift_client, 'get_json', side_effect=[build_response([], 0), build_response([], 1)])
+        store = capture_store('write-through')
+
+        pushshift.get_pushshift_json('https://api.pushshift.io/?a=1')
+        pushshift.get_pushshift_json('https://api.pushshift.io/?a=1')
+
+        assert get_json.call_count == 2
+        assert store.count() == 1
+
+
+    def test_replay_never_requests(self, mocker, capture_store):
+        get_json = mocker.patch.object(pushshift.pushshift_client, 'get_json')
+        store = capture_store('replay')
+        store.put('GET https://api.pushshift.io/?a=1', b'{"data": []}')
+
+        assert pushshift.get_pushshift_json('https://api.pushshift.io/?a=1') == { "data": [] }
+        with pytest.raises(Exception):
+            pushshift.get_pushshift_json('https://api.pushshift.io/?a=2')
+        assert get_json.call_count == 0
@@ -0,0 +1,53 @@
+from src.integrations import pushshift, pushshift_comments
+
+
+def build_response(data, total_results):
+    return {
+        "data": data,
+        "metadata": { "total_results": total_results },
+    }
+
+
+def build_comment(id, created_utc):
+    return { "id": id, "created_utc": created_utc }
+
+
+class TestGetCommentPagesForSubmissions:
+    def test_searches_submissions_together_by_link_id(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json', return_value=build_response(
+            [build_comment('c1', 10), build_comment('c2', 11)], 2
+        ))
+
+        pages = list(pushshift_comments.get_comment_pages_for_submissions(['abc', 't3_def'], after=5))
+
+        assert pages == [[build_comment('c1', 10), build_comment('c2', 11)]]
+        assert get_json.call_count == 1
+        assert get_json.call_args[0][0].startswith(f'{pushshift_comments.PUSHSHIFT_COMMENT_URL}?link_id=abc,def&after=5&size=500')
+        assert '&before=' not in get_json.call_args[0][0]
+
+
+    def test_walks_pages_by_created_utc_cursor(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json', side_effect=[
+            build_response([build_comment('c1', 10), build_comment('c2', 11)], 3),
+            build_response([build_comment('c2', 11), build_comment('c3', 12)], 2),
+        ])
+
+        pages = list(pushshift_comments.get_comment_pages_for_submissions(['abc'], size=2))
+
+        assert [[comment["id"] for comment in page] for page in pages] == [['c1', 'c2'], ['c3']]
+        assert '&after=10&' in get_json.call_args_list[1][0][0]
+
+
+    def test_batches_submissions(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json', return_value=build_response([], 0))
+
+        list(pushshift_comments.get_comment_pages_for_submissions(['a', 'b', 'c'], batch_size=2))
+
+        assert [call[0][0].split('&')[0].split('=')[1] for call in get_json.call_args_list] == ['a,b', 'c']
+
+
+    def test_no_submissions(self, mocker):
+        get_json = mocker.patch.object(pushshift, 'get_pushshift_json')
+
+        assert list(pushshift_comments.get_comment_pages_for_submissions([])) == []
+        assert get_json.call_count == 0
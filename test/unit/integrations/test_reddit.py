@@ -0,0 +1,107 @@
+import json
+import pytest
+import requests
+import threading
+from types import SimpleNamespace
+from src.db.capture_store import CaptureStore
+from src.integrations.reddit import hydrate_submissions, CapturingRequestor, ThreadLocalReddit
+
+
+class FakeReddit:
+    def __init__(self, missing_ids = None):
+        self.requests = []
+        self.missing_ids = missing_ids if missing_ids is not None else []
+
+    def info(self, fullnames):
+        self.requests.append(list(fullnames))
+        return (SimpleNamespace(id=fullname[3:], fullname=fullname) for fullname in fullnames if fullname[3:] not in self.missing_ids)
+
+
+class TestHydrateSubmissions:
+    def test_fetches_submissions_in_batches(self):
+        reddit = FakeReddit()
+        ids = [str(i) for i in range(250)]
+
+        submissions = list(hydrate_submissions(reddit, ids))
+
+        assert [submission.fullname for submission in submissions] == [f't3_{i}' for i in ids]
+        assert [len(request) for request in reddit.requests] == [100, 100, 50]
+
+
+    def test_skips_submissions_not_found(self):
+        reddit = FakeReddit(missing_ids=['b'])
+
+        missing_ids = []
+
+        submissions = list(hydrate_submissions(reddit, ['a', 'b', 'c'], batch_size=2, on_missing=missing_ids.extend))
+
+        assert [submission.fullname for submission in submissions] == ['t3_a', 't3_c']
+        assert reddit.requests == [['t3_a', 't3_b'], ['t3_c']]
+        assert missing_ids == ['b']
+
+
+class TestThreadLocalReddit:
+    def test_creates_an_instance_per_thread(self):
+        reddit = ThreadLocalReddit(lambda: SimpleNamespace(thread=threading.get_ident()))
+        threads = []
+
+        thread = threading.Thread(target=lambda: threads.append(reddit.thread))
+        thread.start()
+        thread.join()
+
+        assert reddit.thread == threading.get_ident()
+        assert reddit.get_client() is reddit.get_client()
+        assert threads[0] != threading.get_ident()
+
+
+class FakeSession:
+    def __init__(self):
+        self.headers = {}
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        response = requests.Response()
+        response.status_code = 200
+        response.headers.update({ 'x-ratelimit-remaining': '10', 'content-type': 'application/json' })
+        body = { 'access_token': 'secret-token', 'expires_in': 3600 } if url.endswith('access_token') else { 'kind': 'Listing' }
+        response._content = json.dumps(body).encode('utf-8')
+        return response
+
+
+class TestCapturingRequestor:
+    def build_requestor(self, tmp_path, mode):
+        session = FakeSession()
+        store = CaptureStore(str(tmp_path / 'captures.db'), mode)
+        return CapturingRequestor('test user agent', session=session, capture_store=store), session
+
+
+    def test_replays_captured_responses(self, tmp_path):
+        requestor, _ = self.build_requestor(tmp_path, 'read-through')
+        requestor.request('get', 'https://oauth.reddit.com/api/info', params={ 'id': 't3_a' })
+
+        replayer, session = self.build_requestor(tmp_path, 'replay')
+        response = replayer.request('get', 'https://oauth.reddit.com/api/info', params={ 'id': 't3_a' })
+
+        assert session.requests == []
+        assert response.json() == { 'kind': 'Listing' }
+        assert 'x-ratelimit-remaining' not in response.headers
+
+
+    def test_access_tokens_are_not_captured_nor_reused(self, tmp_path):
+        requestor, session = self.build_requestor(tmp_path, 'read-through')
+        token_url = 'https://www.reddit.com/api/v1/access_token'
+
+        requestor.request('post', token_url, data=[('grant_type', 'password'), ('password', 'p')])
+        requestor.request('post', token_url, data=[('grant_type', 'password'), ('password', 'p')])
+
+        assert len(session.requests) == 2
+        replayer, _ = self.build_requestor(tmp_path, 'replay')
+        assert replayer.request('post', token_url, data=[('grant_type', 'password')]).json()['access_token'] == 'captured'
+
+
+    def test_replay_without_capture(self, tmp_path):
+        replayer, _ = self.build_requestor(tmp_path, 'replay')
+
+        with pytest.raises(Exception):
+            replayer.request('get', 'https://oauth.reddit.com/api/info')
@@ -0,0 +1,212 @@
+import pytest
+from src.parsers import reddit_parser
+
+
+class LazyRecord:
+    """Fake PRAW instance, keeping its data on the instance dict and recording which attributes were read"""
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+        self.__dict__['read_attributes'] = []
+
+    def __getattribute__(self, name):
+        if not name.startswith('__') and name != 'read_attributes':
+            object.__getattribute__(self, 'read_attributes').append(name)
+        return object.__getattribute__(self, name)
+
+
+@pytest.fixture(autouse=True)
+def reset_projection():
+    yield
+    reddit_parser.set_field_projection(None)
+    reddit_parser.set_search_keywords(None)
+
+
+class TestParseFieldProjection:
+    def test_plain_fields_apply_to_every_record_type_having_them(self):
+        projection = reddit_parser.parse_field_projection('title,body score')
+
+        assert projection['submission'] == { 'id', 'title', 'body', 'score' }
+        assert projection['comment'] == { 'id', 'body', 'score' }
+        assert projection['subreddit'] is None
+
+
+    def test_prefixed_fields_apply_to_a_single_record_type(self):
+        projection = reddit_parser.parse_field_projection(['comment.body'])
+
+        assert projection['comment'] == { 'id', 'body' }
+        assert projection['submission'] is None
+
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError):
+            reddit_parser.parse_field_projection(['submission.karma'])
+
+
+class TestGetSubmissionData:
+    def test_projection_does_not_read_other_attributes(self):
+        reddit_parser.set_field_projection(['title', 'score'])
+        submission = LazyRecord(id='abc', selftext='text', title='title', score=3)
+
+        result = reddit_parser.get_submission_data(submission)
+
+        assert result == { "id": 'abc', "score": 3, "title": 'title' }
+        assert set(submission.read_attributes) == { 'id', 'selftext', 'title', 'score' }
+
+
+    def test_all_fields_without_projection(self):
+        submission = LazyRecord(id='abc', selftext='text', author=None, created_utc=0)
+
+        result = reddit_parser.get_submission_data(submission)
+
+        assert list(result.keys()) == [field for field, _, _ in reddit_parser.SUBMISSION_FIELDS]
+        assert result["body"] == 'text'
+        assert result["upvote_ratio"] is None
+
+
+    def test_subreddit_fields_without_loading_the_subreddit(self):
+        submission = LazyRecord(id='abc', selftext='text', author=None, subreddit_id='t5_2qgzy')
+
+        result = reddit_parser.get_submission_data(submission)
+
+        assert result["subreddit_id"] == '2qgzy'
+        assert result["subreddit_name"] == 't5_2qgzy'
+        assert 'subreddit' not in submission.read_attributes
+
+
+    def test_empty_submission(self):
+        assert reddit_parser.get_submission_data(LazyRecord(selftext='[removed]')) is None
+
+
+class TestGetSubmissionDataFromPushshift:
+    def test_projection(self):
+        reddit_parser.set_field_projection('submission.subreddit_name')
+
+        result = reddit_parser.get_submission_data_from_pushshift({ "id": 'abc', "selftext": 'text', "subreddit": 'sports' })
+
+        assert result == { "id": 'abc', "subreddit_name": 'sports' }
+
+
+    def test_tags_matched_keywords(self):
+        reddit_parser.set_search_keywords(['soccer', 'world cup', 'tennis'])
+
+        result = reddit_parser.get_submission_data_from_pushshift({ "id": 'abc', "title": 'World Cup', "selftext": 'soccer!' })
+
+        assert result["keywords"] == ['soccer', 'world cup']
+
+
+    def test_no_keywords_without_search_keywords(self):
+        result = reddit_parser.get_submission_data_from_pushshift({ "id": 'abc', "title": 'World Cup', "selftext": 'soccer!' })
+
+        assert result["keywords"] is None
+
+
+class TestGetCommentData:
+    def test_uses_resolved_authors(self):
+        comment = LazyRecord(id='c', body='text', author_fullname='t2_a')
+
+        result = reddit_parser.get_comment_data(comment, { 't2_a': { "name": 'a' } })
+
+        assert result["author"] == { "name": 'a' }
+        assert 'author' not in comment.read_attributes
+
+
+class TestGetCommentDataFromPushshift:
+    def test_same_fields_as_praw_comments(self):
+        praw_comment = reddit_parser.get_comment_data(LazyRecord(id='c', body='text', author=None))
+        pushshift_comment = reddit_parser.get_comment_data_from_pushshift({ "id": 'c', "body": 'text' })
+
+        assert list(pushshift_comment.keys()) == list(praw_comment.keys())
+
+
+    def test_submission_and_author_from_pushshift_keys(self):
+        comment = { "id": 'c', "body": 'text', "link_id": 't3_abc', "author": 'name', "author_fullname": 't2_xyz', "submission_url": 'url' }
+
+        result = reddit_parser.get_comment_data_from_pushshift(comment)
+
+        assert result["submission_id"] == 'abc'
+        assert result["submission_name"] == 't3_abc'
+        assert result["submission_url"] == 'url'
+        assert result["author"]["name"] == 'name'
+        assert result["author"]["id"] == 'xyz'
+        assert result["author"]["comment_karma"] is None
+
+
+    def test_same_subreddit_values_as_praw_comments(self):
+        praw_comment = reddit_parser.get_comment_data(LazyRecord(id='c', body='text', author=None, subreddit_id='t5_2qgzy'))
+        pushshift_comment = reddit_parser.get_comment_data_from_pushshift({ "id": 'c', "body": 'text', "subreddit": 'sports', "subreddit_id": 't5_2qgzy' })
+
+        assert pushshift_comment["subreddit_id"] == praw_comment["subreddit_id"] == '2qgzy'
+        assert pushshift_comment["subreddit_name"] == praw_comment["subreddit_name"] == 't5_2qgzy'
+
+
+    def test_uses_resolved_authors(self):
+        comment = { "id": 'c', "body": 'text', "author": 'name', "author_fullname": 't2_xyz' }
+
+        result = reddit_parser.get_comment_data_from_pushshift(comment, { 't2_xyz': { "name": 'a' } })
+
+        assert result["author"] == { "name": 'a' }
+
+
+    def test_deleted_author_and_missing_link(self):
+        result = reddit_parser.get_comment_data_from_pushshift({ "id": 'c', "body": 'text', "author": '[deleted]' })
+
+        assert result["author"] is None
+        assert result["submission_id"] is None
+
+
+    def test_projection(self):
+        reddit_parser.set_field_projection(['comment.body'])
+
+        assert reddit_parser.get_comment_data_from_pushshift({ "id": 'c', "body": 'text', "score": 1 }) == { "body": 'text', "id": 'c' }
+
+
+    def test_empty_comments(self):
+        page = [{ "id": 'a', "body": 'text' }, { "id": 'b', "body": '[deleted]' }, { "id": 'c', "body": '' }, { "id": 'd' }]
+
+        result = reddit_parser.get_comments_data_from_pushshift(page)
+
+        assert [comment["id"] for comment in result] == ['a']
+        assert reddit_parser.get_comment_data_from_pushshift(page[1]) is None
+
+
+class TestBatchParsers:
+    def test_pushshift_page(self):
+        page = [
+            { "id": 'a', "selftext": 'text', "created_utc": 1577836800 },
+            { "id": 'b', "selftext": '[removed]' },
+            { "id": 'c' },
+            { "id": 'd', "selftext": None },
+        ]
+
+        result = reddit_parser.get_submissions_data_from_pushshift(page)
+
+        assert result == [
+            data for data in map(reddit_parser.get_submission_data_from_pushshift, page) if data is not None
+        ]
+        assert [submission["id"] for submission in result] == ['a', 'd']
+
+
+    def test_comments(self):
+        comments = [LazyRecord(id='a', body='text', author=None), LazyRecord(id='b', body='[deleted]')]
+
+        result = reddit_parser.get_comments_data(comments)
+
+        assert [comment["id"] for comment in result] == ['a']
+
+
+class TestFormatDate:
+    @pytest.mark.parametrize('timestamp', [0, 1577836801, 1577836801.0, 1577836801.25, 1577836801.9999996])
+    def test_matches_datetime_formatting(self, timestamp):
+        from datetime import datetime
+
+        expected = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+        assert reddit_parser._format_date(timestamp) == expected
+
+
+class TestParserBenchmark:
+    def test_parsers_match_the_reference_parsers(self):
+        from benchmarks import parser_benchmark
+
+        # raises when the parsed records differ from the reference ones
+        parser_benchmark.run(50, 1)
@@ -0,0 +1,124 @@
+import time
+import pytest
+from pymongo.errors import BulkWriteError
+from src.services.bulk_writer import BulkWriter
+
+
+class FakeCollection:
+    def __init__(self):
+        self.calls = []
+        self.error = None
+
+    def insert_many(self, documents, ordered = True):
+        self.calls.append((list(documents), ordered))
+        if self.error is not None:
+            raise self.error
+
+
+class FakeDatabase(dict):
+    def __missing__(self, collection):
+        self[collection] = FakeCollection()
+        return self[collection]
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase()
+
+
+class TestBulkWriter:
+    def test_flushes_on_document_count(self, database):
+        writer = BulkWriter(database, max_documents=2, max_interval=60)
+
+        for i in range(5):
+            writer.write({ "id": i }, 'submissions')
+        writer.flush()
+
+        calls = database['submissions'].calls
+        assert [len(documents) for documents, _ in calls] == [2, 2, 1]
+        assert all(ordered is False for _, ordered in calls)
+        writer.close()
+
+
+    def test_flushes_on_byte_size(self, database):
+        writer = BulkWriter(database, max_documents=1000, max_bytes=100, max_interval=60)
+
+        writer.write({ "body": 'a' * 200 }, 'comments')
+        writer.write({ "body": 'b' }, 'comments')
+        writer.close()
+
+        assert [len(documents) for documents, _ in database['comments'].calls] == [1, 1]
+
+
+    def test_flushes_on_time(self, database):
+        writer = BulkWriter(database, max_documents=1000, max_interval=0.05)
+
+        writer.write({ "id": 1 }, 'submissions')
+        time.sleep(0.3)
+
+        assert len(database['submissions'].calls) == 1
+        writer.close()
+
+
+    def test_buffers_per_collection(self, database):
+        writer = BulkWriter(database, max_documents=1000, max_interval=60)
+
+        writer.write({ "id": 1 }, 'submissions')
+        writer.write({ "id": 2 }, 'comments')
+        writer.write({ "id": 3 }, 'submissions')
+        writer.close()
+
+        assert database['submissions'].calls[0][0] == [{ "id": 1 }, { "id": 3 }]
+        assert database['comments'].calls[0][0] == [{ "id": 2 }]
+
+
+    def test_restarts_after_close(self, database):
+        writer = BulkWriter(database, max_interval=60)
+
+        writer.write({ "id": 1 }, 'submissions')
+        writer.close()
+        writer.write({ "id": 2 }, 'submissions')
+        writer.close()
+
+        assert len(database['submissions'].calls) == 2
+
+
+    def test_ignores_duplicate_key_errors(self, database):
+        database['submissions'].error = BulkWriteError({ "writeErrors": [{ "code": 11000 }] })
+        writer = BulkWriter(database, max_interval=60)
+
+        writer.write({ "id": 1 }, 'submissions')
+        writer.close()
+
+
+    def test_raises_write_errors_on_flush(self, database):
+        database['submissions'].error = BulkWriteError({ "writeErrors": [{ "code": 121 }] })
+        writer = BulkWriter(database, max_interval=60)
+
+        writer.write({ "id": 1 }, 'submissions')
+
+        with pytest.raises(BulkWriteError):
+            writer.flush()
+        writer.close()
+
+
+class TestBulkWriterUpsertMode:
+    def test_replaces_documents_by_id(self, database):
+        operations = []
+        database['submissions'].bulk_write = lambda requests, ordered = True: operations.extend(requests)
+        writer = BulkWriter(database, mode='upsert', max_interval=60)
+
+        writer.write({ "id": 'abc', "score": 1 }, 'submissions')
+        writer.write({ "id": None, "score": 2 }, 'submissions')
+        writer.close()
+
+        assert operations[0]._filter == { "id": 'abc' }
+        assert operations[0]._doc == { "id": 'abc', "score": 1 }
+        assert operations[0]._upsert is True
+        assert type(operations[1]).__name__ == 'InsertOne'
+        assert database['submissions'].calls == []
+
+
+    def test_invalid_mode(self, database):
+        with pytest.raises(ValueError):
+            BulkWriter(database, mode='delete')
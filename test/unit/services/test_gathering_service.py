@@ -0,0 +1,183 @@
+import pytest
+from datetime import datetime
+from src.services import gathering_service
+
+
+def build_submission(id):
+    return { "id": id, "selftext": 'text' }
+
+
+class TestDedupeSearchResults:
+    def test_drops_submissions_found_by_previous_queries(self):
+        results = [
+            (('sports', 'a|b', (0, 10)), [build_submission('1'), build_submission('2')]),
+            (('sports', 'c', (0, 10)), [build_submission('2'), build_submission('3')]),
+            (('news', 'c', (0, 10)), [build_submission('2')]),
+        ]
+
+        deduped = list(gathering_service.dedupe_search_results(results))
+
+        assert [[submission["id"] for submission in submissions] for _, submissions in deduped] == [['1', '2'], ['3'], ['2']]
+
+
+    def test_forgets_ids_of_previous_intervals(self):
+        results = [
+            (('sports', 'a', (0, 10)), [build_submission('1')]),
+            (('sports', 'a', (11, 20)), [build_submission('2')]),
+            (('sports', 'b', (11, 20)), [build_submission('1'), build_submission('2')]),
+        ]
+
+        deduped = list(gathering_service.dedupe_search_results(results))
+
+        assert [[submission["id"] for submission in submissions] for _, submissions in deduped] == [['1'], ['2'], ['1']]
+
+
+class TestSkipSeenSubmissions:
+    def test_drops_submissions_on_the_index(self, mocker):
+        seen_index = mocker.Mock()
+        seen_index.is_seen.side_effect = lambda id: id == '1'
+        results = [(('sports', None, (0, 10)), [build_submission('1'), build_submission('2')])]
+
+        unseen = list(gathering_service.skip_seen_submissions(results, seen_index))
+
+        assert [submission["id"] for submission in unseen[0][1]] == ['2']
+
+
+class TestTrackSearches:
+    def test_skips_gathered_submissions_and_begins_searches(self, mocker):
+        journal = mocker.Mock()
+        journal.is_submission_gathered.side_effect = lambda id: id == '1'
+        results = [(('sports', None, (0, 10)), [build_submission('1'), build_submission('2')])]
+
+        tracked = list(gathering_service.track_searches(results, journal))
+
+        assert [submission["id"] for submission in tracked[0][1]] == ['2']
+        journal.begin_search.assert_called_once_with(('sports', None, (0, 10)), ['2'])
+
+
+class TestCloseWritesAndSave:
+    def test_saves_the_seen_index_once_writes_are_closed(self, mocker):
+        close_writes = mocker.patch.object(gathering_service, 'close_writes')
+        seen_index = mocker.Mock()
+
+        gathering_service.close_writes_and_save(seen_index)
+
+        close_writes.assert_called_once()
+        seen_index.save.assert_called_once()
+
+
+    def test_does_not_save_the_seen_index_when_closing_fails(self, mocker):
+        mocker.patch.object(gathering_service, 'close_writes', side_effect=Exception('write failed'))
+        seen_index = mocker.Mock()
+
+        with pytest.raises(Exception):
+            gathering_service.close_writes_and_save(seen_index)
+
+        seen_index.save.assert_not_called()
+
+
+class TestScheduleStreams:
+    def test_furthest_behind_streams_first(self):
+        last_searched_dates = {
+            ('news', 'a'): datetime(2021, 1, 10),
+            ('news', 'b'): datetime(2021, 1, 1),
+            ('sports', 'a'): datetime(2021, 1, 10),
+            ('sports', 'b'): datetime(2021, 1, 5),
+            ('tech', 'a'): datetime(2021, 2, 1),
+        }
+
+        batches = gathering_service.schedule_streams(last_searched_dates, datetime(2021, 2, 1), 2)
+
+        assert batches == [
+            (datetime(2021, 1, 1), ['news'], ['b']),
+            (datetime(2021, 1, 5), ['sports'], ['b']),
+        ]
+
+
+    def test_batches_subreddits_sharing_date_and_keywords(self):
+        date = datetime(2021, 1, 1)
+        last_searched_dates = {
+            ('news', 'a'): date,
+            ('news', 'b'): date,
+            ('sports', 'a'): date,
+            ('sports', 'b'): date,
+            ('tech', 'a'): date,
+        }
+
+        batches = gathering_service.schedule_streams(last_searched_dates, datetime(2021, 2, 1), 4, excluded_streams=[('tech', 'a')])
+
+        assert batches == [(date, ['news', 'sports'], ['a', 'b'])]
+
+
+class TestParseAndWriteSearchResults:
+    def test_parses_and_writes_submissions(self, mocker):
+        insert_submission = mocker.patch.object(gathering_service, 'insert_submission')
+        results = [(('sports', None, (0, 10)), [build_submission('1'), { "id": '2', "selftext": '[removed]' }])]
+
+        written = list(gathering_service.write_search_results(gathering_service.parse_search_results(results), 'submissions'))
+
+        assert written == [(('sports', None, (0, 10)), 1)]
+        assert insert_submission.call_args[0][0]["id"] == '1'
+        assert insert_submission.call_args[0][1] == 'submissions'
+
+
+    def test_adds_written_submissions_to_the_seen_index(self, mocker):
+        mocker.patch.object(gathering_service, 'insert_submission')
+        seen_index = mocker.Mock()
+        results = [(('sports', None, (0, 10)), [build_submission('1'), build_submission('2')])]
+
+        list(gathering_service.write_search_results(results, 'submissions', seen_index))
+
+        assert list(seen_index.add.call_args[0][0]) == ['1', '2']
+
+
+def build_comment(id, link_id, author_fullname = None):
+    return { "id": id, "body": 'text', "link_id": f't3_{link_id}', "author_fullname": author_fullname }
+
+
+class TestWritePushshiftComments:
+    def test_writes_comments_of_the_submissions(self, mocker):
+        get_pages = mocker.patch.object(gathering_service, 'get_comment_pages_for_submissions', return_value=[
+            [build_comment('c1', '1'), { "id": 'c2', "body": '[deleted]', "link_id": 't3_1' }],
+            [build_comment('c3', '2')],
+        ])
+        insert_comment = mocker.patch.object(gathering_service, 'insert_comment')
+        submissions = [{ "id": '1', "created_utc": 100, "url": 'url1' }, { "id": '2', "created_utc": 50 }]
+
+        written = gathering_service.write_pushshift_comments(submissions, 'comments')
+
+        assert written == 2
+        assert list(get_pages.call_args[0][0]) == ['1', '2']
+        assert get_pages.call_args[0][1] == 49
+        assert [call[0][0]["id"] for call in insert_comment.call_args_list] == ['c1', 'c3']
+        assert insert_comment.call_args_list[0][0][0]["submission_url"] == 'url1'
+        assert insert_comment.call_args_list[0][0][1] == 'comments'
+
+
+    def test_resolves_authors_per_page(self, mocker):
+        mocker.patch.object(gathering_service, 'get_comment_pages_for_submissions', return_value=[
+            [build_comment('c1', '1', 't2_a'), build_comment('c2', '1')],
+        ])
+        insert_comment = mocker.patch.object(gathering_service, 'insert_comment')
+        author_resolver = mocker.Mock()
+        author_resolver.resolve.return_value = { 't2_a': { "name": 'a' } }
+
+        gathering_service.write_pushshift_comments([{ "id": '1' }], 'comments', author_resolver)
+
+        assert list(author_resolver.resolve.call_args[0][0]) == ['t2_a', None]
+        assert insert_comment.call_args_list[0][0][0]["author"] == { "name": 'a' }
+
+
+class TestWriteSearchComments:
+    def test_searches_comments_of_consecutive_searches_together(self, mocker):
+        write_comments = mocker.patch.object(gathering_service, 'write_pushshift_comments')
+        results = [
+            (('sports', None, (0, 10)), [build_submission('1')]),
+            (('news', None, (0, 10)), [build_submission('2'), build_submission('3')]),
+            (('sports', None, (11, 20)), [build_submission('4')]),
+        ]
+
+        passed = list(gathering_service.write_search_comments(results, 'comments', batch_size=2))
+
+        assert passed == results
+        assert [[submission["id"] for submission in call[0][0]] for call in write_comments.call_args_list] == [['1', '2', '3'], ['4']]
@@ -0,0 +1,63 @@
+import gzip
+import pytest
+from src.services.jsonl_writer import JsonlWriter, list_jsonl_files, read_jsonl
+
+
+class TestJsonlWriter:
+    def test_documents_are_read_back_in_order(self, tmp_path):
+        writer = JsonlWriter(str(tmp_path), chunk_bytes=64)
+        documents = [{ "id": str(i), "body": 'ção' * i } for i in range(20)]
+
+        for document in documents:
+            writer.write(document, 'submissions')
+        writer.close()
+
+        paths = list_jsonl_files(str(tmp_path), 'submissions')
+        assert len(paths) == 1
+        assert [document for path in paths for document in read_jsonl(path)] == documents
+
+
+    def test_writes_compressed_chunks_only(self, tmp_path):
+        writer = JsonlWriter(str(tmp_path), chunk_bytes=1024)
+
+        writer.write({ "id": '1' }, 'comments')
+
+        assert list_jsonl_files(str(tmp_path), 'comments') == []
+
+        writer.flush()
+
+        path = list_jsonl_files(str(tmp_path), 'comments')[0]
+        assert path.endswith('.jsonl.gz')
+        with gzip.open(path, 'rt') as file:
+            assert file.read() == '{"id": "1"}\n'
+        writer.close()
+
+
+    def test_rotates_files(self, tmp_path):
+        writer = JsonlWriter(str(tmp_path), chunk_bytes=1, max_file_bytes=30)
+
+        for i in range(5):
+            writer.write({ "id": str(i) }, 'submissions')
+        writer.close()
+
+        # 12 bytes per line, so files are rotated after 3 lines
+        paths = list_jsonl_files(str(tmp_path), 'submissions')
+        assert [[document["id"] for document in read_jsonl(path)] for path in paths] == [['0', '1', '2'], ['3', '4']]
+
+
+    def test_zstd_compression(self, tmp_path):
+        pytest.importorskip('zstandard')
+        writer = JsonlWriter(str(tmp_path), compression='zstd', chunk_bytes=16)
+
+        for i in range(10):
+            writer.write({ "id": str(i) }, 'submissions')
+        writer.close()
+
+        path = list_jsonl_files(str(tmp_path), 'submissions')[0]
+        assert path.endswith('.jsonl.zst')
+        assert len(list(read_jsonl(path))) == 10
+
+
+    def test_invalid_compression(self, tmp_path):
+        with pytest.raises(ValueError):
+            JsonlWriter(str(tmp_path), compression='bz2')
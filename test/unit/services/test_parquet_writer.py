@@ -0,0 +1,135 @@
+import os
+import pytest
+import subprocess
+import sys
+from src.services.parquet_writer import ParquetWriter
+
+pyarrow = pytest.importorskip('pyarrow')
+parquet = pytest.importorskip('pyarrow.parquet')
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def build_submission(id, subreddit = 'news', created_utc = 1609459200, author = 'someone'):
+    return {
+        "author": author,
+        "created_utc": created_utc,
+        "edited": False,
+        "id": id,
+        "keywords": ['soccer'],
+        "link_flair_text": None,
+        "score": 10,
+        "subreddit_name": subreddit,
+        "upvote_ratio": 0.9,
+    }
+
+
+def read_partition(directory, collection, subreddit, month):
+    partition_directory = os.path.join(directory, collection, f'subreddit={subreddit}', f'month={month}')
+    return [
+        parquet.ParquetFile(os.path.join(partition_directory, file_name))
+        for file_name in sorted(os.listdir(partition_directory))
+    ]
+
+
+class TestParquetWriter:
+    def test_partitions_by_subreddit_and_month(self, tmp_path):
+        writer = ParquetWriter(str(tmp_path))
+
+        writer.write(build_submission('1'), 'submissions')
+        writer.write(build_submission('2', created_utc=1612137600), 'submissions')
+        writer.write(build_submission('3', subreddit='sports'), 'submissions')
+        writer.close()
+
+        january_news = read_partition(str(tmp_path), 'submissions', 'news', '2021-01')[0].read()
+        assert january_news.column('id').to_pylist() == ['1']
+        assert january_news.column('keywords').to_pylist() == [['soccer']]
+        assert january_news.column('edited').to_pylist() == [None]
+        assert read_partition(str(tmp_path), 'submissions', 'news', '2021-02')[0].read().column('id').to_pylist() == ['2']
+        assert read_partition(str(tmp_path), 'submissions', 'sports', '2021-01')[0].read().column('id').to_pylist() == ['3']
+
+
+    def test_writes_row_groups_and_dictionary_encodes(self, tmp_path):
+        writer = ParquetWriter(str(tmp_path), row_group_size=2)
+
+        for i in range(5):
+            writer.write(build_submission(str(i)), 'submissions')
+        writer.close()
+
+        file = read_partition(str(tmp_path), 'submissions', 'news', '2021-01')[0]
+        assert [file.metadata.row_group(i).num_rows for i in range(file.metadata.num_row_groups)] == [2, 2, 1]
+
+        columns = [file.metadata.row_group(0).column(i) for i in range(file.metadata.num_columns)]
+        encodings = { column.path_in_schema: column.encodings for column in columns }
+        assert any('DICTIONARY' in encoding for encoding in encodings['subreddit_name'])
+
+
+    def test_flattens_praw_authors(self, tmp_path):
+        writer = ParquetWriter(str(tmp_path))
+
+        writer.write(build_submission('1', author=None), 'submissions')
+        writer.write(build_submission('2', author={ "name": 'someone', "id": 'x1', "comment_karma": 10 }), 'submissions')
+        writer.close()
+
+        table = read_partition(str(tmp_path), 'submissions', 'news', '2021-01')[0].read()
+        assert table.column('author').to_pylist() == [None, 'someone']
+        assert table.column('author_comment_karma').to_pylist() == [None, 10]
+
+
+    def test_flush_closes_files_so_they_are_readable(self, tmp_path):
+        writer = ParquetWriter(str(tmp_path))
+
+        writer.write(build_submission('1'), 'submissions')
+        writer.flush()
+
+        assert read_partition(str(tmp_path), 'submissions', 'news', '2021-01')[0].read().column('id').to_pylist() == ['1']
+
+        writer.write(build_submission('2'), 'submissions')
+        writer.flush()
+
+        files = read_partition(str(tmp_path), 'submissions', 'news', '2021-01')
+        assert [file.read().column('id').to_pylist() for file in files] == [['1'], ['2']]
+
+
+    def test_flushed_files_survive_a_crash(self, tmp_path):
+        script = (
+            'import os, sys\n'
+            'from src.services.parquet_writer import ParquetWriter\n'
+            'writer = ParquetWriter(sys.argv[1])\n'
+            f'writer.write({build_submission("1")!r}, "submissions")\n'
+            'writer.flush()\n'
+            'os._exit(0)\n'
+        )
+        subprocess.run([sys.executable, '-c', script, str(tmp_path)], check=True, cwd=ROOT_DIRECTORY)
+
+        assert read_partition(str(tmp_path), 'submissions', 'news', '2021-01')[0].read().column('id').to_pylist() == ['1']
+
+
+    def test_close_makes_files_readable_and_next_writes_open_new_files(self, tmp_path):
+        writer = ParquetWriter(str(tmp_path))
+
+        writer.write(build_submission('1'), 'submissions')
+        writer.close()
+        writer.write(build_submission('2'), 'submissions')
+        writer.close()
+
+        files = read_partition(str(tmp_path), 'submissions', 'news', '2021-01')
+        assert [file.read().column('id').to_pylist() for file in files] == [['1'], ['2']]
+
+
+    def test_closes_the_least_recently_written_file_beyond_the_limit(self, tmp_path):
+        writer = ParquetWriter(str(tmp_path), row_group_size=1, max_open_files=1)
+
+        writer.write(build_submission('1'), 'submissions')
+        writer.write(build_submission('2', subreddit='sports'), 'submissions')
+
+        assert read_partition(str(tmp_path), 'submissions', 'news', '2021-01')[0].read().column('id').to_pylist() == ['1']
+        writer.close()
+
+
+    def test_checkpointed_less_often_than_the_other_sinks(self):
+        from src.services.reddit_service import CHECKPOINT_INTERVALS, SINKS
+
+        # each checkpoint closes the open files, leaving a new file per written partition
+        assert set(CHECKPOINT_INTERVALS.keys()) == set(SINKS)
+        assert CHECKPOINT_INTERVALS['parquet'] > max(CHECKPOINT_INTERVALS['mongo'], CHECKPOINT_INTERVALS['jsonl'])
@@ -0,0 +1,87 @@
+import pytest
+from src.services import refresh_service
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+class FakeSubmission:
+    def __init__(self, id, score = 0, num_comments = 0, upvote_ratio = 1.0):
+        self.id = id
+        self.score = score
+        self.num_comments = num_comments
+        self.upvote_ratio = upvote_ratio
+
+
+def build_document(id, created_utc, score = 0, num_comments = 0, upvote_ratio = 1.0):
+    return { "id": id, "created_utc": created_utc, "score": score, "num_comments": num_comments, "upvote_ratio": upvote_ratio }
+
+
+class TestGetRefreshInterval:
+    @pytest.mark.parametrize('age, interval', [(10 * 60, HOUR), (4 * HOUR, 2 * HOUR), (10 * DAY, 5 * DAY), (365 * DAY, 30 * DAY)])
+    def test_grows_with_age_within_bounds(self, age, interval):
+        assert refresh_service.get_refresh_interval(age) == interval
+
+
+class TestGetNextRefreshUtc:
+    def test_schedules_after_a_fraction_of_the_age(self):
+        assert refresh_service.get_next_refresh_utc(0, 4 * HOUR) == 6 * HOUR
+
+
+    def test_stops_past_max_age(self):
+        assert refresh_service.get_next_refresh_utc(0, 179 * DAY, max_age=180 * DAY) is None
+
+
+class TestGetChangedFields:
+    def test_only_changed_fields(self):
+        document = build_document('a', 0, score=1, num_comments=2)
+
+        assert refresh_service.get_changed_fields(document, FakeSubmission('a', score=5, num_comments=2)) == { "score": 5 }
+
+
+    def test_ignores_fields_not_stored(self):
+        document = { "id": 'a', "score": 1 }
+
+        assert refresh_service.get_changed_fields(document, FakeSubmission('a', score=1, upvote_ratio=0.5)) == {}
+
+
+class TestRefreshSubmissions:
+    def test_sets_changed_fields_and_schedule_per_batch(self, mocker):
+        now = 10 * DAY
+        documents = [build_document('a', now - 4 * HOUR, score=1), build_document('b', now - 4 * HOUR), build_document('c', now - 2 * DAY)]
+        get_submissions = mocker.patch.object(refresh_service, 'get_submissions_to_refresh', return_value=iter(documents))
+        update_documents = mocker.patch.object(refresh_service, 'update_documents')
+
+        def hydrate(reddit, ids, batch_size, on_missing):
+            for submission_id in ids:
+                if submission_id == 'c':
+                    on_missing(['c'])
+                else:
+                    yield FakeSubmission(submission_id, score=3)
+
+        mocker.patch.object(refresh_service, 'hydrate_submissions', side_effect=hydrate)
+        mocker.patch('builtins.print')
+
+        summary = refresh_service.refresh_submissions(mocker.Mock(), 'submissions', now=now, batch_size=2)
+
+        assert summary == { 'selected': 3, 'refreshed': 2, 'changed': 2, 'missing': 1 }
+        assert get_submissions.call_args[0][:3] == ('submissions', now, now - refresh_service.MAX_REFRESH_AGE)
+        assert update_documents.call_count == 2
+        assert update_documents.call_args_list[0][0] == ([
+            ('a', { "score": 3, "refreshed_utc": now, "next_refresh_utc": now + 2 * HOUR }),
+            ('b', { "score": 3, "refreshed_utc": now, "next_refresh_utc": now + 2 * HOUR }),
+        ], 'submissions')
+        assert update_documents.call_args_list[1][0] == ([
+            ('c', { "refreshed_utc": now, "next_refresh_utc": now + DAY }),
+        ], 'submissions')
+
+
+    def test_nothing_due(self, mocker):
+        mocker.patch.object(refresh_service, 'get_submissions_to_refresh', return_value=iter([]))
+        update_documents = mocker.patch.object(refresh_service, 'update_documents')
+
+        summary = refresh_service.refresh_submissions(mocker.Mock(), 'submissions', now=0)
+
+        assert summary == { 'selected': 0, 'refreshed': 0, 'changed': 0, 'missing': 0 }
+        assert update_documents.call_count == 0
@@ -0,0 +1,111 @@
+import random
+import time
+from src.services.search_service import search_concurrently, search_subreddit_groups_concurrently, isolate_search_failures, SubredditGrouper
+
+
+def fake_search(subreddit, interval, keyword = None):
+    # random delays make the searches finish out of order
+    time.sleep(random.uniform(0, 0.01))
+    yield [f'{subreddit}-{keyword}-{interval[0]}-a']
+    yield [f'{subreddit}-{keyword}-{interval[0]}-b']
+
+
+class TestSearchConcurrently:
+    def test_results_in_deterministic_order(self):
+        intervals = [(i, i + 1) for i in range(0, 20, 2)]
+
+        results = list(search_concurrently(fake_search, ['sports', 'news'], intervals, ['soccer', 'tennis'], max_workers=4))
+
+        expected_queries = [
+            (subreddit, keyword, interval)
+            for subreddit in ['sports', 'news']
+            for keyword in ['soccer', 'tennis']
+            for interval in intervals
+        ]
+        assert [query for query, _ in results] == expected_queries
+        assert results[0][1] == ['sports-soccer-0-a', 'sports-soccer-0-b']
+
+
+    def test_without_keywords(self):
+        results = list(search_concurrently(fake_search, ['sports'], [(0, 1)]))
+
+        assert results == [(('sports', None, (0, 1)), ['sports-None-0-a', 'sports-None-0-b'])]
+
+
+class TestSubredditGrouper:
+    def test_groups_unknown_subreddits_together(self):
+        grouper = SubredditGrouper(max_group_results=100, max_group_size=2)
+
+        assert grouper.group(['a', 'b', 'c'], (0, 10)) == [['a', 'b'], ['c']]
+
+
+    def test_dense_subreddits_are_searched_alone(self):
+        grouper = SubredditGrouper(max_group_results=100)
+        grouper.observe('Dense', (0, 10), None, 200)
+        grouper.observe('b', (0, 10), None, 60)
+        grouper.observe('c', (0, 10), None, 60)
+
+        assert grouper.group(['a', 'dense', 'b', 'c', 'd'], (10, 20)) == [['dense'], ['a', 'b'], ['c', 'd']]
+
+
+    def test_estimates_are_kept_per_query(self):
+        grouper = SubredditGrouper(max_group_results=100)
+        grouper.observe('a', (0, 10), 'soccer', 200)
+
+        assert grouper.group(['a', 'b'], (0, 10), 'soccer') == [['a'], ['b']]
+        assert grouper.group(['a', 'b'], (0, 10), 'tennis') == [['a', 'b']]
+
+
+def fake_group_search(subreddits, interval, keyword = None):
+    yield [
+        { "id": f'{subreddit}-{interval[0]}', "subreddit": subreddit.capitalize() }
+        for subreddit in subreddits.split(',')
+        for _ in range(10 if subreddit == 'dense' else 1)
+    ]
+
+
+class TestSearchSubredditGroupsConcurrently:
+    def test_splits_group_results_by_subreddit(self, mocker):
+        search = mocker.Mock(side_effect=fake_group_search)
+
+        results = list(search_subreddit_groups_concurrently(search, ['sports', 'news'], [(0, 10)]))
+
+        assert search.call_count == 1
+        assert search.call_args[0][0] == 'sports,news'
+        assert [(query, [result["id"] for result in found]) for query, found in results] == [
+            (('sports', None, (0, 10)), ['sports-0']),
+            (('news', None, (0, 10)), ['news-0']),
+        ]
+
+
+    def test_groups_adapt_to_previous_intervals(self, mocker):
+        search = mocker.Mock(side_effect=fake_group_search)
+        grouper = SubredditGrouper(max_group_results=5)
+
+        # the 2nd interval is planned while the 1st one is still in flight
+        results = list(search_subreddit_groups_concurrently(
+            search, ['dense', 'news', 'sports'], [(0, 10), (11, 21), (22, 32)], grouper=grouper, max_workers=1
+        ))
+
+        assert [call[0][0] for call in search.call_args_list] == [
+            'dense,news,sports', 'dense,news,sports', 'dense', 'news,sports'
+        ]
+        assert len(results) == 9
+
+
+class TestIsolateSearchFailures:
+    def test_failed_groups_are_recorded_instead_of_raised(self):
+        def search(subreddits, interval, keyword = None):
+            yield [{ "id": '1', "subreddit": subreddits.split(',')[0] }]
+            if 'broken' in subreddits:
+                raise Exception('Pushshift is down')
+
+        failed_subreddits = set()
+
+        results = dict(search_subreddit_groups_concurrently(
+            isolate_search_failures(search, failed_subreddits), ['news', 'broken'], [(0, 10)],
+            grouper=SubredditGrouper(max_group_size=1)
+        ))
+
+        assert failed_subreddits == {'broken'}
+        assert len(results[('news', None, (0, 10))]) == 1
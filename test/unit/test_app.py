@@ -0,0 +1,162 @@
+import json
+import os
+import pytest
+import subprocess
+import sys
+import app
+from datetime import datetime
+
+
+ROUND_MS = 100000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeContext:
+    """Lambda context whose deadline is `remaining_ms` after the start of the fake clock."""
+    def __init__(self, clock, remaining_ms):
+        self.clock = clock
+        self.deadline_ms = remaining_ms
+
+
+    def get_remaining_time_in_millis(self):
+        return self.deadline_ms - self.clock.now * 1000
+
+
+@pytest.fixture
+def clock(mocker):
+    clock = FakeClock()
+    mocker.patch.object(app, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def handler(mocker, monkeypatch, clock):
+    """Patches the gathering, the database and DynamoDB out of the Lambda handler, every round taking `ROUND_MS`,
+    and records the order of the writes."""
+    monkeypatch.setenv('SUBREDDITS', 'news')
+    monkeypatch.setenv('START_DATE', '2021-01-01')
+    monkeypatch.setenv('END_DATE', '2021-01-31')
+    monkeypatch.setenv('SAVE_COMMENTS', '0')
+    monkeypatch.setenv('SAVE_SUBREDDITS', '0')
+    monkeypatch.setenv('DAYS_PER_INTERVAL', '1')
+    monkeypatch.setenv('LANGUAGE', 'en')
+    monkeypatch.delenv('SEARCH_KEYWORDS', raising=False)
+    monkeypatch.delenv('FIELDS', raising=False)
+    mocker.patch.object(app, 'INTERVAL_SAFETY_MARGIN_MS', 60000)
+    mocker.patch.object(app, 'ensure_indexes')
+    mocker.patch.object(app, 'get_seen_index', return_value=None)
+    mocker.patch.object(app, 'log_metrics')
+
+    events = []
+
+    def gather_interval(params, subreddits, keywords, interval, seen_index = None):
+        clock.now += ROUND_MS / 1000
+        events.append(('gather', datetime.fromtimestamp(interval[0])))
+        return app.get_interval_summary(interval, subreddits, keywords, 2, set(), ROUND_MS)
+
+    mocker.patch.object(app, 'get_last_searched_dates', side_effect=lambda streams: { stream: datetime(2021, 1, 1) for stream in streams })
+    mocker.patch.object(app, 'save_last_searched_dates', side_effect=lambda dates: events.append(('save', dict(dates))))
+    mocker.patch.object(app, 'flush_writes', side_effect=lambda: events.append(('flush',)))
+    mocker.patch.object(app, 'gather_interval', side_effect=gather_interval)
+
+    return events
+
+
+class TestColdStart:
+    def test_importing_the_handler_does_not_import_pymongo(self):
+        completed = subprocess.run(
+            [sys.executable, '-c', 'import sys, app; print(sorted(name for name in sys.modules if name.split(".")[0] in ["pymongo", "bson"]))'],
+            cwd=os.path.dirname(os.path.abspath(app.__file__)), capture_output=True, text=True, check=True
+        )
+
+        assert completed.stdout.strip() == '[]'
+
+
+class TestStartFlushTimer:
+    def test_flushes_before_the_deadline(self, mocker):
+        flush_writes = mocker.patch.object(app, 'flush_writes')
+
+        timer = app.start_flush_timer(FakeContext(FakeClock(), app.FLUSH_SAFETY_MARGIN_MS + 50))
+        assert timer.interval == pytest.approx(0.05)
+        timer.join(1)
+
+        flush_writes.assert_called_once()
+
+
+    def test_no_timer_without_context(self):
+        assert app.start_flush_timer(None) is None
+
+
+class TestHasTimeForInterval:
+    def test_keeps_the_longest_round_and_the_margins(self, mocker):
+        mocker.patch.object(app, 'INTERVAL_SAFETY_MARGIN_MS', 60000)
+        needed_ms = app.FLUSH_SAFETY_MARGIN_MS + ROUND_MS + 60000
+
+        assert app.has_time_for_interval(FakeContext(FakeClock(), needed_ms), ROUND_MS)
+        assert not app.has_time_for_interval(FakeContext(FakeClock(), needed_ms - 1), ROUND_MS)
+
+
+    def test_false_without_context(self):
+        assert not app.has_time_for_interval(None, 0)
+
+
+class TestLambdaHandler:
+    def test_gathers_one_round_without_time_left(self, handler, clock):
+        response = app.lambda_handler({}, FakeContext(clock, 30000))
+
+        assert response['statusCode'] == 200
+        assert [event[0] for event in handler] == ['gather', 'flush', 'save']
+
+
+    def test_gathers_one_round_without_context(self, handler):
+        app.lambda_handler({}, None)
+
+        assert [event[0] for event in handler] == ['gather', 'flush', 'save']
+
+
+    def test_stops_when_the_longest_round_no_longer_fits(self, handler, clock):
+        # every round takes 100s, and another one needs 100s + 60s + 10s left: rounds start at 500s, 400s, 300s and 200s left
+        app.lambda_handler({}, FakeContext(clock, 500000))
+
+        assert [event[1] for event in handler if event[0] == 'gather'] == [datetime(2021, 1, day) for day in range(1, 5)]
+
+
+    def test_saves_watermarks_after_flushing_each_round(self, handler, clock):
+        app.lambda_handler({}, FakeContext(clock, 300000))
+
+        assert [event[0] for event in handler] == ['gather', 'flush', 'save', 'gather', 'flush', 'save']
+        assert handler[2][1] == { ('news', None): datetime(2021, 1, 1, 23, 59, 59) }
+
+
+    def test_returns_the_gathering_summary(self, handler, clock):
+        response = app.lambda_handler({}, FakeContext(clock, 300000))
+        body = json.loads(response['body'])
+
+        assert response['statusCode'] == 200
+        assert set(body.keys()) == { 'message', 'intervals', 'submissions', 'seconds', 'gatheredIntervals', 'failedStreams', 'finished' }
+        assert body['intervals'] == 2
+        assert body['submissions'] == 4
+        assert body['seconds'] == 200
+        assert body['failedStreams'] == 0
+        assert body['finished'] is False
+        assert [interval['start'] for interval in body['gatheredIntervals']] == ['2021-01-01T00:00:00', '2021-01-02T00:00:00']
+
+
+    def test_discards_the_unsaved_seen_ids_when_writing_fails(self, handler, mocker, clock):
+        seen_index = mocker.Mock()
+        mocker.patch.object(app, 'get_seen_index', return_value=seen_index)
+        mocker.patch.object(app, 'flush_writes', side_effect=Exception('write failed'))
+
+        response = app.lambda_handler({}, FakeContext(clock, 30000))
+
+        assert response['statusCode'] == 500
+        seen_index.save.assert_not_called()
+        seen_index.discard.assert_called_once()
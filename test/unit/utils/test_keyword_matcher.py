@@ -0,0 +1,35 @@
+from src.utils.keyword_matcher import KeywordMatcher
+
+
+class TestKeywordMatcher:
+    def test_matches_keywords_in_given_order(self):
+        matcher = KeywordMatcher(['tennis', 'soccer', 'golf'])
+
+        assert matcher.match('Golf and SOCCER', None) == ['soccer', 'golf']
+
+
+    def test_matches_whole_words_only(self):
+        matcher = KeywordMatcher(['cup', 'he'])
+
+        assert matcher.match('the cupboard') == []
+        assert matcher.match('world cup.') == ['cup']
+
+
+    def test_matches_overlapping_keywords_and_phrases(self):
+        matcher = KeywordMatcher(['world cup', 'cup', 'orld', 'she', 'he'])
+
+        assert matcher.match('the world cup', 'she said') == ['world cup', 'cup', 'she']
+
+
+    def test_matches_keyword_after_failed_partial_match(self):
+        matcher = KeywordMatcher(['abcd', 'bc'])
+
+        assert matcher.match('a bc abc') == ['bc']
+        assert matcher.match('abcd') == ['abcd']
+
+
+    def test_ignores_blank_and_repeated_keywords(self):
+        matcher = KeywordMatcher(['soccer', ' ', 'soccer'])
+
+        assert matcher.keywords == ['soccer']
+        assert matcher.match('') == []
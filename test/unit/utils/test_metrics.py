@@ -0,0 +1,136 @@
+import json
+from src.utils.metrics import Histogram, Metrics, ThroughputReporter
+
+
+class TestHistogram:
+    def test_summarizes_observations(self):
+        histogram = Histogram()
+        for value in [1, 3, 3, 100]:
+            histogram.observe(value)
+
+        summary = histogram.to_dict()
+
+        assert summary['count'] == 4
+        assert summary['sum'] == 107
+        assert summary['min'] == 1
+        assert summary['max'] == 100
+        assert 2 <= summary['p50'] <= 4
+        assert 64 <= summary['p99'] <= 100
+
+
+    def test_percentile_without_observations(self):
+        assert Histogram().percentile(50) is None
+
+
+    def test_percentile_of_overflow_bucket(self):
+        histogram = Histogram(buckets=[1, 2])
+        histogram.observe(50)
+
+        assert histogram.percentile(99) == 50
+
+
+    def test_values_of_non_empty_buckets(self):
+        histogram = Histogram(buckets=[1, 2, 4])
+        for value in [1, 3, 4]:
+            histogram.observe(value)
+
+        assert histogram.get_values() == ([1, 3], [1, 2])
+
+
+class TestMetrics:
+    def test_counters_and_histograms(self):
+        metrics = Metrics()
+        metrics.increment('pushshift.requests')
+        metrics.increment('pushshift.requests', 2)
+        metrics.observe('search.submissions', 10)
+
+        snapshot = metrics.snapshot()
+
+        assert snapshot['counters'] == { 'pushshift.requests': 3 }
+        assert snapshot['histograms']['search.submissions']['count'] == 1
+        assert metrics.get_counter('missing') == 0
+        assert metrics.get_histogram('missing') is None
+
+
+    def test_time_records_milliseconds(self, mocker):
+        mocker.patch('src.utils.metrics.time.perf_counter', side_effect=[1.0, 1.25])
+        metrics = Metrics()
+
+        with metrics.time('mongo.write_ms'):
+            pass
+
+        assert metrics.get_histogram('mongo.write_ms')['max'] == 250
+
+
+    def test_time_records_failed_blocks(self):
+        metrics = Metrics()
+
+        try:
+            with metrics.time('reddit.info_ms'):
+                raise ValueError('failed request')
+        except ValueError:
+            pass
+
+        assert metrics.get_histogram('reddit.info_ms')['count'] == 1
+
+
+    def test_json_log(self):
+        metrics = Metrics()
+        metrics.increment('mongo.documents', 5)
+
+        log = json.loads(metrics.to_json_log(language='en'))
+
+        assert log['language'] == 'en'
+        assert log['metrics']['counters'] == { 'mongo.documents': 5 }
+
+
+    def test_emf(self):
+        metrics = Metrics()
+        metrics.increment('pushshift.requests', 2)
+        metrics.observe('pushshift.request_ms', 3)
+
+        log = json.loads(metrics.to_emf('Gatherer', { 'Language': 'en' }))
+
+        directive = log['_aws']['CloudWatchMetrics'][0]
+        assert directive['Namespace'] == 'Gatherer'
+        assert directive['Dimensions'] == [['Language']]
+        assert { 'Name': 'pushshift.request_ms', 'Unit': 'Milliseconds' } in directive['Metrics']
+        assert log['Language'] == 'en'
+        assert log['pushshift.requests'] == 2
+        assert log['pushshift.request_ms'] == { 'Values': [3], 'Counts': [1] }
+
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.increment('pushshift.requests')
+        metrics.observe('search.submissions', 1)
+
+        metrics.reset()
+
+        assert metrics.snapshot() == { 'counters': {}, 'histograms': {} }
+
+
+class TestThroughputReporter:
+    def test_reports_at_most_once_per_interval(self, mocker):
+        mocker.patch('src.utils.metrics.time.monotonic', side_effect=[0, 5, 12, 13])
+        print_mock = mocker.patch('builtins.print')
+        reporter = ThroughputReporter(interval=10, registry=Metrics())
+
+        reporter.update(10)
+        reporter.update(20)
+        reporter.update(30, force=True)
+
+        assert print_mock.call_count == 2
+        assert print_mock.call_args_list[0][0][0].startswith('20 submissions in 12s')
+        assert print_mock.call_args_list[1][0][0].startswith('30 submissions in 13s')
+
+
+    def test_format_with_eta_and_latencies(self):
+        registry = Metrics()
+        registry.observe('pushshift.request_ms', 100)
+        reporter = ThroughputReporter(registry=registry)
+
+        message = reporter.format(50, 150, 10)
+
+        assert message.startswith('50 of 150 submissions in 10s (5.0/s, ETA 0m20s)')
+        assert 'pushshift 1 x p50 100ms' in message
@@ -0,0 +1,70 @@
+import threading
+import pytest
+from src.utils.pipeline import Pipeline
+
+
+def double(items):
+    for item in items:
+        yield item * 2
+
+
+def batch_pairs(items):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == 2:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+
+class TestPipeline:
+    def test_runs_stages_in_order(self):
+        pipeline = Pipeline(range(5), queue_size=1).stage(double).stage(batch_pairs)
+
+        assert list(pipeline) == [[0, 2], [4, 6], [8]]
+
+
+    def test_without_stages(self):
+        assert list(Pipeline(iter(['a', 'b']))) == ['a', 'b']
+
+
+    def test_stage_errors_are_raised_to_the_consumer(self):
+        def failing(items):
+            for item in items:
+                if item == 3:
+                    raise ValueError('bad item')
+                yield item
+
+        with pytest.raises(ValueError):
+            list(Pipeline(range(100)).stage(failing).stage(double))
+
+
+    def test_stages_run_on_their_own_threads(self):
+        thread_names = set()
+
+        def record_thread(items):
+            for item in items:
+                thread_names.add(threading.current_thread().name)
+                yield item
+
+        list(Pipeline(range(3)).stage(record_thread, 'record'))
+
+        assert thread_names == { 'pipeline-record' }
+
+
+    def test_source_is_not_consumed_ahead_of_the_queues(self):
+        produced = []
+
+        def source():
+            for i in range(1000):
+                produced.append(i)
+                yield i
+
+        results = iter(Pipeline(source(), queue_size=2).stage(double))
+        assert next(results) == 0
+        results.close()
+
+        # source queue + stage queue + items held by each thread
+        assert len(produced) < 10
@@ -0,0 +1,52 @@
+import threading
+import time
+from src.utils.pipeline import Pipeline
+from src.utils.profiler import SamplingProfiler
+
+
+def busy_wait(seconds):
+    finished_at = time.monotonic() + seconds
+    while time.monotonic() < finished_at:
+        pass
+
+
+class TestSamplingProfiler:
+    def test_samples_tracked_threads_only(self):
+        profiler = SamplingProfiler(interval=0.001).start()
+
+        def tracked():
+            profiler.track('tracked')
+            busy_wait(0.05)
+            profiler.untrack()
+
+        thread = threading.Thread(target=tracked)
+        thread.start()
+        busy_wait(0.05)
+        thread.join()
+        profiler.stop()
+
+        report = profiler.report()
+
+        assert report.startswith('tracked: ')
+        assert 'busy_wait' in report
+        assert 'test_samples_tracked_threads_only' not in report
+
+
+    def test_report_without_samples(self):
+        profiler = SamplingProfiler()
+
+        assert profiler.report() == ''
+
+
+    def test_pipeline_stages_are_tracked(self, mocker):
+        profiler = SamplingProfiler()
+        track_mock = mocker.patch.object(profiler, 'track')
+        untrack_mock = mocker.patch.object(profiler, 'untrack')
+
+        def double(items):
+            for item in items:
+                yield item * 2
+
+        assert list(Pipeline(range(3), profiler=profiler).stage(double, 'double')) == [0, 2, 4]
+        assert sorted(call[0][0] for call in track_mock.call_args_list) == ['double', 'source']
+        assert untrack_mock.call_count == 2
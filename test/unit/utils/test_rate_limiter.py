@@ -0,0 +1,47 @@
+import pytest
+from src.utils import rate_limiter
+from src.utils.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(mocker):
+    fake_clock = FakeClock()
+    mocker.patch.object(rate_limiter.time, 'monotonic', side_effect=fake_clock.monotonic)
+    mocker.patch.object(rate_limiter.time, 'sleep', side_effect=fake_clock.sleep)
+    return fake_clock
+
+
+class TestTokenBucket:
+    def test_burst_does_not_wait(self, clock):
+        bucket = TokenBucket(rate=1, capacity=3)
+
+        for _ in range(3):
+            bucket.acquire()
+
+        assert clock.now == 0.0
+
+
+    def test_waits_for_refill_after_burst(self, clock):
+        bucket = TokenBucket(rate=2, capacity=1)
+
+        bucket.acquire()
+        bucket.acquire()
+        bucket.acquire()
+
+        assert clock.now == pytest.approx(1.0)
+
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)